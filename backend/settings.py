@@ -66,6 +66,9 @@ TEMPLATES = [
 # --- WSGI ---
 WSGI_APPLICATION = 'backend.wsgi.application'
 
+# --- ASGI (endpoints async de inventario/api_async.py) ---
+ASGI_APPLICATION = 'backend.asgi.application'
+
 # --- BASE DE DATOS ---
 DATABASES = {
     'default': {
@@ -105,7 +108,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication con caché de usuario/token (inventario/autenticacion.py)
+        'inventario.autenticacion.TokenCacheAuthentication',
         # Si instalas JWT, vuelve a activar esta línea:
         # 'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
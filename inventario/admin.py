@@ -1,12 +1,21 @@
 # inventario/admin.py
 from decimal import Decimal
 from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils.html import format_html
 
 from .models import (
     Categoria, Proveedor, Cliente, Producto,
-    Compra, DetalleCompra, Venta, DetalleVenta, MovimientoStock
+    Compra, DetalleCompra, Venta, DetalleVenta, MovimientoStock, SecuenciaCodigo,
+    AbonoDeuda, SaldoCliente, CostoProducto, PeriodoArchivo, PrecioHistorico,
 )
+from .forms import AjustePrecioForm, ImportarProductosForm, ProductoAdminForm
+from .ledger import InventoryLedger, Delta
+from . import deudas, importacion, precios
 
 # ---------------------------
 # Helpers internos
@@ -37,7 +46,7 @@ def _fmt_money(n):
 # ---------------------------
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
-    list_display = ("nombre", "descripcion")
+    list_display = ("nombre", "descripcion", "prefijo_codigo")
     search_fields = ("nombre",)
 
 
@@ -61,6 +70,84 @@ class ProductoAdmin(admin.ModelAdmin):
     list_filter = ("categoria", "activo")
     search_fields = ("codigo", "nombre")
     ordering = ("codigo",)
+    actions = ("ajustar_precios",)
+    change_list_template = "admin/inventario/producto/change_list.html"
+    form = ProductoAdminForm
+
+    def get_readonly_fields(self, request, obj=None):
+        # El stock solo se ingresa al crear; luego lo mueve el libro de inventario
+        return ("stock",) if obj else ()
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            if change:
+                # Sin 'stock': un save() completo pisaría lo que movió el libro mientras tanto
+                obj.save(update_fields=list(form.cleaned_data))
+            else:
+                obj.save()
+                InventoryLedger.registrar_inicial([Delta(obj.pk, obj.stock, "Stock inicial", "Admin")])
+
+    @admin.action(description="Ajustar precios de los seleccionados…")
+    def ajustar_precios(self, request, queryset):
+        """Página intermedia: formulario -> vista previa -> aplicar (un UPDATE)."""
+        form = AjustePrecioForm(request.POST if "ajuste" in request.POST else None)
+        total, filas = None, []
+        if form.is_bound and form.is_valid():
+            d = form.cleaned_data
+            parametros = (d["tipo"], d["valor"], d["redondeo"], d["modo"])
+            if "aplicar" in request.POST:
+                n = precios.ajustar(queryset, *parametros, motivo=d["motivo"])
+                self.message_user(request, f"Precio actualizado en {n} producto(s).", level=messages.SUCCESS)
+                return None
+            total, filas = precios.vista_previa(queryset, *parametros)
+        return TemplateResponse(request, "admin/inventario/producto/ajustar_precios.html", {
+            **self.admin_site.each_context(request),
+            "title": "Ajustar precios",
+            "opts": self.model._meta,
+            "form": form,
+            "seleccionados": queryset.values_list("pk", flat=True),
+            "cantidad": queryset.count(),
+            "total": total,
+            "filas": filas,
+            "accion": "ajustar_precios",
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        })
+
+    def get_urls(self):
+        return [
+            path("importar/", self.admin_site.admin_view(self.importar_view), name="inventario_producto_importar"),
+        ] + super().get_urls()
+
+    def importar_view(self, request):
+        """Sube un CSV / XLSX y lo importa en bloques (o solo lo valida, con "simular")."""
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            raise PermissionDenied
+        form = ImportarProductosForm(request.POST or None, request.FILES or None)
+        resumen = None
+        if form.is_valid():
+            d = form.cleaned_data
+            try:
+                _columnas, filas = importacion.leer(d["archivo"], d["archivo"].name)
+                resumen = importacion.importar(filas, simular=d["simular"], crear_categorias=d["crear_categorias"])
+            except (ValueError, UnicodeDecodeError) as e:
+                form.add_error("archivo", str(e))
+            else:
+                nivel = messages.WARNING if resumen.con_error else messages.SUCCESS
+                self.message_user(request, f"{'Simulación: ' if d['simular'] else ''}{resumen}.", level=nivel)
+        return TemplateResponse(request, "admin/inventario/producto/importar.html", {
+            **self.admin_site.each_context(request),
+            "title": "Importar productos",
+            "opts": self.model._meta,
+            "form": form,
+            "resumen": resumen,
+            "columnas": importacion.COLUMNAS,
+        })
+
+
+@admin.register(SecuenciaCodigo)
+class SecuenciaCodigoAdmin(admin.ModelAdmin):
+    list_display = ("prefijo", "ultimo", "relleno")
+    search_fields = ("prefijo",)
 
 
 # ---------------------------
@@ -84,7 +171,9 @@ class DetalleCompraInline(admin.TabularInline):
 
 @admin.register(Compra)
 class CompraAdmin(admin.ModelAdmin):
-    list_display = ("id", "proveedor", "fecha", "total_mostrable")
+    list_display = ("id", "proveedor", "fecha", "items", "total_mostrable")
+    list_select_related = ("proveedor",)
+    readonly_fields = ("total", "items")
     date_hierarchy = "fecha"
     inlines = [DetalleCompraInline]
     search_fields = ("proveedor__nombre",)
@@ -92,10 +181,7 @@ class CompraAdmin(admin.ModelAdmin):
 
     @admin.display(description="Total")
     def total_mostrable(self, obj):
-        try:
-            return _fmt_money(obj.total())
-        except Exception:
-            return _fmt_money(0)
+        return _fmt_money(obj.total)
 
 
 # ---------------------------
@@ -111,18 +197,32 @@ class DetalleVentaInline(admin.TabularInline):
         precio = _campo_precio_detalle_venta()
         if precio:
             base.append(precio)
-        return base
+        return base + ["costo_fifo", "costo_promedio"]
 
     def get_readonly_fields(self, request, obj=None):
-        # nada readonly por defecto; ajusta si deseas
-        return []
+        # el costo lo fija el libro de inventario al vender
+        return ["costo_fifo", "costo_promedio"]
+
+
+class AbonoDeudaInline(admin.TabularInline):
+    # Solo lectura: los abonos se registran con deudas.registrar_abono (ajusta la venta y el saldo)
+    model = AbonoDeuda
+    extra = 0
+    fields = ("fecha", "monto", "observacion")
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Venta)
 class VentaAdmin(admin.ModelAdmin):
-    inlines = [DetalleVentaInline]
+    inlines = [DetalleVentaInline, AbonoDeudaInline]
 
-    list_display = ("id", "cliente", "fecha", "es_deuda", "saldada", "total_mostrable")
+    list_display = ("id", "cliente", "fecha", "es_deuda", "saldada", "items", "total_mostrable")
+    list_select_related = ("cliente",)
+    readonly_fields = ("total", "items", "abonado")
     list_filter = ("es_deuda", "saldada", "fecha")
     search_fields = ("cliente__nombre",)
     date_hierarchy = "fecha"
@@ -132,15 +232,14 @@ class VentaAdmin(admin.ModelAdmin):
 
     @admin.display(description="Total")
     def total_mostrable(self, obj):
-        try:
-            return _fmt_money(obj.total())
-        except Exception:
-            return _fmt_money(0)
+        return _fmt_money(obj.total)
 
     @admin.action(description="Marcar como pagada (solo ventas a deuda)")
     def marcar_pagada(self, request, queryset):
         qs = queryset.filter(es_deuda=True, saldada=False)
+        clientes = list(qs.values_list("cliente_id", flat=True).distinct())
         updated = qs.update(saldada=True)
+        deudas.recalcular_saldos(clientes)
         if updated:
             self.message_user(request, f"{updated} venta(s) marcadas como pagadas.", level=messages.SUCCESS)
         else:
@@ -149,7 +248,9 @@ class VentaAdmin(admin.ModelAdmin):
     @admin.action(description="Marcar como pendiente (solo ventas a deuda)")
     def marcar_pendiente(self, request, queryset):
         qs = queryset.filter(es_deuda=True, saldada=True)
+        clientes = list(qs.values_list("cliente_id", flat=True).distinct())
         updated = qs.update(saldada=False)
+        deudas.recalcular_saldos(clientes)
         if updated:
             self.message_user(request, f"{updated} venta(s) marcadas como pendientes.", level=messages.SUCCESS)
         else:
@@ -161,8 +262,80 @@ class VentaAdmin(admin.ModelAdmin):
 # ---------------------------
 @admin.register(MovimientoStock)
 class MovimientoStockAdmin(admin.ModelAdmin):
-    list_display = ("producto", "tipo", "cantidad", "motivo", "fecha", "referencia")
+    list_display = ("producto", "tipo", "cantidad", "motivo", "fecha", "referencia", "costo_fifo")
     list_filter = ("tipo", "fecha")
     search_fields = ("producto__nombre", "referencia", "motivo")
     date_hierarchy = "fecha"
     ordering = ("-fecha",)
+
+    # Solo lectura: un movimiento escrito aquí no movería el stock
+    # (lo escribe InventoryLedger junto con el ajuste)
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# ---------------------------
+# Saldos de deudores (solo lectura)
+# ---------------------------
+@admin.register(SaldoCliente)
+class SaldoClienteAdmin(admin.ModelAdmin):
+    list_display = ("cliente", "saldo", "deudas_abiertas", "ultima_deuda", "actualizado")
+    list_select_related = ("cliente",)
+    search_fields = ("cliente__nombre",)
+    ordering = ("-ultima_deuda",)
+    readonly_fields = ("cliente", "saldo", "deudas_abiertas", "ultima_deuda", "actualizado")
+
+    def has_add_permission(self, request):
+        return False
+
+
+# ---------------------------
+# Costo de inventario (solo lectura, lo mantiene inventario/costos.py)
+# ---------------------------
+@admin.register(CostoProducto)
+class CostoProductoAdmin(admin.ModelAdmin):
+    list_display = ("producto", "cantidad", "costo_promedio", "valor_fifo", "actualizado")
+    list_select_related = ("producto",)
+    search_fields = ("producto__nombre", "producto__codigo")
+    readonly_fields = ("producto", "cantidad", "costo_promedio", "valor_fifo", "actualizado")
+
+    def has_add_permission(self, request):
+        return False
+
+
+# ---------------------------
+# Periodos archivados (solo lectura, los maneja `manage.py archivar`)
+# ---------------------------
+@admin.register(PeriodoArchivo)
+class PeriodoArchivoAdmin(admin.ModelAdmin):
+    list_display = ("hasta", "desde", "ventas", "detalles", "movimientos", "creado", "restaurado")
+    ordering = ("-hasta",)
+    readonly_fields = ("desde", "hasta", "ventas", "detalles", "movimientos", "creado", "restaurado")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# ---------------------------
+# Historial de precios (solo lectura)
+# ---------------------------
+@admin.register(PrecioHistorico)
+class PrecioHistoricoAdmin(admin.ModelAdmin):
+    list_display = ("producto", "precio", "desde", "motivo")
+    list_select_related = ("producto",)
+    search_fields = ("producto__nombre", "producto__codigo", "motivo")
+    date_hierarchy = "desde"
+    ordering = ("-desde", "-id")
+    readonly_fields = ("producto", "precio", "desde", "motivo")
+
+    def has_add_permission(self, request):
+        return False
@@ -1,17 +1,36 @@
 # inventario/api.py
+import functools
+import hashlib
+from datetime import date, timedelta
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db import models as dj_models
 from rest_framework.routers import DefaultRouter
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.pagination import CursorPagination
 
 # 👇 imports necesarios para la previsualización del POS
 from django.shortcuts import render
-from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.gzip import gzip_page
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
 
 from .models import Categoria, Producto, Proveedor  # si Proveedor no existe, no pasa nada porque no lo usamos aquí
+from .models import Cliente, Venta, ResumenVenta, ResumenVentaProducto, ResumenVentaCategoria
+from .models import SugerenciaReposicion
+from .checkout import registrar_venta
+from . import catalogo as catalogo_svc
+from .busqueda import indice
+from . import eventos as eventos_svc
+from . import historico, exportacion, kardex, precios, versiones
+from .historico import medianoche
 
 # Movimiento puede llamarse MovimientoStock o Movimiento
 try:
@@ -30,6 +49,14 @@ from .serializers import (
     ProveedorSerializer,
     ProductoSerializer,
     MovimientoSerializer,
+    VentaSyncSerializer,
+    ResumenVentaSerializer,
+    KardexSerializer,
+    SugerenciaReposicionSerializer,
+    AjustePrecioSerializer,
+    VistaPreviaPrecioSerializer,
+    campos_pedidos,
+    plan_filas,
     get_bodega_serializer_or_none,
 )
 from .permissions import RolePermission
@@ -40,12 +67,103 @@ class BaseViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
 
 
-class CategoriaViewSet(BaseViewSet):
+def condicional(metodo):
+    """
+    GET condicional sobre la versión de las tablas del recurso
+    (inventario/versiones.py): ETag / If-None-Match y Last-Modified /
+    If-Modified-Since. Si nada cambió responde 304 sin leer la tabla ni
+    serializar. Solo para respuestas JSON.
+    """
+    @functools.wraps(metodo)
+    def envoltura(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return metodo(self, request, *args, **kwargs)
+        valores, actualizado = versiones.estado(self.tablas_version())
+        consulta = hashlib.md5(request.get_full_path().encode()).hexdigest()[:12]
+        etag = f'"{self.basename}-{".".join(map(str, valores))}-{consulta}"'
+        last_modified = int(actualizado.timestamp()) if actualizado else None
+
+        respuesta = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if respuesta is None:
+            respuesta = metodo(self, request, *args, **kwargs)
+            if respuesta.status_code != status.HTTP_200_OK:
+                return respuesta
+        respuesta["ETag"] = etag
+        if last_modified:
+            respuesta["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(respuesta, no_cache=True)
+        return respuesta
+    return envoltura
+
+
+class VersionCondicionalMixin:
+    """list() y retrieve() con GET condicional (ver ``condicional``)."""
+
+    def tablas_version(self):
+        """Modelos cuyos cambios invalidan la respuesta: el propio y los expandidos."""
+        _campos, expandir = campos_pedidos(self.request)
+        expandibles = getattr(self.get_serializer_class(), "expandibles", {})
+        return [self.queryset.model] + [expandibles[n].Meta.model for n in sorted(expandir & set(expandibles))]
+
+    @condicional
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @condicional
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class ListaRapidaMixin:
+    """
+    Listados de solo lectura sin crear una instancia de modelo ni recorrer el
+    serializer por fila: ``queryset.values(...)`` y una conversión por columna
+    armada una vez (serializers.plan_filas). La respuesta es la misma que la
+    del list() normal, con ?fields=, ?expand=, filtros y paginación.
+
+    Si el serializer tiene campos que no salen de .values(), se usa el list()
+    de DRF.
+    """
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        _campos, expandir = campos_pedidos(self.request)
+        relaciones = sorted(expandir & set(getattr(self.get_serializer_class(), "expandibles", {})))
+        return qs.select_related(*relaciones) if relaciones else qs
+
+    def _orden_paginacion(self):
+        orden = getattr(self.paginator, "ordering", None) or ()
+        if isinstance(orden, str):
+            orden = (orden,)
+        return [o.lstrip("-") for o in orden]
+
+    def lista_rapida(self, queryset):
+        """Response con las filas de ``queryset`` (paginadas si corresponde), o None."""
+        plan = plan_filas(self.get_serializer())
+        if plan is None:
+            return None
+        lookups, armar = plan
+        # el cursor de la paginación lee sus campos de cada fila
+        extra = [c for c in self._orden_paginacion() if c not in lookups]
+        filas = queryset.values(*lookups, *extra)
+        pagina = self.paginate_queryset(filas)
+        if pagina is not None:
+            return self.get_paginated_response([armar(f) for f in pagina])
+        return Response([armar(f) for f in filas.iterator(chunk_size=2000)])
+
+    def list(self, request, *args, **kwargs):
+        respuesta = self.lista_rapida(self.filter_queryset(self.get_queryset()))
+        if respuesta is None:
+            return super().list(request, *args, **kwargs)
+        return respuesta
+
+
+class CategoriaViewSet(VersionCondicionalMixin, ListaRapidaMixin, BaseViewSet):
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
 
 
-class ProveedorViewSet(BaseViewSet):
+class ProveedorViewSet(VersionCondicionalMixin, ListaRapidaMixin, BaseViewSet):
     # Si tu proyecto no tiene proveedores en la BD, igual funciona (CRUD estándar)
     try:
         queryset = Proveedor.objects.all()
@@ -54,7 +172,7 @@ class ProveedorViewSet(BaseViewSet):
     serializer_class = ProveedorSerializer
 
 
-class ProductoViewSet(BaseViewSet):
+class ProductoViewSet(VersionCondicionalMixin, ListaRapidaMixin, BaseViewSet):
     # 💡 IMPORTANTE: quitamos select_related('proveedor') porque tu modelo no lo tiene.
     # Usamos la consulta simple y así evitamos FieldError.
     queryset = Producto.objects.all()
@@ -63,33 +181,408 @@ class ProductoViewSet(BaseViewSet):
     # Vendedor NO puede escribir aquí
     allow_vendor_write = False
 
+    max_lote = 5000
+
+    def _lote(self, request):
+        productos = request.data.get("productos") if isinstance(request.data, dict) else request.data
+        if not isinstance(productos, list) or not productos:
+            return None, Response({"productos": "Envía una lista de productos."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(productos) > self.max_lote:
+            return None, Response({"productos": f"Máximo {self.max_lote} productos por lote."},
+                                  status=status.HTTP_400_BAD_REQUEST)
+        return productos, None
+
+    def _guardar_lote(self, ser):
+        if not ser.is_valid():
+            return Response({"errores": ser.errors}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with transaction.atomic():
+                return ser.save()
+        except IntegrityError as e:
+            # p. ej. otro lote tomó el mismo código en paralelo
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+
+    @action(detail=False, methods=["post"])
+    def bulk_create(self, request):
+        """
+        POST /api/v1/productos/bulk_create/   [{codigo, nombre, categoria, precio, ...}, ...]
+        Crea hasta ``max_lote`` productos en una transacción: todo o nada.
+        Si alguno no es válido responde 400 con 'errores' alineado con la lista.
+        """
+        productos, error = self._lote(request)
+        if error:
+            return error
+        resultado = self._guardar_lote(self.get_serializer(data=productos, many=True))
+        if isinstance(resultado, Response):
+            return resultado
+        return Response({"creados": len(resultado), "ids": [p.pk for p in resultado]},
+                        status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["post", "patch"])
+    def bulk_update(self, request):
+        """
+        PATCH /api/v1/productos/bulk_update/   [{id, precio, ...}, ...]
+        Edición parcial de hasta ``max_lote`` productos (solo los campos enviados),
+        en una transacción: todo o nada.
+        """
+        productos, error = self._lote(request)
+        if error:
+            return error
+        ids = set()
+        for p in productos:
+            try:
+                ids.add(int(p.get("id")))
+            except (AttributeError, TypeError, ValueError):
+                pass  # el serializer lo informa en la posición del elemento
+        instancias = Producto.objects.in_bulk(list(ids))
+        ser = self.get_serializer(instancias, data=productos, many=True, partial=True)
+        resultado = self._guardar_lote(ser)
+        if isinstance(resultado, Response):
+            return resultado
+        return Response({"actualizados": len(resultado)}, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=["get"])
+    @condicional
     def bajo_stock(self, request):
         """
         GET /api/v1/productos/bajo_stock/
-        Si el modelo tiene 'stock' y 'stock_minimo', filtra; si no, devuelve lista vacía.
+        Productos con stock <= stock_minimo (columna stock_bajo, con índice parcial).
         """
-        fields = {f.name for f in Producto._meta.get_fields()}
-        if {"stock", "stock_minimo"}.issubset(fields):
-            qs = self.get_queryset().filter(stock__lte=dj_models.F("stock_minimo"))
-            page = self.paginate_queryset(qs)
-            if page is not None:
-                ser = self.get_serializer(page, many=True)
-                return self.get_paginated_response(ser.data)
-            ser = self.get_serializer(qs, many=True)
-            return Response(ser.data, status=status.HTTP_200_OK)
-        # Si tu modelo no tiene esos campos, devolvemos 200 con lista vacía para no romper la demo.
-        return Response([], status=status.HTTP_200_OK)
-
-
-class MovimientoViewSet(BaseViewSet):
+        qs = self.get_queryset().filter(stock_bajo=True).order_by("nombre")
+        respuesta = self.lista_rapida(qs)
+        if respuesta is not None:
+            return respuesta
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            ser = self.get_serializer(page, many=True)
+            return self.get_paginated_response(ser.data)
+        ser = self.get_serializer(qs, many=True)
+        return Response(ser.data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"])
+    def stock_en(self, request):
+        """
+        GET /api/v1/productos/stock_en/?fecha=2025-01-31[&producto=1&producto=2]
+        Stock a una fecha: snapshot más cercano + movimientos desde entonces.
+        'fecha' sin hora = cierre de ese día; con hora = ese instante.
+        """
+        momento = historico.parsear_momento(request.query_params.get("fecha"))
+        if momento is None:
+            return Response({"detail": "Parámetro 'fecha' inválido (YYYY-MM-DD o YYYY-MM-DDTHH:MM)."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = [int(x) for x in request.query_params.getlist("producto")] or None
+        except ValueError:
+            return Response({"detail": "'producto' debe ser un id numérico."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        stocks = historico.stock_en(momento, ids)
+        qs = Producto.objects.filter(pk__in=stocks.keys()).order_by("nombre")
+        data = [
+            {"id": pk, "codigo": codigo, "nombre": nombre, "stock": str(stocks[pk])}
+            for pk, codigo, nombre in qs.values_list("pk", "codigo", "nombre").iterator()
+        ]
+        return Response({"fecha": momento, "productos": data}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"])
+    def ajustar_precios(self, request):
+        """
+        POST /api/v1/productos/ajustar_precios/
+        {"tipo": "porcentaje"|"monto", "valor": 8, "redondeo": "decena", "modo": "arriba",
+         "categoria": [1, 2], "producto": [...], "aplicar": false}
+
+        Sin 'aplicar' (o false) responde la vista previa: total de productos y
+        las primeras filas con precio actual y nuevo. Con 'aplicar': true lo
+        aplica en un solo UPDATE y registra el historial de precios.
+        """
+        ser = AjustePrecioSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        d = ser.validated_data
+        parametros = (d["tipo"], d["valor"], d["redondeo"], d["modo"])
+        if d["aplicar"]:
+            n = precios.ajustar(ser.productos(), *parametros, motivo=d["motivo"])
+            return Response({"actualizados": n}, status=status.HTTP_200_OK)
+        total, filas = precios.vista_previa(ser.productos(), *parametros)
+        return Response({
+            "productos": total,
+            "vista_previa": VistaPreviaPrecioSerializer(filas, many=True).data,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"])
+    def precios_en(self, request):
+        """
+        GET /api/v1/productos/precios_en/?fecha=2025-01-31[&producto=1&producto=2]
+        Precio vigente a una fecha según el historial de precios.
+        """
+        momento = historico.parsear_momento(request.query_params.get("fecha"))
+        if momento is None:
+            return Response({"detail": "Parámetro 'fecha' inválido (YYYY-MM-DD o YYYY-MM-DDTHH:MM)."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = [int(x) for x in request.query_params.getlist("producto")] or None
+        except ValueError:
+            return Response({"detail": "'producto' debe ser un id numérico."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        vigentes = precios.precio_en(momento, ids)
+        qs = Producto.objects.filter(pk__in=vigentes.keys()).order_by("nombre")
+        data = [
+            {"id": pk, "codigo": codigo, "nombre": nombre,
+             "precio": None if vigentes[pk] is None else str(vigentes[pk])}
+            for pk, codigo, nombre in qs.values_list("pk", "codigo", "nombre").iterator()
+        ]
+        return Response({"fecha": momento, "productos": data}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["get"])
+    def kardex(self, request, pk=None):
+        """
+        GET /api/v1/productos/<id>/kardex/[?limite=50][&hasta=YYYY-MM-DD][&cursor=...]
+        Movimientos del más reciente al más antiguo con saldo corrido.
+        Paginación por cursor: seguir el enlace 'siguiente' (sin OFFSET ni COUNT).
+        """
+        producto = self.get_object()
+        params = request.query_params
+        hasta = None
+        if params.get("hasta"):
+            hasta = historico.parsear_momento(params["hasta"])
+            if hasta is None:
+                return Response({"detail": "Parámetro 'hasta' inválido (YYYY-MM-DD o YYYY-MM-DDTHH:MM)."},
+                                status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limite = int(params.get("limite") or kardex.LIMITE)
+            filas, siguiente = kardex.pagina(producto, params.get("cursor"), limite, hasta)
+        except kardex.CursorInvalido as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({"detail": "'limite' debe ser numérico."}, status=status.HTTP_400_BAD_REQUEST)
+
+        url_siguiente = None
+        if siguiente:
+            query = params.copy()
+            query["cursor"] = siguiente
+            query.pop("hasta", None)
+            url_siguiente = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+        return Response({
+            "producto": {"id": producto.pk, "codigo": producto.codigo, "nombre": producto.nombre},
+            "siguiente": url_siguiente,
+            "resultados": KardexSerializer(filas, many=True).data,
+        }, status=status.HTTP_200_OK)
+
+
+class MovimientoCursorPagination(CursorPagination):
+    """Keyset sobre (fecha, id): páginas de costo constante, sin COUNT(*)."""
+    ordering = ("-fecha", "-id")
+    page_size = 100
+    page_size_query_param = "limite"
+    max_page_size = 500
+
+
+class MovimientoViewSet(VersionCondicionalMixin, ListaRapidaMixin, BaseViewSet):
     queryset = MovimientoModel.objects.select_related("producto").all()
     serializer_class = MovimientoSerializer
+    pagination_class = MovimientoCursorPagination
+    # Sin OrderingFilter: el cursor depende de un orden fijo
+    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filterset_fields = ["producto", "tipo"]
 
     # Vendedor SÍ puede escribir aquí
     allow_vendor_write = True
 
 
+class VentaSyncViewSet(viewsets.ViewSet):
+    """
+    POST /api/v1/ventas/sync/
+    Recibe un lote de ventas de una caja: {"ventas": [{"clave": ..., "lineas": [...]}, ...]}.
+
+    - Todo el lote se procesa en una transacción; cada venta en su propio savepoint,
+      así una venta sin stock no impide registrar las demás.
+    - Las claves ya registradas no crean otra Venta (reintentos seguros).
+    - Responde un resultado por venta: creada | duplicada | error.
+    """
+    permission_classes = [RolePermission]
+
+    # Vendedor SÍ puede escribir aquí (es el flujo de caja)
+    allow_vendor_write = True
+
+    max_lote = 500
+
+    def create(self, request):
+        ventas = request.data.get("ventas") if isinstance(request.data, dict) else request.data
+        if not isinstance(ventas, list) or not ventas:
+            return Response({"ventas": "Envía una lista de ventas."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ventas) > self.max_lote:
+            return Response({"ventas": f"Máximo {self.max_lote} ventas por lote."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        claves = [v.get("clave") for v in ventas if isinstance(v, dict) and v.get("clave")]
+        registradas = dict(
+            Venta.objects.filter(clave_idempotencia__in=claves).values_list("clave_idempotencia", "id")
+        )
+        clientes = {}
+        resultados = []
+
+        with transaction.atomic():
+            for item in ventas:
+                ser = VentaSyncSerializer(data=item)
+                if not ser.is_valid():
+                    clave = item.get("clave") if isinstance(item, dict) else None
+                    resultados.append({"clave": clave, "estado": "error", "errores": ser.errors})
+                    continue
+
+                data = ser.validated_data
+                clave = data["clave"]
+                if clave in registradas:
+                    resultados.append({"clave": clave, "estado": "duplicada", "venta": registradas[clave]})
+                    continue
+
+                cliente = None
+                if data["es_deuda"]:
+                    nombre = data["cliente_nombre"].strip()
+                    if nombre.lower() not in clientes:
+                        cliente = Cliente.objects.filter(nombre__iexact=nombre).first()
+                        clientes[nombre.lower()] = cliente or Cliente.objects.create(nombre=nombre)
+                    cliente = clientes[nombre.lower()]
+
+                try:
+                    venta = registrar_venta(
+                        [(l["producto"], l["cantidad"], l["precio"]) for l in data["lineas"]],
+                        cliente=cliente,
+                        es_deuda=data["es_deuda"],
+                        observacion=data["observacion"],
+                        fecha=data.get("fecha"),
+                        clave=clave,
+                    )
+                except DjangoValidationError as e:
+                    resultados.append({"clave": clave, "estado": "error", "errores": e.messages})
+                    continue
+                except IntegrityError:
+                    # Otra caja registró la misma clave en paralelo
+                    venta_id = Venta.objects.filter(clave_idempotencia=clave).values_list("id", flat=True).first()
+                    resultados.append({"clave": clave, "estado": "duplicada", "venta": venta_id})
+                    continue
+
+                registradas[clave] = venta.id
+                resultados.append({"clave": clave, "estado": "creada", "venta": venta.id})
+
+        return Response({"resultados": resultados}, status=status.HTTP_200_OK)
+
+
+class ResumenVentasViewSet(viewsets.ViewSet):
+    """
+    GET /api/v1/reportes/ventas/?desde=2025-01-01&hasta=2025-01-31[&periodo=dia|hora][&agrupar=producto|categoria][&id=..]
+
+    Series de ventas leídas de los resúmenes por hora/día (inventario/resumenes.py):
+    una fila por intervalo y producto/categoría, sin recorrer los detalles de venta.
+    'ventas' cuenta las boletas que incluyen ese producto/categoría.
+    """
+    permission_classes = [RolePermission]
+
+    periodos = {"dia": ResumenVenta.DIA, "hora": ResumenVenta.HORA}
+    agrupaciones = {
+        "producto": (ResumenVentaProducto, "producto"),
+        "categoria": (ResumenVentaCategoria, "categoria"),
+    }
+    max_dias = {ResumenVenta.DIA: 731, ResumenVenta.HORA: 31}
+
+    def list(self, request):
+        params = request.query_params
+        periodo = self.periodos.get(params.get("periodo", "dia"))
+        agrupacion = self.agrupaciones.get(params.get("agrupar", "categoria"))
+        if periodo is None or agrupacion is None:
+            return Response({"detail": "periodo: dia|hora; agrupar: producto|categoria."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            desde = date.fromisoformat(params.get("desde", ""))
+            hasta = date.fromisoformat(params.get("hasta", ""))
+            ids = [int(x) for x in params.getlist("id")]
+        except ValueError:
+            return Response({"detail": "desde/hasta: YYYY-MM-DD; id: numérico."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if desde > hasta or (hasta - desde).days >= self.max_dias[periodo]:
+            return Response({"detail": f"Rango inválido (máximo {self.max_dias[periodo]} días)."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        modelo, campo = agrupacion
+        qs = modelo.objects.filter(
+            periodo=periodo,
+            inicio__gte=medianoche(desde),
+            inicio__lt=medianoche(hasta + timedelta(days=1)),
+        )
+        if ids:
+            qs = qs.filter(**{f"{campo}_id__in": ids})
+        filas = [
+            {
+                "inicio": r["inicio"], "id": r[f"{campo}_id"], "nombre": r[f"{campo}__nombre"],
+                "cantidad": r["cantidad"], "monto": r["monto"], "ventas": r["ventas"],
+                "monto_deuda": r["monto_deuda"], "ventas_deuda": r["ventas_deuda"],
+                "monto_contado": r["monto"] - r["monto_deuda"],
+            }
+            for r in qs.order_by("inicio", f"{campo}_id").values(
+                "inicio", f"{campo}_id", f"{campo}__nombre",
+                "cantidad", "monto", "ventas", "monto_deuda", "ventas_deuda",
+            )
+        ]
+        return Response({
+            "periodo": params.get("periodo", "dia"),
+            "agrupar": campo,
+            "desde": desde,
+            "hasta": hasta,
+            "resultados": ResumenVentaSerializer(filas, many=True).data,
+        }, status=status.HTTP_200_OK)
+
+
+class ExportacionViewSet(viewsets.ViewSet):
+    """
+    GET /api/v1/exportar/<ventas|compras|kardex>/?formato=csv|ndjson[&desde=YYYY-MM-DD][&hasta=..][&producto=..][&gzip=1]
+
+    Descarga en streaming (StreamingHttpResponse): las filas se leen por bloques
+    con un cursor y se envían a medida que se generan (ver inventario/exportacion.py).
+    Requiere usuario autenticado.
+    """
+    permission_classes = [IsAuthenticated, RolePermission]
+    lookup_value_regex = "|".join(exportacion.CONJUNTOS)
+
+    tipos = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson; charset=utf-8"}
+
+    def retrieve(self, request, pk=None):
+        params = request.query_params
+        formato = params.get("formato", "csv")
+        gzip = params.get("gzip") in ("1", "true", "si")
+        try:
+            desde = date.fromisoformat(params["desde"]) if params.get("desde") else None
+            hasta = date.fromisoformat(params["hasta"]) if params.get("hasta") else None
+            productos = [int(x) for x in params.getlist("producto")]
+            bloques = exportacion.exportar(pk, formato, desde, hasta, productos, gzip=gzip)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        resp = StreamingHttpResponse(bloques, content_type="application/gzip" if gzip else self.tipos[formato])
+        archivo = exportacion.nombre_archivo(pk, formato, desde, hasta, gzip)
+        resp["Content-Disposition"] = f'attachment; filename="{archivo}"'
+        return resp
+
+
+class SugerenciaReposicionViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    GET /api/v1/reposicion/[?reponer=1]
+
+    Resultado del último ``python manage.py calcular_reposicion``.
+    Con reponer=1 solo los productos con cantidad sugerida mayor que cero.
+    """
+    permission_classes = [RolePermission]
+    serializer_class = SugerenciaReposicionSerializer
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = ["producto", "producto__categoria"]
+    ordering_fields = ["dias_cobertura", "venta_diaria", "cantidad_sugerida"]
+    ordering = ["producto__nombre"]
+
+    def get_queryset(self):
+        qs = SugerenciaReposicion.objects.select_related("producto")
+        if self.request.query_params.get("reponer") in ("1", "true", "si"):
+            qs = qs.filter(cantidad_sugerida__gt=0)
+        return qs
+
+
 # --- Bodega: solo definimos el ViewSet si el modelo existe ---
 if BodegaModel is not None:
     BodegaSerializer = get_bodega_serializer_or_none(BodegaModel)
@@ -108,6 +601,10 @@ def get_api_router() -> DefaultRouter:
     router.register(r'proveedores', ProveedorViewSet, basename='proveedor')
     router.register(r'productos', ProductoViewSet, basename='producto')
     router.register(r'movimientos', MovimientoViewSet, basename='movimiento')
+    router.register(r'ventas/sync', VentaSyncViewSet, basename='venta-sync')
+    router.register(r'reportes/ventas', ResumenVentasViewSet, basename='reporte-ventas')
+    router.register(r'exportar', ExportacionViewSet, basename='exportar')
+    router.register(r'reposicion', SugerenciaReposicionViewSet, basename='reposicion')
     if BodegaModel is not None:
         router.register(r'bodegas', BodegaViewSet, basename='bodega')
     return router
@@ -121,27 +618,13 @@ def producto_info(request):
     Retorna un fragmento HTML (partial) con la previsualización
     de un producto para POS: cantidad, precio y subtotal ANTES de agregar.
 
-    Busca por código EXACTO (codigo__iexact) o nombre (icontains).
-    Si tu modelo usa otro campo de precio (p. ej. 'precio_venta'), lo detecta.
+    Usa el índice en memoria (busqueda.indice): primero código exacto,
+    luego prefijo de código y coincidencias por nombre (sin tildes).
     """
     q = (request.GET.get("q") or "").strip()
-    p = None
-    precio_base = 0
-
-    if q:
-        p = (
-            Producto.objects.filter(Q(codigo__iexact=q) | Q(nombre__icontains=q))
-            .order_by("id")
-            .first()
-        )
-        if p:
-            # Detecta el campo de precio existente
-            if hasattr(p, "precio") and p.precio is not None:
-                precio_base = p.precio
-            elif hasattr(p, "precio_venta") and p.precio_venta is not None:
-                precio_base = p.precio_venta
-            else:
-                precio_base = 0
+    resultados = indice.buscar(q, limite=1) if q else []
+    p = resultados[0] if resultados else None
+    precio_base = (p["precio"] or 0) if p else 0
 
     # Render del partial con el producto (p) y el precio_base decidido
     return render(
@@ -149,3 +632,85 @@ def producto_info(request):
         "inventario/partials/producto_preview.html",
         {"p": p, "precio_base": precio_base},
     )
+
+
+def producto_buscar(request):
+    """
+    GET /api/producto-buscar/?q=coca&n=10
+    Variante JSON de producto_info: los N mejores resultados con su rank.
+    """
+    q = (request.GET.get("q") or "").strip()
+    try:
+        n = max(1, min(int(request.GET.get("n") or 10), 50))
+    except ValueError:
+        n = 10
+    return JsonResponse({"q": q, "resultados": indice.buscar(q, limite=n)})
+
+
+def stock_bajo_conteo(request):
+    """
+    GET /api/stock-bajo/conteo/ -> {"conteo": N}
+    Para el indicador del menú: COUNT sobre el índice parcial de stock_bajo.
+    """
+    response = JsonResponse({"conteo": Producto.objects.filter(stock_bajo=True).count()})
+    patch_cache_control(response, private=True, max_age=30)
+    return response
+
+
+# ============================================================
+# ==========  CATÁLOGO VERSIONADO PARA LAS CAJAS  ============
+# ============================================================
+@gzip_page
+def catalogo(request):
+    """
+    GET /api/catalogo/            -> catálogo completo (productos activos)
+    GET /api/catalogo/?since=<v>  -> solo cambios posteriores a la versión v
+
+    Responde 304 si la caja ya tiene esta versión (If-None-Match / If-Modified-Since);
+    en ese caso solo se consulta la fila del contador.
+    """
+    since = request.GET.get("since")
+    try:
+        since = int(since) if since not in (None, "") else None
+    except ValueError:
+        return JsonResponse({"since": "Debe ser un entero."}, status=400)
+
+    version, actualizado = catalogo_svc.version_actual()
+    etag = f'"catalogo-{version}-{"full" if since is None else since}"'
+    last_modified = int(actualizado.timestamp()) if actualizado else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        productos, bajas, completo = catalogo_svc.obtener(since)
+        response = JsonResponse({
+            "version": version,
+            "completo": completo,
+            "productos": productos,
+            "bajas": bajas,
+        })
+
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+# ============================================================
+# ======  EVENTOS DE STOCK / PRECIO (SERVER-SENT EVENTS)  ====
+# ============================================================
+def eventos(request):
+    """
+    GET /api/eventos/  (text/event-stream)
+
+    Empuja a la caja los cambios de stock, precio y activo de los productos
+    (ver inventario/eventos.py). Bajo WSGI cada conexión ocupa un hilo, por
+    eso se cierra tras eventos.DURACION segundos y EventSource reconecta con
+    Last-Event-ID sin perder eventos; con ASGI conviene /api/async/eventos/.
+    """
+    response = StreamingHttpResponse(
+        eventos_svc.flujo(eventos_svc.cursor_inicial(request)), content_type="text/event-stream"
+    )
+    response["X-Accel-Buffering"] = "no"  # nginx: no acumular el stream
+    patch_cache_control(response, no_cache=True)
+    return response
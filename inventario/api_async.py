@@ -0,0 +1,126 @@
+# inventario/api_async.py
+"""
+Versiones async de los endpoints de lectura que más usan las cajas:
+
+    GET /api/async/producto-info/?q=...        (preview del POS, HTML)
+    GET /api/async/producto-buscar/?q=...&n=   (búsqueda, JSON)
+    GET /api/async/stock-bajo/conteo/
+    GET /api/async/catalogo/[?since=<v>]
+    GET /api/async/eventos/                    (SSE de stock y precios)
+
+Responden lo mismo que sus pares de inventario/api.py, pero servidas por la
+app ASGI (backend/asgi.py, p. ej. ``uvicorn backend.asgi:application``) no
+ocupan un worker por petición: la búsqueda es en memoria y las pocas consultas
+(versión del catálogo, deltas, conteo) usan el ORM async de Django.
+
+El catálogo guarda en la caché (API async: aget / aset) el cuerpo JSON ya
+serializado, y su versión gzip, por versión y ``since``: mientras el catálogo
+no cambie, cada caja que lo pide cuesta solo la lectura del contador.
+
+Bajo WSGI también funcionan (Django las ejecuta con async_to_sync), pero sin
+ventaja; para comparar ambos caminos: ``python manage.py medir_asgi``.
+"""
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.utils.text import compress_string
+
+from .models import Producto
+from . import catalogo as catalogo_svc
+from . import eventos as eventos_svc
+from .busqueda import indice
+
+CATALOGO_TTL = 600  # segundos; la clave incluye la versión, así que nunca queda desactualizada
+
+
+async def producto_info(request):
+    """Como api.producto_info: fragmento HTML con el mejor resultado para ``q``."""
+    q = (request.GET.get("q") or "").strip()
+    resultados = await indice.abuscar(q, limite=1) if q else []
+    p = resultados[0] if resultados else None
+    precio_base = (p["precio"] or 0) if p else 0
+    # El partial solo usa el dict del índice: renderizarlo no toca la BD
+    return render(
+        request,
+        "inventario/partials/producto_preview.html",
+        {"p": p, "precio_base": precio_base},
+    )
+
+
+async def producto_buscar(request):
+    """Como api.producto_buscar: los N mejores resultados con su rank."""
+    q = (request.GET.get("q") or "").strip()
+    try:
+        n = max(1, min(int(request.GET.get("n") or 10), 50))
+    except ValueError:
+        n = 10
+    return JsonResponse({"q": q, "resultados": await indice.abuscar(q, limite=n)})
+
+
+async def stock_bajo_conteo(request):
+    """Como api.stock_bajo_conteo."""
+    response = JsonResponse({"conteo": await Producto.objects.filter(stock_bajo=True).acount()})
+    patch_cache_control(response, private=True, max_age=30)
+    return response
+
+
+def _acepta_gzip(request):
+    return "gzip" in request.headers.get("Accept-Encoding", "").lower()
+
+
+async def _cuerpo_catalogo(version, since, gzip):
+    """Bytes de la respuesta del catálogo (gzip si se pide), desde la caché si ya existen."""
+    clave = f"catalogo:{version}:{'full' if since is None else since}"
+    cuerpo = await cache.aget(clave + (":gz" if gzip else ""))
+    if cuerpo is not None:
+        return cuerpo
+    productos, bajas, completo = await catalogo_svc.aobtener(since)
+    crudo = json.dumps(
+        {"version": version, "completo": completo, "productos": productos, "bajas": bajas},
+        cls=DjangoJSONEncoder,
+    ).encode()
+    comprimido = compress_string(crudo)
+    await cache.aset_many({clave: crudo, clave + ":gz": comprimido}, CATALOGO_TTL)
+    return comprimido if gzip else crudo
+
+
+async def catalogo(request):
+    """Como api.catalogo (mismos ETag y 304), con el cuerpo servido desde la caché."""
+    since = request.GET.get("since")
+    try:
+        since = int(since) if since not in (None, "") else None
+    except ValueError:
+        return JsonResponse({"since": "Debe ser un entero."}, status=400)
+
+    version, actualizado = await catalogo_svc.aversion_actual()
+    etag = f'"catalogo-{version}-{"full" if since is None else since}"'
+    last_modified = int(actualizado.timestamp()) if actualizado else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        gzip = _acepta_gzip(request)
+        response = HttpResponse(await _cuerpo_catalogo(version, since, gzip), content_type="application/json")
+        if gzip:
+            response["Content-Encoding"] = "gzip"
+
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+async def eventos(request):
+    """Como api.eventos, sin ocupar un hilo por caja conectada."""
+    response = StreamingHttpResponse(
+        eventos_svc.aflujo(eventos_svc.cursor_inicial(request)), content_type="text/event-stream"
+    )
+    response["X-Accel-Buffering"] = "no"
+    patch_cache_control(response, no_cache=True)
+    return response
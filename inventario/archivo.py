@@ -0,0 +1,168 @@
+# inventario/archivo.py
+"""
+Archivo de periodos cerrados: tablas activas chicas para el POS.
+
+``python manage.py archivar --meses 12`` mueve, en lotes y con sus mismos ids:
+
+- Ventas cerradas (contado y deudas saldadas) con fecha anterior al corte, con
+  sus detalles y abonos -> VentaArchivada / DetalleVentaArchivada.
+- Todo el kardex anterior al corte -> MovimientoArchivado.
+
+Las deudas pendientes nunca se archivan. El stock, los costos y los resúmenes
+de ventas no cambian: solo se mueven filas (con las señales de detalle
+suspendidas). Antes de archivar se toma un SnapshotStock en el corte, así el
+stock a fechas posteriores no necesita leer el archivo.
+
+Lecturas que abarcan ambos lados y consultan el archivo solo si el rango pasa
+por debajo del corte (PeriodoArchivo.corte()): stock a fecha (historico),
+kardex por producto, exportaciones, reconstrucción de resúmenes y el detalle
+de una venta.
+
+Los periodos se restauran en orden inverso (el último primero) con
+``python manage.py archivar --restaurar``.
+"""
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    Venta, DetalleVenta, AbonoDeuda, MovimientoStock, SnapshotStock,
+    PeriodoArchivo, VentaArchivada, DetalleVentaArchivada, MovimientoArchivado,
+)
+from .ledger import InventoryLedger
+from . import historico
+
+LOTE = 2000
+
+_CAMPOS_VENTA = ["id", "cliente_id", "fecha", "observacion", "es_deuda", "saldada",
+                 "clave_idempotencia", "total", "items", "abonado"]
+_CAMPOS_DETALLE = ["id", "venta_id", "producto_id", "cantidad", "precio_unitario", "costo_fifo", "costo_promedio"]
+_CAMPOS_MOVIMIENTO = ["id", "producto_id", "tipo", "cantidad", "motivo", "fecha", "referencia",
+                      "costo_fifo", "costo_promedio"]
+
+
+def _lotes(queryset, lote):
+    """Ids de ``queryset`` de a ``lote``; cada lote se procesa y se borra antes del siguiente."""
+    while True:
+        ids = list(queryset.order_by("pk").values_list("pk", flat=True)[:lote])
+        if not ids:
+            return
+        yield ids
+
+
+# ---------------- archivar ----------------
+
+def _archivar_ventas(periodo, ids):
+    ventas = list(Venta.objects.filter(pk__in=ids).values(*_CAMPOS_VENTA))
+    abonos = {}
+    for venta_id, monto, fecha, observacion in (AbonoDeuda.objects.filter(venta_id__in=ids)
+                                                 .order_by("fecha", "id")
+                                                 .values_list("venta_id", "monto", "fecha", "observacion")):
+        abonos.setdefault(venta_id, []).append(
+            {"monto": str(monto), "fecha": fecha.isoformat(), "observacion": observacion}
+        )
+    VentaArchivada.objects.bulk_create([
+        VentaArchivada(periodo=periodo, abonos=abonos.get(v["id"], []), **v) for v in ventas
+    ])
+    detalles = DetalleVentaArchivada.objects.bulk_create(
+        [DetalleVentaArchivada(**d) for d in DetalleVenta.objects.filter(venta_id__in=ids).values(*_CAMPOS_DETALLE)],
+        batch_size=1000,
+    )
+    # El stock no cambia: solo se mueven filas (borra en cascada detalles y abonos)
+    with InventoryLedger.suspendido():
+        Venta.objects.filter(pk__in=ids).delete()
+    return len(ventas), len(detalles)
+
+
+def _archivar_movimientos(periodo, ids):
+    filas = MovimientoArchivado.objects.bulk_create(
+        [MovimientoArchivado(periodo=periodo, **m)
+         for m in MovimientoStock.objects.filter(pk__in=ids).values(*_CAMPOS_MOVIMIENTO)],
+        batch_size=1000,
+    )
+    MovimientoStock.objects.filter(pk__in=ids).delete()
+    return len(filas)
+
+
+def archivar(hasta, lote=LOTE):
+    """
+    Archiva ventas cerradas y movimientos anteriores al día ``hasta`` (date,
+    exclusivo). Si un archivado anterior con el mismo corte quedó a medias, lo
+    continúa. Devuelve el PeriodoArchivo.
+    """
+    limite = historico.medianoche(hasta)
+    if limite > historico.ultima_medianoche():
+        raise ValidationError("Solo se pueden archivar días ya cerrados.")
+    corte = PeriodoArchivo.corte()
+    periodo = PeriodoArchivo.objects.filter(hasta=limite, restaurado__isnull=True).first()
+    if periodo is None:
+        if corte is not None and limite <= corte:
+            raise ValidationError(f"Ya está archivado hasta el {timezone.localtime(corte):%d-%m-%Y}.")
+        PeriodoArchivo.objects.filter(hasta=limite).delete()  # restaurado antes con el mismo corte
+        if not SnapshotStock.objects.filter(fecha=limite).exists():
+            historico.tomar_snapshot(limite)
+        periodo = PeriodoArchivo.objects.create(desde=corte, hasta=limite)
+
+    ventas = Venta.objects.filter(fecha__lt=limite).filter(Q(es_deuda=False) | Q(saldada=True))
+    for ids in _lotes(ventas, lote):
+        with transaction.atomic():
+            n_ventas, n_detalles = _archivar_ventas(periodo, ids)
+            PeriodoArchivo.objects.filter(pk=periodo.pk).update(
+                ventas=periodo.ventas + n_ventas, detalles=periodo.detalles + n_detalles,
+            )
+            periodo.ventas += n_ventas
+            periodo.detalles += n_detalles
+
+    for ids in _lotes(MovimientoStock.objects.filter(fecha__lt=limite), lote):
+        with transaction.atomic():
+            n = _archivar_movimientos(periodo, ids)
+            PeriodoArchivo.objects.filter(pk=periodo.pk).update(movimientos=periodo.movimientos + n)
+            periodo.movimientos += n
+    return periodo
+
+
+# ---------------- restaurar ----------------
+
+def _abonos(venta_id, abonos):
+    return [
+        AbonoDeuda(venta_id=venta_id, monto=Decimal(a["monto"]),
+                   fecha=parse_datetime(a["fecha"]), observacion=a.get("observacion", ""))
+        for a in abonos
+    ]
+
+
+def restaurar(lote=LOTE):
+    """
+    Devuelve a las tablas activas el último periodo archivado (bulk_create:
+    no mueve stock ni saldos). Devuelve el PeriodoArchivo restaurado.
+    """
+    periodo = PeriodoArchivo.objects.filter(restaurado__isnull=True).order_by("-hasta").first()
+    if periodo is None:
+        raise ValidationError("No hay periodos archivados.")
+
+    for ids in _lotes(periodo.ventas_archivadas.all(), lote):
+        with transaction.atomic():
+            ventas = list(VentaArchivada.objects.filter(pk__in=ids).values(*_CAMPOS_VENTA, "abonos"))
+            Venta.objects.bulk_create([Venta(**{c: v[c] for c in _CAMPOS_VENTA}) for v in ventas])
+            DetalleVenta.objects.bulk_create(
+                [DetalleVenta(**d) for d in DetalleVentaArchivada.objects.filter(venta_id__in=ids).values(*_CAMPOS_DETALLE)],
+                batch_size=1000,
+            )
+            AbonoDeuda.objects.bulk_create([a for v in ventas for a in _abonos(v["id"], v["abonos"])])
+            VentaArchivada.objects.filter(pk__in=ids).delete()
+
+    for ids in _lotes(periodo.movimientos_archivados.all(), lote):
+        with transaction.atomic():
+            MovimientoStock.objects.bulk_create(
+                [MovimientoStock(**m) for m in MovimientoArchivado.objects.filter(pk__in=ids).values(*_CAMPOS_MOVIMIENTO)],
+                batch_size=1000,
+            )
+            MovimientoArchivado.objects.filter(pk__in=ids).delete()
+
+    periodo.restaurado = timezone.now()
+    periodo.save(update_fields=["restaurado"])
+    return periodo
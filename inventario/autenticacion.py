@@ -0,0 +1,42 @@
+# inventario/autenticacion.py
+"""
+TokenAuthentication con caché: las cajas autentican cada llamada a la API con
+su token, y sin caché cada una es un SELECT de Token + User.
+
+La caché guarda (usuario, token) bajo un hash del token durante TOKEN_TTL. Las
+señales de inventario/signals.py la invalidan al borrar o cambiar el token y
+al guardar o borrar el usuario (p. ej. is_active / is_superuser). Igual que
+los roles (inventario/permissions.py), con la caché de memoria local la
+invalidación es por proceso.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_TTL = 300  # segundos
+
+
+def _clave(key):
+    return "token:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidar_tokens(keys):
+    cache.delete_many([_clave(k) for k in keys])
+
+
+class TokenCacheAuthentication(TokenAuthentication):
+    """``Authorization: Token <clave>`` con usuario y token en caché."""
+
+    def authenticate_credentials(self, key):
+        guardado = cache.get(_clave(key))
+        if guardado is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(_clave(key), (user, token), TOKEN_TTL)
+            return user, token
+        user, token = guardado
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return user, token
@@ -0,0 +1,296 @@
+# inventario/busqueda.py
+"""
+Índice en memoria para la búsqueda de productos del POS.
+
+Evita el full scan de ``codigo__iexact | nombre__icontains`` en cada tecla:
+las búsquedas se resuelven sin ir a la BD, con bisect sobre códigos y nombres
+ordenados y, si faltan resultados, una sola pasada de str.find sobre los
+nombres concatenados en orden alfabético, cortando al juntar los N pedidos.
+
+Orden de los resultados (rank):
+    0  código exacto
+    1  código que empieza con q (en orden de código)
+    2  nombre que empieza con q
+    3  cada palabra de q es prefijo de alguna palabra del nombre
+    4  q aparece dentro del nombre
+Dentro de los rank 2-4 el orden es alfabético.
+
+Nombres y consultas se comparan sin tildes, mayúsculas ni signos
+("limon" encuentra "Limón", "coca cola" encuentra "Coca-Cola").
+
+El índice se mantiene con las señales de Producto (en on_commit) y, para
+ver cambios hechos por otros procesos, cada ``INVENTARIO_BUSQUEDA_REVALIDAR``
+segundos compara la versión del catálogo y aplica solo el delta.
+
+Las vistas async (inventario/api_async.py) usan ``abuscar()``: la búsqueda es
+la misma y la revalidación usa el ORM async, sin bloquear el event loop.
+"""
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import catalogo
+from .models import Producto
+
+_NO_PALABRA = re.compile(r"[^\w]+")
+# Sobre este tamaño un delta se aplica reconstruyendo el índice: insertar de a
+# uno en las listas ordenadas es O(n) por producto (p. ej. tras una importación)
+DELTA_MAXIMO = 500
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes y con espacios simples: ' Limón  Ñam' -> 'limon nam'."""
+    texto = unicodedata.normalize("NFKD", str(texto or ""))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+    return " ".join(texto.split())
+
+
+def normalizar_nombre(texto):
+    """Como normalizar(), pero los signos separan palabras: 'Coca-Cola' -> 'coca cola'."""
+    return " ".join(_NO_PALABRA.sub(" ", normalizar(texto)).split())
+
+
+class IndiceProductos:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._productos = {}   # pk -> dict con CAMPOS_CATALOGO
+        self._nombres = {}     # pk -> nombre normalizado
+        self._codigos = []     # [(codigo_normalizado, pk)] ordenada
+        self._orden = []       # [(nombre_normalizado, pk)] ordenada
+        self._texto = None     # nombres en el orden de _orden, uno por línea (None = reconstruir)
+        self._inicios = []     # posición en _texto donde empieza cada nombre
+        self._version = None
+        self._revisado = 0.0
+
+    # ---------------- mantenimiento ----------------
+
+    def cargar(self):
+        """(Re)construye el índice completo desde la BD."""
+        productos, _bajas, _completo = catalogo.obtener()
+        version, _ = catalogo.version_actual()
+        with self._lock:
+            self._productos, self._nombres = {}, {}
+            self._codigos, self._orden = [], []
+            for p in productos:
+                pk = p["id"]
+                self._productos[pk] = p
+                self._nombres[pk] = normalizar_nombre(p["nombre"])
+                self._codigos.append((normalizar(p["codigo"]), pk))
+                self._orden.append((self._nombres[pk], pk))
+            self._codigos.sort()
+            self._orden.sort()
+            self._texto = None
+            self._version = version
+            self._revisado = time.monotonic()
+
+    def _quitar(self, pk):
+        p = self._productos.pop(pk, None)
+        if p is None:
+            return
+        nombre = self._nombres.pop(pk)
+        _borrar_ordenado(self._codigos, (normalizar(p["codigo"]), pk))
+        _borrar_ordenado(self._orden, (nombre, pk))
+        self._texto = None
+
+    def actualizar(self, p):
+        """Inserta o reemplaza un producto (dict con CAMPOS_CATALOGO)."""
+        with self._lock:
+            if self._version is None:
+                return  # aún no cargado: se leerá completo en la primera búsqueda
+            self._quitar(p["id"])
+            if not p.get("activo", True):
+                return
+            pk = p["id"]
+            self._productos[pk] = p
+            self._nombres[pk] = normalizar_nombre(p["nombre"])
+            insort(self._codigos, (normalizar(p["codigo"]), pk))
+            insort(self._orden, (self._nombres[pk], pk))
+            self._texto = None
+
+    def eliminar(self, pk):
+        with self._lock:
+            self._quitar(pk)
+
+    def recargar(self, ids):
+        """Relee de la BD los productos indicados (tras escrituras masivas)."""
+        if self._version is None:
+            return
+        ids = set(ids)
+        if len(ids) > DELTA_MAXIMO:
+            self.invalidar()
+            return
+        filas = Producto.objects.filter(pk__in=ids).values(*catalogo.CAMPOS_CATALOGO)
+        for p in filas:
+            ids.discard(p["id"])
+            self.actualizar(p)
+        for pk in ids:
+            self.eliminar(pk)
+
+    def invalidar(self):
+        with self._lock:
+            self._version = None
+
+    def _vencido(self):
+        cada = getattr(settings, "INVENTARIO_BUSQUEDA_REVALIDAR", 5)
+        return time.monotonic() - self._revisado >= cada
+
+    def _revalidar(self):
+        """Carga inicial o, cada cierto tiempo, aplica el delta del catálogo."""
+        if self._version is None:
+            self.cargar()
+            return
+        if not self._vencido():
+            return
+        version, _ = catalogo.version_actual()
+        with self._lock:
+            self._revisado = time.monotonic()
+            if version == self._version:
+                return
+            productos, bajas, _completo = catalogo.obtener(since=self._version)
+            if len(productos) + len(bajas) > DELTA_MAXIMO:
+                self.cargar()
+                return
+            for pk in bajas:
+                self._quitar(pk)
+            self._version = version
+        for p in productos:
+            self.actualizar(p)
+
+    async def _arevalidar(self):
+        """
+        _revalidar() para el event loop. El lock no se retiene entre awaits
+        (todas las corrutinas corren en el mismo hilo): el delta se aplica solo
+        si nadie cambió la versión del índice mientras se leía.
+        """
+        if self._version is None:
+            # La carga completa es rara y larga: va en un hilo (y una sola vez)
+            await sync_to_async(self._revalidar)()
+            return
+        if not self._vencido():
+            return
+        self._revisado = time.monotonic()  # las demás corrutinas no repiten la consulta
+        desde = self._version
+        version, _ = await catalogo.aversion_actual()
+        if version == desde:
+            return
+        productos, bajas, _completo = await catalogo.aobtener(since=desde)
+        if len(productos) + len(bajas) > DELTA_MAXIMO:
+            self.invalidar()
+            await sync_to_async(self._revalidar)()
+            return
+        with self._lock:
+            if self._version != desde:
+                return
+            for pk in bajas:
+                self._quitar(pk)
+            self._version = version
+        for p in productos:
+            self.actualizar(p)
+
+    def _preparar_texto(self):
+        # Cada nombre va precedido de un espacio: " t" calza con cualquier inicio de palabra
+        if self._texto is not None:
+            return
+        inicios, pos = [], 1
+        for nombre, _pk in self._orden:
+            inicios.append(pos)
+            pos += len(nombre) + 2
+        self._texto = "\n" + "\n".join(" " + nombre for nombre, _pk in self._orden) + "\n"
+        self._inicios = inicios
+
+    def _escanear(self, guia, tokens, frase, cupo, vistos):
+        """
+        Una sola pasada (en orden alfabético) por los nombres que contienen ``guia``.
+        Devuelve (rank3, rank4): pks cuyas palabras calzan con todos los tokens,
+        y pks que solo contienen la frase completa. Corta al llenar rank3.
+        """
+        rank3, rank4 = [], []
+        texto, pos = self._texto, 0
+        while len(rank3) < cupo:
+            pos = texto.find(guia, pos)
+            if pos < 0:
+                break
+            i = bisect_right(self._inicios, pos) - 1
+            nombre, pk = self._orden[i]
+            pos = self._inicios[i] + len(nombre) + 1  # salto de línea al final de este nombre
+            if pk in vistos:
+                continue
+            linea = " " + nombre
+            if all((" " + t) in linea for t in tokens):
+                rank3.append(pk)
+            elif frase in nombre and len(rank4) < cupo:
+                rank4.append(pk)
+        return rank3, rank4
+
+    # ---------------- consulta ----------------
+
+    def buscar(self, q, limite=10):
+        """Devuelve hasta ``limite`` productos (dicts) ordenados por rank."""
+        codigo_q, nombre_q = normalizar(q), normalizar_nombre(q)
+        if not codigo_q or limite <= 0:
+            return []
+        self._revalidar()
+        return self._consultar(codigo_q, nombre_q, limite)
+
+    async def abuscar(self, q, limite=10):
+        """buscar() para vistas async."""
+        codigo_q, nombre_q = normalizar(q), normalizar_nombre(q)
+        if not codigo_q or limite <= 0:
+            return []
+        await self._arevalidar()
+        return self._consultar(codigo_q, nombre_q, limite)
+
+    def _consultar(self, codigo_q, nombre_q, limite):
+        with self._lock:
+            resultados, vistos = [], set()
+
+            def tomar(pks, rank):
+                for pk in pks:
+                    if pk not in vistos and len(resultados) < limite:
+                        vistos.add(pk)
+                        resultados.append((rank, pk))
+
+            # 0/1: código exacto y luego prefijo (bisect sobre códigos ordenados)
+            i = bisect_left(self._codigos, (codigo_q,))
+            while i < len(self._codigos) and len(resultados) < limite:
+                codigo, pk = self._codigos[i]
+                if not codigo.startswith(codigo_q):
+                    break
+                tomar([pk], 0 if codigo == codigo_q else 1)
+                i += 1
+
+            # 2: nombre que empieza con q (bisect sobre nombres ordenados)
+            i = bisect_left(self._orden, (nombre_q,))
+            while nombre_q and i < len(self._orden) and len(resultados) < limite:
+                nombre, pk = self._orden[i]
+                if not nombre.startswith(nombre_q):
+                    break
+                tomar([pk], 2)
+                i += 1
+
+            # 3/4: una pasada guiada por la palabra más selectiva de q
+            if nombre_q and len(resultados) < limite:
+                self._preparar_texto()
+                tokens = nombre_q.split()
+                guia = tokens[0] if len(tokens) == 1 else min(tokens, key=self._texto.count)
+                rank3, rank4 = self._escanear(guia, tokens, nombre_q, limite - len(resultados), vistos)
+                tomar(rank3, 3)
+                tomar(rank4, 4)
+
+            return [dict(self._productos[pk], rank=rank) for rank, pk in resultados]
+
+
+def _borrar_ordenado(lista, item):
+    i = bisect_left(lista, item)
+    if i < len(lista) and lista[i] == item:
+        del lista[i]
+
+
+# Índice del proceso (cada worker mantiene el suyo)
+indice = IndiceProductos()
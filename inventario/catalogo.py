@@ -0,0 +1,117 @@
+# inventario/catalogo.py
+"""
+Catálogo de productos versionado para las cajas (POS).
+
+Cada cambio de un producto le asigna la siguiente versión del contador
+'catalogo'. Las cajas guardan una copia local y piden solo lo que cambió:
+
+    GET /api/catalogo/             -> catálogo completo (productos activos)
+    GET /api/catalogo/?since=<v>   -> productos con version > v + bajas
+
+El UPDATE del contador bloquea su fila hasta el commit, por lo que las
+versiones se asignan en el mismo orden en que se confirman las transacciones
+y una caja nunca se salta un cambio.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import ContadorVersion, Producto, CatalogoBaja
+
+CATALOGO = "catalogo"
+
+# Campos que viajan a las cajas. Un save(update_fields=[...]) que no toca
+# ninguno de ellos (p. ej. solo 'stock') no cambia la versión.
+CAMPOS_CATALOGO = ("id", "codigo", "nombre", "precio", "unidad", "activo", "categoria_id")
+
+# Se envía tras escrituras masivas de productos (queryset.update / bulk_*),
+# que no disparan pre_save/post_save. kwargs: ids (lista de pk).
+productos_modificados = Signal()
+
+
+def siguiente_version(nombre=CATALOGO, n=1):
+    """Incrementa atómicamente el contador y devuelve el nuevo valor."""
+    with transaction.atomic():
+        qs = ContadorVersion.objects.filter(nombre=nombre)
+        if not qs.update(valor=F("valor") + n, actualizado=timezone.now()):
+            ContadorVersion.objects.get_or_create(nombre=nombre)
+            qs.update(valor=F("valor") + n, actualizado=timezone.now())
+        return qs.values_list("valor", flat=True).get()
+
+
+def _contador(nombre):
+    return ContadorVersion.objects.filter(nombre=nombre).values_list("valor", "actualizado")
+
+
+def version_actual(nombre=CATALOGO):
+    """(valor, actualizado) del contador, o (0, None) si aún no existe."""
+    return _contador(nombre).first() or (0, None)
+
+
+async def aversion_actual(nombre=CATALOGO):
+    """version_actual() para vistas async (ORM async de Django)."""
+    return await _contador(nombre).afirst() or (0, None)
+
+
+def marcar_cambios(ids):
+    """
+    Asigna una nueva versión a productos escritos en masa y avisa a los
+    suscriptores de productos_modificados. Devuelve la versión asignada.
+    """
+    ids = list(ids)
+    if not ids:
+        return None
+    with transaction.atomic():
+        version = siguiente_version()
+        Producto.objects.filter(pk__in=ids).update(version=version)
+    productos_modificados.send(sender=Producto, ids=ids)
+    return version
+
+
+def registrar_baja(producto_id):
+    CatalogoBaja.objects.create(producto_id=producto_id, version=siguiente_version())
+
+
+def afecta_catalogo(update_fields):
+    """True si un save() con esos update_fields cambia datos del catálogo."""
+    if update_fields is None:
+        return True
+    return bool(set(update_fields) & set(CAMPOS_CATALOGO))
+
+
+def _consultas(since):
+    """(productos, bajas) como querysets sin evaluar; bajas es None sin ``since``."""
+    if since is None:
+        return Producto.objects.filter(activo=True).order_by("nombre").values(*CAMPOS_CATALOGO), None
+    return (
+        Producto.objects.filter(version__gt=since).values(*CAMPOS_CATALOGO),
+        CatalogoBaja.objects.filter(version__gt=since).values_list("producto_id", flat=True),
+    )
+
+
+def _separar(cambiados, eliminados):
+    productos = [p for p in cambiados if p["activo"]]
+    bajas = [p["id"] for p in cambiados if not p["activo"]] + list(eliminados)
+    return productos, bajas, False
+
+
+def obtener(since=None):
+    """
+    Devuelve (productos, bajas, completo).
+    - Sin ``since``: todos los productos activos.
+    - Con ``since``: productos cambiados después de esa versión; los que pasaron a
+      inactivos y los eliminados se informan solo por id en ``bajas``.
+    """
+    productos, bajas = _consultas(since)
+    if bajas is None:
+        return list(productos), [], True
+    return _separar(list(productos), list(bajas))
+
+
+async def aobtener(since=None):
+    """obtener() para vistas async: mismas consultas con el ORM async."""
+    productos, bajas = _consultas(since)
+    if bajas is None:
+        return [p async for p in productos], [], True
+    return _separar([p async for p in productos], [pk async for pk in bajas])
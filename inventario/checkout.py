@@ -0,0 +1,84 @@
+# inventario/checkout.py
+"""
+Registro de ventas del POS (contado y deuda) en lote.
+
+Todas las líneas del carrito se procesan con un número constante de consultas,
+sin importar el tamaño de la boleta:
+
+1. SELECT ... FOR UPDATE de todos los productos del carrito (una sola consulta).
+2. INSERT de la Venta (con su total e items ya calculados).
+3. UPDATE set-based del stock, costeo FIFO/promedio y bulk_create del kardex
+   (vía InventoryLedger).
+4. bulk_create de los DetalleVenta, con el costo de lo vendido de cada línea.
+5. Resúmenes de ventas por hora/día (ver inventario/resumenes.py).
+
+bulk_create no dispara post_save, por lo que las señales de
+``inventario/signals.py`` no vuelven a descontar el stock de estas líneas.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Venta, DetalleVenta
+from .ledger import InventoryLedger, Delta, StockInsuficiente  # noqa: F401 (re-export)
+from . import totales, resumenes
+
+
+def registrar_venta(lineas, *, cliente=None, es_deuda=False, observacion="", fecha=None, clave=None):
+    """
+    Registra una venta completa y descuenta su stock.
+
+    - ``lineas``: lista de tuplas (producto_id, cantidad, precio_unitario).
+    - ``es_deuda``: True para ventas fiadas (quedan con saldada=False).
+    - ``clave``: clave de idempotencia enviada por la caja (opcional, única).
+
+    Devuelve la Venta creada. Si falta stock lanza StockInsuficiente y
+    no se escribe nada (todo ocurre dentro de la misma transacción).
+    """
+    if not lineas:
+        raise ValidationError("Agrega al menos un ítem válido.")
+
+    fecha = fecha or timezone.now()
+    motivo = "Venta a Deuda" if es_deuda else "Venta"
+    total, items = totales.totales(lineas)
+
+    with transaction.atomic():
+        netos = {}
+        for pid, cant, _precio in lineas:
+            netos[pid] = netos.get(pid, 0) - cant
+        productos = InventoryLedger.bloquear(netos.keys())
+        InventoryLedger.validar(productos, netos)
+
+        venta = Venta.objects.create(
+            cliente=cliente,
+            fecha=fecha,
+            observacion=observacion or "",
+            es_deuda=es_deuda,
+            saldada=not es_deuda,
+            clave_idempotencia=clave or None,
+            total=total,
+            items=items,
+        )
+
+        referencia = f"Venta#{venta.id}"
+        movimientos = iter(InventoryLedger.registrar(
+            [Delta(pid, -cant, motivo, referencia) for pid, cant, _precio in lineas],
+            fecha=fecha,
+            productos=productos,
+        ))
+
+        detalles = []
+        for pid, cant, precio in lineas:
+            mov = next(movimientos) if cant else None  # registrar() omite los deltas en cero
+            detalles.append(DetalleVenta(
+                venta=venta, producto_id=pid, cantidad=cant, precio_unitario=precio,
+                costo_fifo=mov.costo_fifo if mov else 0,
+                costo_promedio=mov.costo_promedio if mov else 0,
+            ))
+        DetalleVenta.objects.bulk_create(detalles)
+
+        resumenes.aplicar(fecha, es_deuda, [
+            (pid, productos[pid].categoria_id, cant, precio) for pid, cant, precio in lineas
+        ])
+
+    return venta
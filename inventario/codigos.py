@@ -0,0 +1,84 @@
+# inventario/codigos.py
+"""
+Asignación de códigos (SKU) de producto con una secuencia en BD.
+
+Reemplaza el antiguo _siguiente_codigo(), que leía todos los códigos del
+catálogo para calcular el máximo y podía entregar el mismo código a dos
+usuarios a la vez. Aquí cada asignación es un UPDATE ... SET ultimo = ultimo + n
+sobre la fila del prefijo (bloqueada hasta el commit), es decir O(1).
+
+- Prefijo por categoría: Categoria.prefijo_codigo ('FRU' -> FRU001, FRU002...).
+- Bloques: asignar_codigos(500) reserva 500 códigos con una sola consulta
+  (importaciones masivas).
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .models import SecuenciaCodigo, Producto
+
+
+def prefijo_de(categoria=None):
+    return (getattr(categoria, "prefijo_codigo", "") or "").strip().upper()
+
+
+def _maximo_existente(prefijo):
+    """
+    Mayor correlativo ya usado con ese prefijo. Solo se ejecuta una vez,
+    al crear la fila de la secuencia, para continuar la numeración existente.
+    """
+    max_n = 0
+    for c in Producto.objects.filter(codigo__startswith=prefijo).values_list("codigo", flat=True).iterator():
+        try:
+            n = int(str(c).strip()[len(prefijo):])
+        except (TypeError, ValueError):
+            continue
+        max_n = max(max_n, n)
+    return max_n
+
+
+def _secuencia(prefijo):
+    seq, _ = SecuenciaCodigo.objects.get_or_create(
+        prefijo=prefijo, defaults={"ultimo": _maximo_existente(prefijo)}
+    )
+    return seq
+
+
+def _formatear(prefijo, n, relleno):
+    return f"{prefijo}{n:0{relleno}d}"
+
+
+def proximo_codigo(categoria=None):
+    """Código que se asignaría ahora (vista previa: no reserva ni crea la secuencia)."""
+    prefijo = prefijo_de(categoria)
+    seq = SecuenciaCodigo.objects.filter(prefijo=prefijo).first()
+    if seq is None:
+        relleno = SecuenciaCodigo._meta.get_field("relleno").default
+        return _formatear(prefijo, _maximo_existente(prefijo) + 1, relleno)
+    return _formatear(prefijo, seq.ultimo + 1, seq.relleno)
+
+
+def asignar_codigos(n=1, categoria=None, ocupados=()):
+    """
+    Reserva ``n`` códigos consecutivos y los devuelve en una lista.
+    Si alguno ya fue usado a mano (p. ej. vía API) o está en ``ocupados``
+    (códigos aún sin guardar, p. ej. los de un archivo que se importa), se
+    descarta y se reservan más.
+    """
+    prefijo = prefijo_de(categoria)
+    codigos = []
+    with transaction.atomic():
+        qs = SecuenciaCodigo.objects.filter(prefijo=prefijo)
+        while len(codigos) < n:
+            faltan = n - len(codigos)
+            if not qs.update(ultimo=F("ultimo") + faltan):
+                _secuencia(prefijo)
+                qs.update(ultimo=F("ultimo") + faltan)
+            ultimo, relleno = qs.values_list("ultimo", "relleno").get()
+            bloque = [_formatear(prefijo, k, relleno) for k in range(ultimo - faltan + 1, ultimo + 1)]
+            usados = set(Producto.objects.filter(codigo__in=bloque).values_list("codigo", flat=True))
+            codigos.extend(c for c in bloque if c not in usados and c not in ocupados)
+    return codigos
+
+
+def asignar_codigo(categoria=None):
+    return asignar_codigos(1, categoria)[0]
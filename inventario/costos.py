@@ -0,0 +1,129 @@
+# inventario/costos.py
+"""
+Costeo de inventario incremental: capas FIFO y costo promedio ponderado.
+
+InventoryLedger.registrar() llama a aplicar() con los mismos deltas que mueven
+el stock y dentro de la misma transacción, así el costo nunca se recalcula
+recorriendo el historial:
+
+- Entrada: abre una CapaCosto a su costo unitario (el de la compra; si el delta
+  no trae costo, p. ej. un ajuste manual, al costo promedio vigente) y recalcula
+  el promedio = (cantidad · promedio + q · costo) / (cantidad + q).
+- Salida: consume las capas abiertas más antiguas, partiendo por las del mismo
+  documento (un reverso de compra retira su propia capa). Lo que no alcance a
+  cubrirse con capas (stock previo al costeo, stock negativo) se valora al promedio.
+
+Cada MovimientoStock y cada DetalleVenta guardan su costo FIFO y promedio, y
+CostoProducto mantiene el valor del inventario: la valorización y el costo de
+lo vendido son lecturas.
+
+Consultas por llamada: un SELECT de CostoProducto, uno de capas abiertas (solo
+si hay salidas), un INSERT de capas nuevas, un UPDATE de las capas consumidas
+y un upsert de CostoProducto.
+
+Cambiar a mano el costo_unitario de una compra ya registrada no revalúa sus capas.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from .models import CapaCosto, CostoProducto
+from .totales import CENTAVO
+
+# Costo total de un movimiento según cada método
+Costo = namedtuple("Costo", ["fifo", "promedio"])
+
+_CERO = Decimal("0")
+_DIEZMILESIMO = Decimal("0.0001")
+
+
+def _consumir(capas, cantidad, referencia):
+    """
+    Descuenta ``cantidad`` de ``capas`` (ordenadas por antigüedad), primero las
+    de la misma ``referencia``. Devuelve (costo, cantidad_sin_capa, capas_tocadas).
+    """
+    propias = [c for c in capas if referencia and c.referencia == referencia]
+    resto = [c for c in capas if not (referencia and c.referencia == referencia)]
+    costo, falta, tocadas = _CERO, cantidad, []
+    for capa in propias + resto:
+        if falta <= 0:
+            break
+        if capa.restante <= 0:
+            continue
+        toma = min(capa.restante, falta)
+        capa.restante -= toma
+        costo += toma * capa.costo_unitario
+        falta -= toma
+        tocadas.append(capa)
+    return costo, falta, tocadas
+
+
+def aplicar(deltas, fecha):
+    """
+    Actualiza capas FIFO y costo promedio con ``deltas`` (Delta con cantidad != 0).
+    Devuelve una lista de Costo alineada con ``deltas``.
+    """
+    ids = {d.producto_id for d in deltas}
+    estados = CostoProducto.objects.select_for_update().in_bulk(list(ids))
+    for pid in ids:
+        estados.setdefault(pid, CostoProducto(producto_id=pid))
+
+    capas = {pid: [] for pid in ids}
+    salen = {d.producto_id for d in deltas if d.cantidad < 0}
+    if salen:
+        abiertas = (CapaCosto.objects.select_for_update()
+                    .filter(producto_id__in=salen, restante__gt=0)
+                    .order_by("fecha", "id"))
+        for capa in abiertas:
+            capas[capa.producto_id].append(capa)
+
+    nuevas, consumidas, resultado = [], {}, []
+    for d in deltas:
+        estado = estados[d.producto_id]
+        cantidad = abs(d.cantidad)
+
+        if d.cantidad > 0:
+            unitario = Decimal(estado.costo_promedio if d.costo_unitario is None else d.costo_unitario)
+            capa = CapaCosto(
+                producto_id=d.producto_id, fecha=fecha, cantidad=cantidad, restante=cantidad,
+                costo_unitario=unitario.quantize(_DIEZMILESIMO), referencia=d.referencia or "",
+            )
+            nuevas.append(capa)
+            capas[d.producto_id].append(capa)
+            valor = cantidad * capa.costo_unitario
+            if estado.cantidad > 0:
+                estado.costo_promedio = (
+                    (estado.cantidad * estado.costo_promedio + valor) / (estado.cantidad + cantidad)
+                ).quantize(_DIEZMILESIMO)
+            else:
+                estado.costo_promedio = capa.costo_unitario
+            estado.cantidad += cantidad
+            estado.valor_fifo += valor
+            resultado.append(Costo(valor.quantize(CENTAVO), valor.quantize(CENTAVO)))
+        else:
+            de_capas, sin_capa, tocadas = _consumir(capas[d.producto_id], cantidad, d.referencia)
+            consumidas.update((c.pk, c) for c in tocadas if c.pk)
+            fifo = de_capas + sin_capa * estado.costo_promedio
+            promedio = cantidad * estado.costo_promedio
+            estado.cantidad -= cantidad
+            estado.valor_fifo -= de_capas
+            resultado.append(Costo(fifo.quantize(CENTAVO), promedio.quantize(CENTAVO)))
+
+    if nuevas:
+        CapaCosto.objects.bulk_create(nuevas)
+    if consumidas:
+        CapaCosto.objects.bulk_update(list(consumidas.values()), ["restante"], batch_size=500)
+    for estado in estados.values():
+        estado.valor_fifo = estado.valor_fifo.quantize(_DIEZMILESIMO)
+    CostoProducto.objects.bulk_create(
+        list(estados.values()),
+        update_conflicts=True, unique_fields=["producto"],
+        update_fields=["cantidad", "costo_promedio", "valor_fifo", "actualizado"],
+    )
+    return resultado
+
+
+def unitario(costo_total, cantidad):
+    """Costo unitario de una línea ya costeada (para reponerla al mismo costo)."""
+    if not cantidad:
+        return None
+    return (Decimal(costo_total) / Decimal(cantidad)).quantize(_DIEZMILESIMO)
@@ -0,0 +1,100 @@
+# inventario/deudas.py
+"""
+Saldos de deudores y abonos (pagos parciales).
+
+SaldoCliente guarda, por cliente, lo adeudado, cuántas deudas tiene abiertas
+y la fecha de la última; así el listado de deudores es una sola lectura
+indexada aunque existan miles de líneas de deuda.
+
+El saldo se recalcula desde las ventas a deuda abiertas del cliente (una
+consulta agregada sobre ``Venta.total - Venta.abonado``), bloqueando antes la
+fila del Cliente: dos cajas que cambian deudas del mismo cliente a la vez se
+serializan y la segunda ya ve lo confirmado por la primera.
+
+Quién lo llama:
+- Señales de Venta (inventario/signals.py): deuda_guardar, deuda_pagar,
+  deuda_eliminar, abonos y ediciones en el admin.
+- Acciones del admin que usan queryset.update() (marcar_pagada / marcar_pendiente).
+- ``python manage.py recalcular_saldos`` para reconstruirlos todos.
+"""
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Sum, Count, Max
+
+from .models import Cliente, Venta, AbonoDeuda, SaldoCliente
+from .totales import CENTAVO
+
+
+def recalcular_saldos(clientes):
+    """Recalcula SaldoCliente para los ids de cliente indicados. Devuelve cuántos."""
+    ids = {pk for pk in clientes if pk is not None}
+    if not ids:
+        return 0
+    with transaction.atomic():
+        ids = list(Cliente.objects.select_for_update().filter(pk__in=ids).order_by("pk").values_list("pk", flat=True))
+        abiertas = {
+            r["cliente_id"]: r
+            for r in Venta.objects
+            .filter(cliente_id__in=ids, es_deuda=True, saldada=False)
+            .values("cliente_id")
+            .annotate(saldo=Sum(F("total") - F("abonado")), n=Count("pk"), ultima=Max("fecha"))
+            .order_by()
+        }
+        filas = []
+        for pk in ids:
+            r = abiertas.get(pk, {})
+            filas.append(SaldoCliente(
+                cliente_id=pk,
+                saldo=r.get("saldo") or Decimal("0"),
+                deudas_abiertas=r.get("n") or 0,
+                ultima_deuda=r.get("ultima"),
+            ))
+        SaldoCliente.objects.bulk_create(
+            filas, batch_size=1000,
+            update_conflicts=True, unique_fields=["cliente"],
+            update_fields=["saldo", "deudas_abiertas", "ultima_deuda", "actualizado"],
+        )
+    return len(filas)
+
+
+def _pesos(valor):
+    return f"{valor:,.0f}".replace(",", ".")
+
+
+def deudores():
+    """Clientes con deudas abiertas, la más reciente primero (usa el índice saldo_deudores)."""
+    return (SaldoCliente.objects
+            .filter(deudas_abiertas__gt=0)
+            .select_related("cliente")
+            .order_by("-ultima_deuda"))
+
+
+def registrar_abono(venta_id, monto, observacion=""):
+    """
+    Registra un pago parcial de una venta a deuda pendiente.
+    Si el abono cubre lo adeudado, la venta queda saldada. Devuelve el AbonoDeuda.
+    """
+    try:
+        monto = Decimal(monto).quantize(CENTAVO)
+    except Exception:
+        raise ValidationError("Monto de abono inválido.")
+    if monto <= 0:
+        raise ValidationError("El abono debe ser mayor que cero.")
+
+    with transaction.atomic():
+        venta = Venta.objects.select_for_update().filter(pk=venta_id, es_deuda=True, saldada=False).first()
+        if venta is None:
+            raise ValidationError("La deuda no existe o ya está saldada.")
+        pendiente = venta.saldo_pendiente()
+        if monto > pendiente:
+            raise ValidationError(
+                f"El abono (${_pesos(monto)}) supera lo adeudado (${_pesos(pendiente)})."
+            )
+
+        abono = AbonoDeuda.objects.create(venta=venta, monto=monto, observacion=observacion or "")
+        venta.abonado += monto
+        venta.saldada = venta.abonado >= venta.total
+        venta.save(update_fields=["abonado", "saldada"])  # la señal de Venta recalcula el saldo
+    return abono
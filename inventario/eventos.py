@@ -0,0 +1,260 @@
+# inventario/eventos.py
+"""
+Eventos de cambios de producto (stock, precio, activo) para las cajas.
+
+Las rutas que escriben Producto avisan con ``productos_cambiados(ids)``:
+
+- InventoryLedger.registrar (stock),
+- save() / delete() de Producto (señales en inventario/signals.py),
+- escrituras masivas avisadas con catalogo.productos_modificados.
+
+Los ids se juntan por transacción y al confirmarla se leen sus valores
+(una consulta) y se publican en un solo lote compacto:
+
+    [{"id": 5, "stock": "3.000", "precio": "990.00", "activo": true},
+     {"id": 9, "eliminado": true}]
+
+Cada evento es el estado actual del producto, no un delta: repetirlo o
+perderse uno intermedio no deja a la caja con datos inconsistentes.
+
+El pub/sub es intercambiable (settings.INVENTARIO_EVENTOS_BACKEND):
+
+- MemoriaBackend (por defecto): historial en memoria del proceso.
+- ArchivoBackend: archivo de líneas JSON que todos los procesos del servidor
+  comparten (INVENTARIO_EVENTOS_ARCHIVO); hace de broker local para varios
+  workers sin depender de Redis u otro servicio.
+
+Los consumidores leen con un cursor opaco (el ``id`` de SSE). Si el cursor
+ya no está en el historial, ``leer`` avisa que hubo pérdida y la caja recarga
+el catálogo. El endpoint SSE es api.eventos (WSGI) / api_async.eventos (ASGI);
+la página del POS usa el que indique ``url_flujo`` (el async si se sirve por
+ASGI, o según settings.INVENTARIO_EVENTOS_ASYNC = True / False si el SSE va
+por otro servidor).
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from .models import Producto
+from .versiones import al_confirmar
+
+CAMPOS = ("id", "stock", "precio", "activo")
+LOTE = 200  # productos por evento publicado
+
+
+class MemoriaBackend:
+    """Historial circular en memoria: solo lo ven los clientes de este proceso."""
+
+    def __init__(self, historial=1000):
+        self._cond = threading.Condition()
+        self._eventos = deque(maxlen=historial)  # (seq, datos)
+        self._seq = 0
+
+    def publicar(self, datos):
+        with self._cond:
+            self._seq += 1
+            self._eventos.append((self._seq, datos))
+            self._cond.notify_all()
+
+    def cursor(self):
+        return str(self._seq)
+
+    def leer(self, cursor, espera=0):
+        """
+        (cursor, eventos, completo): eventos publicados después de ``cursor``,
+        esperando hasta ``espera`` segundos si aún no hay. ``completo`` es False
+        si se perdieron eventos (cursor inválido o fuera del historial).
+        """
+        try:
+            desde = int(cursor)
+        except (TypeError, ValueError):
+            desde = -1
+        with self._cond:
+            if espera and desde == self._seq:
+                self._cond.wait_for(lambda: self._seq != desde, timeout=espera)
+            if not 0 <= desde <= self._seq:
+                return str(self._seq), [], False
+            primero = self._eventos[0][0] if self._eventos else self._seq + 1
+            eventos = [datos for seq, datos in self._eventos if seq > desde]
+            return str(self._seq), eventos, desde + 1 >= primero
+
+
+class ArchivoBackend:
+    """
+    Archivo de líneas JSON compartido por los procesos del servidor. Cada
+    publicación es un write() en modo append; el cursor es
+    '<inodo>:<posición>'. Al superar ``maximo`` bytes el archivo se reemplaza
+    por uno nuevo (otro inodo) y los lectores atrasados reciben completo=False.
+    """
+
+    intervalo = 0.2  # segundos entre revisiones mientras se espera
+
+    def __init__(self, ruta=None, maximo=5 * 1024 * 1024):
+        self.ruta = str(ruta or getattr(settings, "INVENTARIO_EVENTOS_ARCHIVO", None)
+                        or os.path.join(settings.BASE_DIR, "eventos.jsonl"))
+        self.maximo = maximo
+
+    def _estado(self):
+        try:
+            st = os.stat(self.ruta)
+        except FileNotFoundError:
+            open(self.ruta, "a").close()
+            st = os.stat(self.ruta)
+        return st.st_ino, st.st_size
+
+    def publicar(self, datos):
+        linea = json.dumps(datos, cls=DjangoJSONEncoder, separators=(",", ":")) + "\n"
+        _ino, tamano = self._estado()
+        if tamano > self.maximo:
+            nuevo = f"{self.ruta}.{os.getpid()}"
+            open(nuevo, "w").close()
+            os.replace(nuevo, self.ruta)
+        with open(self.ruta, "a", encoding="utf-8") as f:
+            f.write(linea)
+
+    def cursor(self):
+        ino, tamano = self._estado()
+        return f"{ino}:{tamano}"
+
+    def leer(self, cursor, espera=0):
+        """Igual que MemoriaBackend.leer."""
+        try:
+            ino, pos = (int(x) for x in str(cursor).split(":"))
+        except ValueError:
+            ino, pos = None, None
+        limite = time.monotonic() + espera
+        while True:
+            actual, tamano = self._estado()
+            if ino != actual or pos > tamano:
+                return f"{actual}:{tamano}", [], False
+            if tamano > pos or time.monotonic() >= limite:
+                break
+            time.sleep(self.intervalo)
+        if tamano == pos:
+            return cursor, [], True
+        with open(self.ruta, "rb") as f:
+            f.seek(pos)
+            bloque = f.read(tamano - pos)
+        bloque = bloque[:bloque.rfind(b"\n") + 1]  # solo líneas completas
+        eventos = [json.loads(l) for l in bloque.splitlines() if l]
+        return f"{ino}:{pos + len(bloque)}", eventos, True
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend():
+    """Backend del proceso, según settings.INVENTARIO_EVENTOS_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                ruta = getattr(settings, "INVENTARIO_EVENTOS_BACKEND", "inventario.eventos.MemoriaBackend")
+                _backend = import_string(ruta)()
+    return _backend
+
+
+# ---------------- publicación ----------------
+
+class _Pendientes:
+    """Productos cambiados en la transacción en curso; se publican al confirmar."""
+
+    def __init__(self):
+        self.ids = set()
+
+    def __call__(self):
+        publicar(self.ids)
+
+
+def publicar(ids):
+    """Lee el estado actual de ``ids`` y lo publica (los que ya no existen van como eliminados)."""
+    ids = set(ids)
+    if not ids:
+        return
+    filas = list(Producto.objects.filter(pk__in=ids).values(*CAMPOS))
+    ids.difference_update(f["id"] for f in filas)
+    filas += [{"id": pk, "eliminado": True} for pk in sorted(ids)]
+    for i in range(0, len(filas), LOTE):
+        backend().publicar(filas[i:i + LOTE])
+
+
+def productos_cambiados(ids):
+    """Marca productos cambiados; se publican una vez por transacción, al confirmar."""
+    if not transaction.get_connection().in_atomic_block:
+        publicar(ids)
+        return
+    al_confirmar("eventos", _Pendientes).ids.update(ids)
+
+
+# ---------------- Server-Sent Events ----------------
+
+DURACION = 300   # segundos que se mantiene abierta una conexión (luego el navegador reconecta)
+LATIDO = 15      # comentario cada tantos segundos para que proxies no corten la conexión
+REINTENTO = 3000  # ms que espera EventSource antes de reconectar
+SONDEO = 0.5     # segundos entre lecturas del backend en el generador async
+
+
+def url_flujo(request):
+    """
+    Ruta del SSE para la página que atiende ``request``. El flujo sync ocupa
+    un worker WSGI por caja y bajo ASGI Django lo junta entero antes de
+    enviarlo, así que por ASGI se usa siempre el async.
+    """
+    asincrono = getattr(settings, "INVENTARIO_EVENTOS_ASYNC", None)
+    if asincrono is None:
+        asincrono = isinstance(request, ASGIRequest)
+    return reverse("inventario:eventos_async" if asincrono else "inventario:eventos")
+
+
+def cursor_inicial(request):
+    """Last-Event-ID (reconexión de EventSource) o ?desde=; si no, solo eventos nuevos."""
+    return request.headers.get("Last-Event-ID") or request.GET.get("desde") or backend().cursor()
+
+
+def mensaje(cursor, eventos, completo):
+    """Texto SSE para una lectura del backend ('' si no hay nada que enviar)."""
+    if not completo:
+        return f"id: {cursor}\nevent: reinicio\ndata: {{}}\n\n"
+    if not eventos:
+        return ""
+    productos = [p for lote in eventos for p in lote]
+    datos = json.dumps(productos, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return f"id: {cursor}\nevent: productos\ndata: {datos}\n\n"
+
+
+def flujo(cursor, duracion=DURACION):
+    """Generador SSE bloqueante (un hilo por conexión: para WSGI)."""
+    yield f"retry: {REINTENTO}\n\n"
+    fin = time.monotonic() + duracion
+    while time.monotonic() < fin:
+        cursor, eventos, completo = backend().leer(cursor, espera=min(LATIDO, max(0, fin - time.monotonic())))
+        yield mensaje(cursor, eventos, completo) or ": latido\n\n"
+
+
+async def aflujo(cursor, duracion=DURACION):
+    """
+    Generador SSE async (ASGI): sondea el backend sin bloquear, así un solo
+    proceso atiende cientos de cajas conectadas.
+    """
+    yield f"retry: {REINTENTO}\n\n"
+    inicio = ultimo = time.monotonic()
+    while time.monotonic() - inicio < duracion:
+        cursor, eventos, completo = backend().leer(cursor)
+        texto = mensaje(cursor, eventos, completo)
+        if not texto and time.monotonic() - ultimo >= LATIDO:
+            texto = ": latido\n\n"
+        if texto:
+            ultimo = time.monotonic()
+            yield texto
+        await asyncio.sleep(SONDEO)
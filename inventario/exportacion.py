@@ -0,0 +1,195 @@
+# inventario/exportacion.py
+"""
+Exportación masiva (CSV / NDJSON) de ventas, compras y kardex en streaming.
+
+Nada se carga completo en memoria: las filas se leen con
+``values_list(...).iterator(chunk_size=...)`` (cursor del lado del servidor en
+PostgreSQL) y se escriben en bloques de ~64 KB, opcionalmente comprimidos con
+gzip sobre la marcha. La memoria usada es la misma para mil filas que para
+diez millones.
+
+Ventas y kardex incluyen primero las filas archivadas (inventario/archivo.py)
+cuando el rango pedido empieza antes del corte del archivo.
+
+Lo usan:
+- ``python manage.py exportar ventas|compras|kardex ...``
+- ``GET /api/v1/exportar/<conjunto>/?formato=csv|ndjson&desde=&hasta=&producto=&gzip=1``
+"""
+import csv
+import io
+import itertools
+import json
+import zlib
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .models import (
+    DetalleVenta, DetalleCompra, MovimientoStock,
+    PeriodoArchivo, DetalleVentaArchivada, MovimientoArchivado,
+)
+from .historico import medianoche
+
+FORMATOS = ("csv", "ndjson")
+TAM_BLOQUE = 64 * 1024
+FILAS_POR_LECTURA = 2000
+
+
+class Conjunto:
+    """
+    Un conjunto exportable: queryset base, campo de fecha, columnas (nombre,
+    lookup) y, opcionalmente, el modelo de archivo con las mismas columnas.
+    """
+
+    def __init__(self, modelo, campo_fecha, columnas, archivo=None):
+        self.modelo = modelo
+        self.campo_fecha = campo_fecha
+        self.columnas = columnas
+        self.archivo = archivo
+
+    @property
+    def encabezados(self):
+        return [nombre for nombre, _lookup in self.columnas]
+
+    def _filas(self, modelo, desde, hasta, productos):
+        qs = modelo.objects.all()
+        if desde:
+            qs = qs.filter(**{f"{self.campo_fecha}__gte": medianoche(desde)})
+        if hasta:
+            qs = qs.filter(**{f"{self.campo_fecha}__lt": medianoche(hasta + timedelta(days=1))})
+        if productos:
+            qs = qs.filter(producto_id__in=productos)
+        lookups = [lookup for _nombre, lookup in self.columnas]
+        return qs.order_by("pk").values_list(*lookups).iterator(chunk_size=FILAS_POR_LECTURA)
+
+    def filas(self, desde=None, hasta=None, productos=None):
+        """
+        Tuplas en orden de pk (las archivadas primero); ``desde``/``hasta`` son
+        días locales (date) inclusive.
+        """
+        activas = self._filas(self.modelo, desde, hasta, productos)
+        if self.archivo is None:
+            return activas
+        corte = PeriodoArchivo.corte()
+        if corte is None or (desde and medianoche(desde) >= corte):
+            return activas
+        return itertools.chain(self._filas(self.archivo, desde, hasta, productos), activas)
+
+
+CONJUNTOS = {
+    # Una fila por línea de venta, con los datos de su boleta
+    "ventas": Conjunto(DetalleVenta, "venta__fecha", [
+        ("venta_id", "venta_id"),
+        ("fecha", "venta__fecha"),
+        ("cliente", "venta__cliente__nombre"),
+        ("es_deuda", "venta__es_deuda"),
+        ("saldada", "venta__saldada"),
+        ("producto_id", "producto_id"),
+        ("codigo", "producto__codigo"),
+        ("producto", "producto__nombre"),
+        ("cantidad", "cantidad"),
+        ("precio_unitario", "precio_unitario"),
+        ("costo_fifo", "costo_fifo"),
+        ("costo_promedio", "costo_promedio"),
+    ], archivo=DetalleVentaArchivada),
+    "compras": Conjunto(DetalleCompra, "compra__fecha", [
+        ("compra_id", "compra_id"),
+        ("fecha", "compra__fecha"),
+        ("proveedor", "compra__proveedor__nombre"),
+        ("producto_id", "producto_id"),
+        ("codigo", "producto__codigo"),
+        ("producto", "producto__nombre"),
+        ("cantidad", "cantidad"),
+        ("costo_unitario", "costo_unitario"),
+    ]),
+    "kardex": Conjunto(MovimientoStock, "fecha", [
+        ("id", "id"),
+        ("fecha", "fecha"),
+        ("producto_id", "producto_id"),
+        ("codigo", "producto__codigo"),
+        ("tipo", "tipo"),
+        ("cantidad", "cantidad"),
+        ("motivo", "motivo"),
+        ("referencia", "referencia"),
+        ("costo_fifo", "costo_fifo"),
+        ("costo_promedio", "costo_promedio"),
+    ], archivo=MovimientoArchivado),
+}
+
+
+def _valor(v):
+    if isinstance(v, datetime):
+        return timezone.localtime(v).isoformat()
+    if isinstance(v, Decimal):
+        return str(v)
+    return v
+
+
+def _en_bloques(textos):
+    """Agrupa strings pequeños en bloques de bytes de ~TAM_BLOQUE."""
+    buf, tam = [], 0
+    for t in textos:
+        buf.append(t)
+        tam += len(t)
+        if tam >= TAM_BLOQUE:
+            yield "".join(buf).encode("utf-8")
+            buf, tam = [], 0
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+
+def _csv(encabezados, filas):
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+
+    def linea(valores):
+        escritor.writerow(valores)
+        texto = salida.getvalue()
+        salida.seek(0)
+        salida.truncate()
+        return texto
+
+    yield "\ufeff" + linea(encabezados)  # BOM: Excel abre bien las tildes
+    for fila in filas:
+        yield linea([_valor(v) for v in fila])
+
+
+def _ndjson(encabezados, filas):
+    for fila in filas:
+        yield json.dumps(dict(zip(encabezados, (_valor(v) for v in fila))), ensure_ascii=False) + "\n"
+
+
+def comprimir(bloques):
+    """gzip en streaming de un iterable de bytes."""
+    z = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for b in bloques:
+        salida = z.compress(b)
+        if salida:
+            yield salida
+    yield z.flush()
+
+
+def exportar(nombre, formato="csv", desde=None, hasta=None, productos=None, gzip=False):
+    """
+    Generador de bytes con el conjunto ``nombre`` en ``formato``.
+    Lanza ValueError si el conjunto o el formato no existen.
+    """
+    if nombre not in CONJUNTOS:
+        raise ValueError(f"Conjunto desconocido: {nombre}. Opciones: {', '.join(CONJUNTOS)}")
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato}. Opciones: {', '.join(FORMATOS)}")
+    conjunto = CONJUNTOS[nombre]
+    filas = conjunto.filas(desde, hasta, productos)
+    textos = (_csv if formato == "csv" else _ndjson)(conjunto.encabezados, filas)
+    bloques = _en_bloques(textos)
+    return comprimir(bloques) if gzip else bloques
+
+
+def nombre_archivo(nombre, formato, desde=None, hasta=None, gzip=False):
+    partes = [nombre]
+    if desde:
+        partes.append(f"{desde:%Y%m%d}")
+    if hasta:
+        partes.append(f"{hasta:%Y%m%d}")
+    return "_".join(partes) + f".{formato}" + (".gz" if gzip else "")
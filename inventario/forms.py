@@ -1,31 +1,14 @@
 # inventario/forms.py
 from django import forms
-from django.db.models import Max, IntegerField
-from django.db.models.functions import Cast
 
 from .models import Producto
-
-
-def _siguiente_codigo(pad: int = 3) -> str:
-    """
-    Busca el mayor 'codigo' numérico en Producto, le suma 1 y lo devuelve
-    con relleno a la izquierda (por defecto 3 dígitos: 001, 002, ...).
-    Si no hay productos aún, devolverá '001'.
-    """
-    max_val = (
-        Producto.objects
-        .exclude(codigo__isnull=True)
-        .exclude(codigo__exact='')
-        .annotate(cint=Cast('codigo', IntegerField()))
-        .aggregate(m=Max('cint'))['m'] or 0
-    )
-    return str(max_val + 1).zfill(pad)
+from . import importacion, precios
 
 
 class ProductoForm(forms.ModelForm):
     class Meta:
         model = Producto
-        fields = ['codigo', 'nombre', 'categoria', 'precio', 'stock', 'stock_minimo', 'activo']
+        fields = ['codigo', 'nombre', 'categoria', 'precio', 'stock_minimo', 'activo']
         widgets = {
             # lo mostramos pero en solo lectura
             'codigo': forms.TextInput(attrs={'readonly': 'readonly'}),
@@ -33,12 +16,57 @@ class ProductoForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         """
-        Si es creación (no hay PK), proponemos el siguiente código y lo
-        dejamos en solo lectura. En edición, respetamos el existente.
+        Si es creación (no hay PK), el código se asigna al guardar según la
+        categoría (codigos.asignar_codigo): no se propone uno que podría no
+        coincidir. En edición, respetamos el existente.
         """
         super().__init__(*args, **kwargs)
 
         if not self.instance.pk:
-            # Solo si el initial no trae código ya (por si la vista lo setea)
-            if not self.initial.get('codigo'):
-                self.initial['codigo'] = _siguiente_codigo()
+            self.fields['codigo'].required = False
+            self.fields['codigo'].widget.attrs['placeholder'] = 'Se asignará automáticamente'
+
+
+class ProductoAdminForm(forms.ModelForm):
+    """Producto en el admin: el stock solo se ingresa al crear (stock inicial)."""
+
+    class Meta:
+        model = Producto
+        fields = "__all__"
+
+    def clean_stock(self):
+        stock = self.cleaned_data.get("stock")
+        if stock is not None and stock < 0:
+            raise forms.ValidationError("El stock inicial no puede ser negativo.")
+        return stock
+
+
+class AjustePrecioForm(forms.Form):
+    """Ajuste masivo de precios (acción del admin de productos, ver inventario/precios.py)."""
+    tipo = forms.ChoiceField(choices=[("porcentaje", "Porcentaje (%)"), ("monto", "Monto fijo ($)")])
+    valor = forms.DecimalField(max_digits=10, decimal_places=2,
+                               help_text="Ej: 8 sube un 8 % (o $8); -5 baja.")
+    redondeo = forms.ChoiceField(choices=[(r, r) for r in precios.REDONDEOS], initial="peso")
+    modo = forms.ChoiceField(choices=[(m, m) for m in precios.MODOS], initial="cercano")
+    motivo = forms.CharField(max_length=120, required=False)
+
+    def clean(self):
+        datos = super().clean()
+        if datos.get("tipo") == "porcentaje" and datos.get("valor") is not None and datos["valor"] <= -100:
+            raise forms.ValidationError("Un porcentaje de -100 o menos deja precios en 0.")
+        return datos
+
+
+class ImportarProductosForm(forms.Form):
+    """Importación de productos desde CSV / XLSX (admin de productos, ver inventario/importacion.py)."""
+    archivo = forms.FileField(help_text="CSV (separado por coma o punto y coma) o XLSX, con fila de encabezados.")
+    simular = forms.BooleanField(required=False, initial=True,
+                                 help_text="Valida e informa sin guardar nada.")
+    crear_categorias = forms.BooleanField(required=False,
+                                          help_text="Crea las categorías que no existan.")
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data["archivo"]
+        if not archivo.name.lower().endswith(importacion.FORMATOS):
+            raise forms.ValidationError("Use un archivo .csv o .xlsx.")
+        return archivo
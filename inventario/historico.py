@@ -0,0 +1,161 @@
+# inventario/historico.py
+"""
+Stock histórico a partir de snapshots diarios.
+
+Antes, saber el stock de un producto en una fecha pasada obligaba a recorrer
+todo su kardex (MovimientoStock), que crece sin límite. Ahora:
+
+    stock(T) = snapshot más cercano anterior o igual a T
+             + movimientos entre ese snapshot y T
+
+Los snapshots se toman con ``python manage.py snapshot_stock`` (a medianoche
+de America/Santiago), así un informe de cierre de mes cuesta O(productos)
+más los movimientos de un día como máximo.
+
+Si el rango pasa por debajo del corte de archivo (inventario/archivo.py), los
+movimientos se suman también desde MovimientoArchivado.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, When, F, Sum, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Producto, MovimientoStock, MovimientoArchivado, PeriodoArchivo, SnapshotStock
+
+_CERO = Decimal("0")
+
+
+def _neto():
+    """Suma con signo de las cantidades: + entradas, − salidas."""
+    return Sum(Case(
+        When(tipo=MovimientoStock.ENTRADA, then=F("cantidad")),
+        default=-F("cantidad"),
+    ))
+
+
+def medianoche(dia):
+    """Medianoche (inicio) del día ``dia`` en la zona horaria del proyecto."""
+    return timezone.make_aware(datetime.combine(dia, time.min), timezone.get_default_timezone())
+
+
+def ultima_medianoche(ahora=None):
+    ahora = timezone.localtime(ahora or timezone.now())
+    return medianoche(ahora.date())
+
+
+def parsear_momento(texto):
+    """
+    'YYYY-MM-DD' -> cierre de ese día (medianoche siguiente);
+    'YYYY-MM-DDTHH:MM[:SS]' -> ese instante (hora local si no trae zona).
+    Devuelve None si el texto no es válido.
+    """
+    texto = (texto or "").strip()
+    try:
+        dt = parse_datetime(texto)
+        if dt is None:
+            dia = parse_date(texto)
+            return medianoche(dia + timedelta(days=1)) if dia else None
+    except ValueError:
+        return None
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, timezone.get_default_timezone())
+    return dt
+
+
+def _netos(qs):
+    return dict(qs.values("producto_id").annotate(neto=_neto()).values_list("producto_id", "neto"))
+
+
+def _filtrar(qs, productos):
+    return qs if productos is None else qs.filter(producto_id__in=productos)
+
+
+def _netos_entre(desde, hasta=None, productos=None):
+    """Netos por producto de los movimientos en (desde, hasta], activos y archivados."""
+    modelos = [MovimientoStock]
+    corte = PeriodoArchivo.corte()
+    if corte is not None and desde < corte:
+        modelos.append(MovimientoArchivado)
+    netos = {}
+    for modelo in modelos:
+        qs = modelo.objects.filter(fecha__gt=desde)
+        if hasta is not None:
+            qs = qs.filter(fecha__lte=hasta)
+        for pk, neto in _netos(_filtrar(qs, productos)).items():
+            netos[pk] = netos.get(pk, _CERO) + neto
+    return netos
+
+
+def stock_actual_menos(momento, productos=None):
+    """Stock en ``momento`` retrocediendo desde el stock actual (sin snapshots)."""
+    posteriores = _netos_entre(momento, productos=productos)
+    qs = Producto.objects.all() if productos is None else Producto.objects.filter(pk__in=productos)
+    return {pk: stock - posteriores.get(pk, _CERO) for pk, stock in qs.values_list("pk", "stock")}
+
+
+def tomar_snapshot(momento=None):
+    """
+    Guarda el stock de todos los productos en ``momento`` (por defecto, la
+    última medianoche). Si ya existía un snapshot para ese instante se
+    reemplaza. Devuelve la cantidad de filas escritas.
+    """
+    momento = momento or ultima_medianoche()
+    stocks = stock_actual_menos(momento)
+    filas = [SnapshotStock(producto_id=pk, fecha=momento, stock=s) for pk, s in stocks.items()]
+    with transaction.atomic():
+        SnapshotStock.objects.bulk_create(
+            filas, batch_size=1000,
+            update_conflicts=True, unique_fields=["producto", "fecha"], update_fields=["stock"],
+        )
+    return len(filas)
+
+
+def snapshot_base(momento):
+    """Instante del snapshot más reciente anterior o igual a ``momento`` (o None)."""
+    return SnapshotStock.objects.filter(fecha__lte=momento).aggregate(m=Max("fecha"))["m"]
+
+
+def stock_en(momento, productos=None):
+    """
+    Stock de cada producto en ``momento`` -> {producto_id: stock}.
+    ``productos``: iterable de ids; None = todos.
+
+    Sin snapshots anteriores a ``momento`` se calcula hacia atrás desde el
+    stock actual (más lento, pero correcto).
+    """
+    if productos is not None:
+        productos = list(productos)
+    base = snapshot_base(momento)
+    if base is None:
+        return stock_actual_menos(momento, productos)
+
+    qs = _filtrar(SnapshotStock.objects.filter(fecha=base), productos)
+    stocks = dict(qs.values_list("producto_id", "stock"))
+    # Productos creados después del snapshot parten en 0
+    ids = Producto.objects.all() if productos is None else Producto.objects.filter(pk__in=productos)
+    for pk in ids.values_list("pk", flat=True):
+        stocks.setdefault(pk, _CERO)
+
+    for pk, neto in _netos_entre(base, momento, productos).items():
+        if pk in stocks:
+            stocks[pk] += neto
+    return stocks
+
+
+def dias_sin_snapshot(desde, hasta):
+    """Días (date) entre ``desde`` y ``hasta`` cuya medianoche aún no tiene snapshot."""
+    tomados = set(
+        timezone.localtime(f).date()
+        for f in SnapshotStock.objects.filter(
+            fecha__gte=medianoche(desde), fecha__lte=medianoche(hasta)
+        ).values_list("fecha", flat=True).distinct()
+    )
+    dia, faltan = desde, []
+    while dia <= hasta:
+        if dia not in tomados:
+            faltan.append(dia)
+        dia += timedelta(days=1)
+    return faltan
@@ -0,0 +1,366 @@
+# inventario/importacion.py
+"""
+Importación masiva de productos y stock inicial desde CSV / XLSX.
+
+El archivo se lee en streaming (csv.reader sobre el archivo; openpyxl en modo
+read_only) y se procesa en bloques de LOTE filas, cada uno en su transacción:
+
+1. Se interpretan y validan las filas del bloque (números con coma o punto
+   decimal, activo = sí/no); las categorías se resuelven por nombre con un
+   diccionario cargado una sola vez.
+2. Una consulta busca los códigos del bloque que ya existen.
+3. Nuevos: bulk_create (sin código se asigna con codigos.asignar_codigos, en
+   bloque por categoría). Existentes: bulk_update agrupado por columnas del
+   archivo; su stock no se toca (se ajusta con movimientos).
+4. Los nuevos se insertan con su stock inicial y
+   InventoryLedger.registrar_inicial lo costea y escribe su MovimientoStock
+   con un INSERT masivo por bloque (sin el UPDATE de stock).
+5. Historial de precios, versión del catálogo y stock_bajo, en bloque.
+
+Las filas con errores se informan (número de fila y motivo) y se omiten; el
+resto se importa. Si la BD rechaza un bloque (IntegrityError) sus filas se
+informan como error y se sigue con el siguiente. Con ``simular=True`` todo corre dentro de una transacción
+que se deshace al final: valida contra la BD sin escribir nada.
+
+Columnas (encabezado sin importar mayúsculas ni tildes): codigo (o sku),
+nombre, categoria, unidad, precio, stock_minimo, activo, stock (stock
+inicial) y costo (costo unitario del stock inicial).
+
+Lo usan:
+- ``python manage.py importar_productos archivo.csv|archivo.xlsx [--simular]``
+- "Importar productos" en el admin de productos
+"""
+import contextlib
+import csv
+import io
+import itertools
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - dependencia opcional
+    openpyxl = None
+
+from .models import Categoria, Producto
+from .ledger import InventoryLedger, Delta
+from .busqueda import normalizar
+from . import catalogo, codigos, precios
+
+LOTE = 1000
+FORMATOS = (".csv", ".txt", ".xlsx", ".xlsm")
+MAX_ERRORES = 1000  # errores guardados en el resumen (el conteo sigue)
+
+ALIAS = {
+    "sku": "codigo", "cod": "codigo",
+    "producto": "nombre", "descripcion": "nombre",
+    "precio_venta": "precio",
+    "minimo": "stock_minimo", "stock_min": "stock_minimo",
+    "stock_inicial": "stock", "cantidad": "stock",
+    "costo_unitario": "costo",
+}
+COLUMNAS = ("codigo", "nombre", "categoria", "unidad", "precio", "stock_minimo", "activo", "stock", "costo")
+# Columnas que se escriben en productos existentes
+EDITABLES = ("nombre", "categoria", "unidad", "precio", "stock_minimo", "activo")
+
+_COLUMNA_BD = {c: "categoria_id" if c == "categoria" else c for c in EDITABLES}
+
+_VERDADEROS = {"1", "si", "s", "true", "verdadero", "x", "activo"}
+_FALSOS = {"0", "no", "n", "false", "falso", "inactivo"}
+_CENTAVO = Decimal("0.01")
+_MILESIMO = Decimal("0.001")
+
+
+# ---------------- lectura ----------------
+
+def columna(encabezado):
+    """'Stock mínimo' -> 'stock_minimo'; None si no es una columna conocida."""
+    nombre = normalizar(encabezado).replace(" ", "_")
+    nombre = ALIAS.get(nombre, nombre)
+    return nombre if nombre in COLUMNAS else None
+
+
+def _filas(encabezado, registros, inicio):
+    """(columnas, iterador de (número de fila, {columna: valor}))."""
+    indices = [(i, columna(h)) for i, h in enumerate(encabezado) if h is not None and columna(h)]
+    columnas = {c for _i, c in indices}
+
+    def generar():
+        for numero, registro in enumerate(registros, start=inicio):
+            if not any(v not in (None, "") for v in registro):
+                continue
+            yield numero, {c: registro[i] if i < len(registro) else None for i, c in indices}
+
+    return columnas, generar()
+
+
+def leer_csv(archivo, encoding="utf-8-sig"):
+    """Separador ',' ';' o tabulador, según la línea de encabezado."""
+    texto = io.TextIOWrapper(getattr(archivo, "file", archivo), encoding=encoding, newline="")
+    primera = texto.readline()
+    separador = max(",;\t", key=primera.count)
+    lector = csv.reader(itertools.chain([primera], texto), delimiter=separador)
+    encabezado = next(lector, [])
+    return _filas(encabezado, lector, 2)
+
+
+def leer_xlsx(archivo):
+    """Primera hoja del libro, en modo read_only (no carga el libro completo)."""
+    if openpyxl is None:
+        raise ValueError("Para importar archivos XLSX instala openpyxl.")
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    registros = libro.active.iter_rows(values_only=True)
+    encabezado = next(registros, ())
+
+    def cerrar_al_terminar(filas):
+        try:
+            yield from filas
+        finally:
+            libro.close()
+
+    columnas, filas = _filas(encabezado, registros, 2)
+    return columnas, cerrar_al_terminar(filas)
+
+
+def leer(archivo, nombre, encoding="utf-8-sig"):
+    """Elige el lector por la extensión de ``nombre``."""
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {extension or nombre} (use CSV o XLSX).")
+    if extension in (".xlsx", ".xlsm"):
+        columnas, filas = leer_xlsx(archivo)
+    else:
+        columnas, filas = leer_csv(archivo, encoding)
+    if not {"codigo", "nombre"} & columnas:
+        raise ValueError("El archivo debe tener una columna 'codigo' o 'nombre'.")
+    return columnas, filas
+
+
+# ---------------- interpretación ----------------
+
+def _texto(valor, largo, campo):
+    texto = "" if valor is None else str(valor).strip()
+    if isinstance(valor, float) and valor.is_integer():
+        texto = str(int(valor))  # códigos numéricos leídos de XLSX
+    if len(texto) > largo:
+        raise ValueError(f"{campo}: más de {largo} caracteres.")
+    return texto
+
+
+def _decimal(valor, campo, paso, maximo):
+    """'1.990,5' / '1990.5' / 1990.5 -> Decimal, redondeado a ``paso``."""
+    if isinstance(valor, (int, float, Decimal)) and not isinstance(valor, bool):
+        numero = Decimal(str(valor))
+    else:
+        texto = str(valor).strip().replace("$", "").replace(" ", "")
+        if "," in texto and "." in texto:
+            # el último separador es el decimal
+            if texto.rfind(",") > texto.rfind("."):
+                texto = texto.replace(".", "").replace(",", ".")
+            else:
+                texto = texto.replace(",", "")
+        else:
+            texto = texto.replace(",", ".")
+        try:
+            numero = Decimal(texto)
+        except InvalidOperation:
+            raise ValueError(f"{campo}: número inválido ({valor}).")
+    if not numero.is_finite() or numero < 0 or numero >= maximo:
+        raise ValueError(f"{campo}: fuera de rango ({valor}).")
+    return numero.quantize(paso)
+
+
+def _booleano(valor):
+    if isinstance(valor, bool):
+        return valor
+    texto = normalizar(valor)
+    if texto in _VERDADEROS:
+        return True
+    if texto in _FALSOS:
+        return False
+    raise ValueError(f"activo: use sí/no ({valor}).")
+
+
+def _valor_bd(campo, valor):
+    return valor.pk if campo == "categoria" else valor
+
+
+class _Estado:
+    """Lo que se mantiene entre bloques: categorías por nombre y códigos ya vistos."""
+
+    def __init__(self, crear_categorias):
+        self.crear_categorias = crear_categorias
+        self.categorias = {normalizar(c.nombre): c for c in Categoria.objects.all()}
+        self.vistos = set()
+
+    def categoria(self, nombre):
+        clave = normalizar(nombre)
+        if not clave:
+            raise ValueError("categoria: vacía.")
+        if clave not in self.categorias:
+            if not self.crear_categorias:
+                raise ValueError(f"categoria: no existe '{nombre}'.")
+            self.categorias[clave] = Categoria.objects.create(nombre=str(nombre).strip()[:100])
+        return self.categorias[clave]
+
+
+def interpretar(valores, estado):
+    """{columna: valor del archivo} -> {campo: valor} (solo las celdas con dato)."""
+    datos = {}
+    for campo, valor in valores.items():
+        if valor is None or (isinstance(valor, str) and not valor.strip()):
+            continue
+        if campo == "codigo":
+            datos[campo] = _texto(valor, 30, campo)
+        elif campo == "nombre":
+            datos[campo] = _texto(valor, 120, campo)
+        elif campo == "unidad":
+            datos[campo] = _texto(valor, 20, campo)
+        elif campo == "categoria":
+            datos[campo] = estado.categoria(valor)
+        elif campo == "precio":
+            datos[campo] = _decimal(valor, campo, _CENTAVO, Decimal(10) ** 8)
+        elif campo == "costo":
+            datos[campo] = _decimal(valor, campo, Decimal("0.0001"), Decimal(10) ** 8)
+        elif campo in ("stock", "stock_minimo"):
+            datos[campo] = _decimal(valor, campo, _MILESIMO, Decimal(10) ** 9)
+        elif campo == "activo":
+            datos[campo] = _booleano(valor)
+    return datos
+
+
+# ---------------- importación ----------------
+
+class Resumen:
+
+    def __init__(self):
+        self.leidas = 0
+        self.creados = 0
+        self.actualizados = 0
+        self.con_stock = 0
+        self.stock_omitido = 0   # filas de productos existentes con stock (no se aplica)
+        self.con_error = 0
+        self.errores = []        # [(fila, mensaje)], hasta MAX_ERRORES
+
+    def error(self, fila, mensaje):
+        self.con_error += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append((fila, mensaje))
+
+    def __str__(self):
+        texto = (f"{self.leidas} filas: {self.creados} productos nuevos, {self.actualizados} actualizados, "
+                 f"{self.con_stock} con stock inicial, {self.con_error} con errores")
+        if self.stock_omitido:
+            texto += f" ({self.stock_omitido} existentes con stock: no se modificó)"
+        return texto
+
+
+def _bloque(filas, estado, resumen, fecha, motivo):
+    """Valida y escribe un bloque de (número, valores)."""
+    validas = []
+    for numero, valores in filas:
+        resumen.leidas += 1
+        try:
+            datos = interpretar(valores, estado)
+        except ValueError as e:
+            resumen.error(numero, str(e))
+            continue
+        codigo = datos.get("codigo")
+        if codigo:
+            if codigo in estado.vistos:
+                resumen.error(numero, f"codigo: '{codigo}' repetido en el archivo.")
+                continue
+            estado.vistos.add(codigo)
+        validas.append((numero, datos))
+
+    existentes = {
+        fila["codigo"]: fila for fila in
+        Producto.objects.filter(codigo__in=[d["codigo"] for _n, d in validas if d.get("codigo")])
+        .values("codigo", "pk", *(_COLUMNA_BD[c] for c in EDITABLES))
+    }
+
+    nuevos, grupos, sin_codigo = [], {}, {}
+    for numero, datos in validas:
+        if datos.get("codigo") in existentes:
+            actual = existentes[datos["codigo"]]
+            if "stock" in datos:
+                resumen.stock_omitido += 1
+            # Solo lo que cambia: reimportar el mismo archivo no escribe nada
+            campos = {c: datos[c] for c in EDITABLES if c in datos and _valor_bd(c, datos[c]) != actual[_COLUMNA_BD[c]]}
+            if campos:
+                producto = Producto(pk=actual["pk"], **campos)
+                grupos.setdefault(tuple(sorted(campos)), []).append(producto)
+            continue
+        faltan = [c for c in ("nombre", "categoria") if c not in datos]
+        if faltan:
+            resumen.error(numero, f"producto nuevo sin {' ni '.join(faltan)}.")
+            continue
+        producto = Producto(**{c: datos[c] for c in EDITABLES if c in datos}, codigo=datos.get("codigo", ""),
+                            stock=datos.get("stock") or 0)
+        producto.stock_bajo = producto.stock <= (producto.stock_minimo or 0)
+        producto._costo_inicial = datos.get("costo")
+        if not producto.codigo:
+            sin_codigo.setdefault(producto.categoria, []).append(producto)
+        nuevos.append(producto)
+
+    try:
+        # Savepoint: si el bloque choca con la BD (p. ej. un código tomado en
+        # paralelo) sus filas se informan como error y la importación sigue
+        with transaction.atomic():
+            for categoria, productos in sin_codigo.items():
+                asignados = codigos.asignar_codigos(len(productos), categoria, ocupados=estado.vistos)
+                for producto, codigo in zip(productos, asignados):
+                    producto.codigo = codigo
+                    estado.vistos.add(codigo)
+
+            creados = Producto.objects.bulk_create(nuevos, batch_size=LOTE)
+            actualizados, con_precio, con_minimo = [], [], []
+            for campos, productos in grupos.items():
+                Producto.objects.bulk_update(productos, campos, batch_size=LOTE)
+                actualizados += [p.pk for p in productos]
+                if "precio" in campos:
+                    con_precio += [(p.pk, p.precio) for p in productos]
+                if "stock_minimo" in campos:
+                    con_minimo += [p.pk for p in productos]
+
+            deltas = [Delta(p.pk, p.stock, "Stock inicial", motivo, p._costo_inicial) for p in creados if p.stock]
+            InventoryLedger.registrar_inicial(deltas, fecha=fecha)
+            precios.registrar([(p.pk, p.precio) for p in creados] + con_precio, desde=fecha, motivo=motivo)
+            catalogo.marcar_cambios([p.pk for p in creados] + actualizados)
+            if con_minimo:
+                InventoryLedger.recalcular_stock_bajo(con_minimo)
+    except IntegrityError as e:
+        for numero, _datos in validas:
+            resumen.error(numero, f"no se guardó el bloque de esta fila: {e}")
+        return
+
+    resumen.creados += len(creados)
+    resumen.actualizados += len(actualizados)
+    resumen.con_stock += len(deltas)
+
+
+def importar(filas, *, lote=LOTE, simular=False, crear_categorias=False, motivo="Importación", progreso=None):
+    """
+    Importa ``filas`` (iterable de (número de fila, {columna: valor}), p. ej.
+    el de leer()) de a ``lote`` filas por transacción. ``progreso(resumen)`` se
+    llama después de cada bloque. Devuelve el Resumen.
+    """
+    resumen = Resumen()
+    fecha = timezone.now()
+    filas = iter(filas)
+    with transaction.atomic() if simular else contextlib.nullcontext():
+        estado = _Estado(crear_categorias)
+        while True:
+            bloque = list(itertools.islice(filas, lote))
+            if not bloque:
+                break
+            with transaction.atomic():
+                _bloque(bloque, estado, resumen, fecha, motivo[:80])
+            if progreso:
+                progreso(resumen)
+        if simular:
+            transaction.set_rollback(True)
+    return resumen
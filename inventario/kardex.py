@@ -0,0 +1,112 @@
+# inventario/kardex.py
+"""
+Kardex por producto con paginación por cursor (keyset) sobre (fecha, id).
+
+Las páginas van del movimiento más reciente al más antiguo. Cada página es un
+``WHERE producto = P AND (fecha, id) < cursor ORDER BY fecha DESC, id DESC LIMIT n``
+sobre el índice movimiento_producto_fecha: sin OFFSET ni COUNT(*), cuesta lo
+mismo la primera página que la número diez mil.
+
+El saldo corrido se calcula en la BD con una función de ventana sobre la página:
+
+    saldo(fila) = saldo_inicio − Σ movimientos más recientes de la página
+
+``saldo_inicio`` es el stock actual en la primera página (o el stock a la fecha
+``hasta``, vía snapshots) y viaja firmado dentro del cursor a las siguientes,
+así nunca hay que sumar el historial completo.
+
+Cuando se acaban los movimientos activos, la página se completa con los de
+MovimientoArchivado (inventario/archivo.py), que son todos anteriores al corte.
+"""
+from decimal import Decimal
+
+from django.core import signing
+from django.db.models import Case, When, F, Q, Sum, Value, DecimalField, Window
+
+from .models import MovimientoStock, MovimientoArchivado, PeriodoArchivo
+from . import historico
+
+LIMITE = 50
+LIMITE_MAX = 500
+_SAL = "inventario.kardex"
+_CANTIDAD = DecimalField(max_digits=16, decimal_places=3)
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no fue emitido por este servidor o está dañado."""
+
+
+def _con_signo():
+    return Case(
+        When(tipo=MovimientoStock.ENTRADA, then=F("cantidad")),
+        default=-F("cantidad"),
+        output_field=_CANTIDAD,
+    )
+
+
+def codificar(fecha, pk, saldo):
+    return signing.dumps([fecha.isoformat(), pk, str(saldo)], salt=_SAL, compress=True)
+
+
+def decodificar(cursor):
+    try:
+        fecha, pk, saldo = signing.loads(cursor, salt=_SAL)
+        return historico.parsear_momento(fecha), int(pk), Decimal(saldo)
+    except (signing.BadSignature, TypeError, ValueError, ArithmeticError):
+        raise CursorInvalido("Cursor inválido.")
+
+
+def _filas(qs, saldo_inicio, n):
+    """Hasta ``n`` filas de ``qs`` (más reciente primero) con su saldo corrido."""
+    orden = [F("fecha").desc(), F("id").desc()]
+    return list(
+        qs.annotate(
+            neto=_con_signo(),
+            # Σ de los movimientos más recientes (incluido el propio) dentro de la página
+            posteriores=Window(Sum(_con_signo()), order_by=orden),
+        )
+        .annotate(saldo=Value(saldo_inicio, output_field=_CANTIDAD) - F("posteriores") + F("neto"))
+        .order_by(*orden)
+        .values("id", "fecha", "tipo", "cantidad", "motivo", "referencia", "costo_fifo", "neto", "saldo")
+        [:n]
+    )
+
+
+def pagina(producto, cursor=None, limite=LIMITE, hasta=None):
+    """
+    Una página del kardex de ``producto`` (instancia de Producto).
+
+    - ``cursor``: el valor 'siguiente' de la página anterior (None = primera).
+    - ``hasta``: instante (aware) desde el que se parte hacia atrás en la
+      primera página; None = ahora.
+
+    Devuelve (filas, siguiente): filas son dicts con id, fecha, tipo,
+    cantidad, motivo, referencia, costo_fifo y saldo (stock después del
+    movimiento); siguiente es el cursor de la página más antigua o None.
+    """
+    limite = max(1, min(limite, LIMITE_MAX))
+    filtro = Q(producto_id=producto.pk)
+
+    if cursor:
+        fecha, pk, saldo_inicio = decodificar(cursor)
+        filtro &= Q(fecha__lt=fecha) | Q(fecha=fecha, pk__lt=pk)
+    elif hasta is not None:
+        saldo_inicio = historico.stock_en(hasta, [producto.pk]).get(producto.pk, Decimal("0"))
+        filtro &= Q(fecha__lte=hasta)
+    else:
+        saldo_inicio = producto.stock or Decimal("0")
+
+    filas = _filas(MovimientoStock.objects.filter(filtro), saldo_inicio, limite + 1)
+    if len(filas) <= limite and PeriodoArchivo.corte() is not None:
+        saldo = filas[-1]["saldo"] - filas[-1]["neto"] if filas else saldo_inicio
+        filas += _filas(MovimientoArchivado.objects.filter(filtro), saldo, limite + 1 - len(filas))
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        # el saldo antes del último movimiento es el de partida de la página siguiente
+        siguiente = codificar(ultima["fecha"], ultima["id"], ultima["saldo"] - ultima["neto"])
+    for f in filas:
+        del f["neto"]
+    return filas, siguiente
@@ -0,0 +1,212 @@
+# inventario/ledger.py
+"""
+Libro de inventario: único punto de escritura de Producto.stock.
+
+Todas las rutas que mueven stock (POS, deudas, compras, API de movimientos
+y las señales de DetalleCompra/DetalleVenta para ediciones desde el admin)
+pasan por InventoryLedger.registrar(), que:
+
+- aplica cada delta exactamente una vez con un UPDATE atómico sobre F("stock"),
+- escribe una sola fila de MovimientoStock (kardex) por delta,
+- impide que el stock quede negativo (bloqueando los productos afectados),
+- mantiene Producto.stock_bajo (stock <= stock_minimo) en el mismo UPDATE,
+- costea cada delta (capas FIFO y costo promedio, ver inventario/costos.py),
+- avisa el stock nuevo a las cajas al confirmar (inventario/eventos.py).
+
+Las ediciones de producto (formulario, admin y API) no escriben el stock:
+lo llevan al valor pedido con fijar_stock(), un delta de ajuste por producto.
+
+La única excepción es el stock inicial de un producto nuevo (formulario,
+admin, API e importación): se inserta ya con su stock y registrar_inicial()
+escribe el kardex y el costeo correspondientes.
+"""
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, When, F, Q, Value, DecimalField, BooleanField, ExpressionWrapper
+from django.db.models.lookups import LessThanOrEqual
+from django.utils import timezone
+
+from .models import Producto, MovimientoStock
+from . import costos, eventos
+
+
+# producto_id: pk del producto; cantidad: > 0 entrada, < 0 salida.
+# costo_unitario: solo entradas; None = al costo promedio vigente.
+Delta = namedtuple("Delta", ["producto_id", "cantidad", "motivo", "referencia", "costo_unitario"],
+                   defaults=(None,))
+
+_suspendido = ContextVar("inventario_ledger_suspendido", default=False)
+
+
+class StockInsuficiente(ValidationError):
+    """Alguna salida deja el stock de un producto bajo cero."""
+
+
+class InventoryLedger:
+
+    @staticmethod
+    def netear(deltas):
+        """Suma los deltas por producto: {producto_id: delta_neto}."""
+        netos = {}
+        for d in deltas:
+            netos[d.producto_id] = netos.get(d.producto_id, Decimal("0")) + d.cantidad
+        return netos
+
+    @staticmethod
+    def bloquear(ids):
+        """
+        Bloquea (SELECT ... FOR UPDATE) los productos indicados con una sola consulta.
+        Se ordena por pk para que dos transacciones concurrentes tomen los
+        bloqueos en el mismo orden y no se produzcan deadlocks.
+        """
+        return Producto.objects.select_for_update().order_by("pk").in_bulk(list(ids))
+
+    @staticmethod
+    def validar(productos, netos):
+        """
+        Verifica que existan los productos y que ninguna salida deje stock negativo.
+        ``productos`` es el dict devuelto por bloquear().
+        """
+        faltantes = [pid for pid in netos if pid not in productos]
+        if faltantes:
+            raise ValidationError([f"El producto #{pid} no existe." for pid in faltantes])
+
+        errores = []
+        for pid, delta in netos.items():
+            prod = productos[pid]
+            if delta < 0 and (prod.stock or 0) + delta < 0:
+                errores.append(
+                    f"Stock insuficiente para {prod.nombre}. Stock actual: {prod.stock}, requerido: {abs(delta)}."
+                )
+        if errores:
+            raise StockInsuficiente(errores)
+
+    @classmethod
+    def registrar(cls, deltas, *, fecha=None, productos=None, permitir_negativo=False):
+        """
+        Aplica una lista de Delta y devuelve los MovimientoStock creados.
+
+        - ``productos``: dict {pk: Producto} ya bloqueado y validado por el llamador
+          (evita repetir el SELECT ... FOR UPDATE).
+        - ``permitir_negativo``: omite la validación (p. ej. reversos de compras).
+
+        Consultas: a lo sumo un SELECT FOR UPDATE, un UPDATE y un INSERT masivo,
+        más las del costeo (costos.aplicar).
+        """
+        deltas = [d for d in deltas if d.cantidad]
+        if not deltas:
+            return []
+
+        fecha = fecha or timezone.now()
+        netos = cls.netear(deltas)
+
+        with transaction.atomic():
+            if productos is None and not permitir_negativo and any(v < 0 for v in netos.values()):
+                productos = cls.bloquear(netos.keys())
+            if productos is not None and not permitir_negativo:
+                cls.validar(productos, netos)
+
+            whens = [When(pk=pid, then=F("stock") + Value(delta)) for pid, delta in netos.items() if delta]
+            if whens:
+                nuevo_stock = Case(*whens, output_field=DecimalField(max_digits=12, decimal_places=3))
+                Producto.objects.filter(pk__in=list(netos)).update(
+                    stock=nuevo_stock,
+                    # el SET se evalúa con los valores previos de la fila: se compara el stock nuevo
+                    stock_bajo=LessThanOrEqual(nuevo_stock, F("stock_minimo")),
+                )
+                eventos.productos_cambiados(netos)
+
+            movimientos = cls._kardex(deltas, fecha)
+
+        return movimientos
+
+    @staticmethod
+    def _kardex(deltas, fecha):
+        """Costea los deltas y escribe sus MovimientoStock con un INSERT masivo."""
+        valores = costos.aplicar(deltas, fecha)
+        return MovimientoStock.objects.bulk_create([
+            MovimientoStock(
+                producto_id=d.producto_id,
+                tipo=MovimientoStock.ENTRADA if d.cantidad > 0 else MovimientoStock.SALIDA,
+                cantidad=abs(d.cantidad),
+                motivo=d.motivo or "",
+                fecha=fecha,
+                referencia=d.referencia or "",
+                costo_fifo=costo.fifo,
+                costo_promedio=costo.promedio,
+            )
+            for d, costo in zip(deltas, valores)
+        ])
+
+    @classmethod
+    def registrar_inicial(cls, deltas, *, fecha=None):
+        """
+        Stock inicial de productos recién creados que ya se insertaron con ese
+        stock (altas del formulario, admin, API e importación): solo costea y escribe el kardex, sin el
+        UPDATE de stock. Cada delta debe ser una entrada igual al stock insertado.
+        """
+        deltas = [d for d in deltas if d.cantidad]
+        if not deltas:
+            return []
+        if any(d.cantidad < 0 for d in deltas):
+            raise ValueError("El stock inicial no puede ser negativo.")
+        with transaction.atomic():
+            movimientos = cls._kardex(deltas, fecha or timezone.now())
+            eventos.productos_cambiados({d.producto_id for d in deltas})
+        return movimientos
+
+    @classmethod
+    def fijar_stock(cls, nuevos, motivo="Ajuste", referencia="", **kwargs):
+        """
+        Lleva el stock de cada producto al valor pedido ({pk: stock}) con un
+        delta de ajuste, calculado sobre el stock ya bloqueado. Un valor
+        negativo levanta StockInsuficiente.
+        """
+        with transaction.atomic():
+            productos = cls.bloquear(nuevos)
+            deltas = [
+                Delta(pk, valor - (productos[pk].stock or 0), motivo, referencia)
+                for pk, valor in nuevos.items()
+                if pk in productos
+            ]
+            return cls.registrar(deltas, productos=productos, **kwargs)
+
+    @classmethod
+    def entrada(cls, producto_id, cantidad, motivo="", referencia="", costo_unitario=None, **kwargs):
+        return cls.registrar([Delta(producto_id, abs(cantidad), motivo, referencia, costo_unitario)], **kwargs)
+
+    @classmethod
+    def salida(cls, producto_id, cantidad, motivo="", referencia="", **kwargs):
+        return cls.registrar([Delta(producto_id, -abs(cantidad), motivo, referencia)], **kwargs)
+
+    @staticmethod
+    @contextmanager
+    def suspendido():
+        """
+        Desactiva los receivers de DetalleCompra/DetalleVenta mientras dure el bloque.
+        Se usa cuando el llamador ya registró el ajuste en el libro (p. ej. al borrar
+        una venta cuyo stock se repuso en lote) para no aplicarlo dos veces.
+        """
+        token = _suspendido.set(True)
+        try:
+            yield
+        finally:
+            _suspendido.reset(token)
+
+    @staticmethod
+    def esta_suspendido():
+        return _suspendido.get()
+
+    @staticmethod
+    def recalcular_stock_bajo(ids=None):
+        """
+        Recalcula Producto.stock_bajo con un UPDATE. Para escrituras masivas de
+        stock_minimo (queryset.update / bulk_update) que no pasan por save().
+        """
+        qs = Producto.objects.all() if ids is None else Producto.objects.filter(pk__in=list(ids))
+        return qs.update(stock_bajo=ExpressionWrapper(Q(stock__lte=F("stock_minimo")), output_field=BooleanField()))
@@ -0,0 +1,59 @@
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventario import archivo
+
+
+def _inicio_de_mes(hoy, meses_atras):
+    """Primer día del mes ``meses_atras`` meses antes del de ``hoy``."""
+    indice = hoy.year * 12 + (hoy.month - 1) - meses_atras
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve ventas cerradas y movimientos de stock antiguos a las tablas de archivo "
+        "(o restaura el último periodo archivado con --restaurar)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--meses", type=int, default=12,
+                            help="Meses completos que se dejan en las tablas activas (corte al inicio de mes).")
+        parser.add_argument("--hasta", help="Día de corte (YYYY-MM-DD, exclusivo). Reemplaza a --meses.")
+        parser.add_argument("--lote", type=int, default=archivo.LOTE,
+                            help="Filas movidas por transacción.")
+        parser.add_argument("--restaurar", action="store_true",
+                            help="Devuelve a las tablas activas el último periodo archivado.")
+
+    def handle(self, *args, **opts):
+        lote = max(1, opts["lote"])
+        try:
+            if opts["restaurar"]:
+                periodo = archivo.restaurar(lote)
+                self.stdout.write(self.style.SUCCESS(
+                    f"Restaurado el periodo hasta {timezone.localtime(periodo.hasta):%Y-%m-%d}: "
+                    f"{periodo.ventas} ventas, {periodo.movimientos} movimientos."
+                ))
+                return
+
+            if opts["hasta"]:
+                try:
+                    hasta = date.fromisoformat(opts["hasta"])
+                except ValueError:
+                    raise CommandError("--hasta debe tener formato YYYY-MM-DD")
+            else:
+                if opts["meses"] < 0:
+                    raise CommandError("--meses no puede ser negativo")
+                hasta = _inicio_de_mes(timezone.localdate(), opts["meses"])
+
+            periodo = archivo.archivar(hasta, lote)
+        except ValidationError as e:
+            raise CommandError(" ".join(e.messages))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archivado hasta {hasta:%Y-%m-%d}: {periodo.ventas} ventas, "
+            f"{periodo.detalles} detalles, {periodo.movimientos} movimientos."
+        ))
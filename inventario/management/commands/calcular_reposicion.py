@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario import reposicion
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula velocidad de venta, variabilidad, días de cobertura y punto/cantidad de "
+        "reposición de todo el catálogo (requiere NumPy). Resultado en SugerenciaReposicion."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ventana", type=int, default=90, help="Días de historia a considerar.")
+        parser.add_argument("--plazo", type=float, default=3, help="Días que tarda en llegar un pedido.")
+        parser.add_argument("--cobertura", type=float, default=7, help="Días de venta que debe cubrir el pedido.")
+        parser.add_argument("--z", type=float, default=1.65, help="Factor de nivel de servicio (1.65 ≈ 95%%).")
+        parser.add_argument("--fuente", choices=reposicion.FUENTES, default="resumenes",
+                            help="resumenes: ResumenVentaProducto diario (rápido); detalles: DetalleVenta.")
+
+    def handle(self, *args, **opts):
+        if not reposicion.disponible():
+            raise CommandError("Falta NumPy: pip install numpy")
+        if opts["ventana"] < 1:
+            raise CommandError("--ventana debe ser mayor que 0")
+        t0 = time.monotonic()
+        n = reposicion.calcular(
+            ventana=opts["ventana"], plazo=opts["plazo"], cobertura=opts["cobertura"],
+            z=opts["z"], fuente=opts["fuente"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Sugerencias calculadas para {n} productos en {time.monotonic() - t0:.1f} s."
+        ))
@@ -0,0 +1,47 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario import exportacion
+
+
+class Command(BaseCommand):
+    help = "Exporta ventas, compras o kardex en CSV/NDJSON en streaming (memoria constante)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("conjunto", choices=sorted(exportacion.CONJUNTOS))
+        parser.add_argument("--formato", choices=exportacion.FORMATOS, default="csv")
+        parser.add_argument("--desde", help="Primer día (YYYY-MM-DD), hora local.")
+        parser.add_argument("--hasta", help="Último día (YYYY-MM-DD), inclusive.")
+        parser.add_argument("--producto", type=int, action="append", help="Id de producto (repetible).")
+        parser.add_argument("--gzip", action="store_true", help="Comprime la salida con gzip.")
+        parser.add_argument("--salida", help="Archivo de destino. Por defecto, salida estándar.")
+
+    def _fecha(self, texto, nombre):
+        if not texto:
+            return None
+        try:
+            return date.fromisoformat(texto)
+        except ValueError:
+            raise CommandError(f"--{nombre} debe tener formato YYYY-MM-DD")
+
+    def handle(self, *args, **opts):
+        bloques = exportacion.exportar(
+            opts["conjunto"],
+            formato=opts["formato"],
+            desde=self._fecha(opts["desde"], "desde"),
+            hasta=self._fecha(opts["hasta"], "hasta"),
+            productos=opts["producto"],
+            gzip=opts["gzip"],
+        )
+        if opts["salida"]:
+            with open(opts["salida"], "wb") as f:
+                for b in bloques:
+                    f.write(b)
+            self.stderr.write(self.style.SUCCESS(f"Exportado en {opts['salida']}"))
+        else:
+            destino = sys.stdout.buffer
+            for b in bloques:
+                destino.write(b)
+            destino.flush()
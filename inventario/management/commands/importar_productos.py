@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario import importacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa productos (y su stock inicial) desde un CSV o XLSX, en bloques. "
+        "Con --simular valida todo contra la BD y deshace los cambios."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta del archivo .csv o .xlsx.")
+        parser.add_argument("--lote", type=int, default=importacion.LOTE, help="Filas por transacción.")
+        parser.add_argument("--simular", action="store_true", help="Valida e informa sin guardar nada.")
+        parser.add_argument("--crear-categorias", action="store_true",
+                            help="Crea las categorías que no existan (si no, la fila queda con error).")
+        parser.add_argument("--encoding", default="utf-8-sig", help="Codificación del CSV (p. ej. latin-1).")
+        parser.add_argument("--errores", type=int, default=50, help="Errores a mostrar (0 = ninguno).")
+
+    def handle(self, *args, **opts):
+        if opts["lote"] < 1:
+            raise CommandError("--lote debe ser positivo")
+        inicio = time.perf_counter()
+
+        def progreso(resumen):
+            segundos = time.perf_counter() - inicio
+            self.stdout.write(f"  {resumen.leidas:>9} filas  {resumen.leidas / segundos:8.0f} filas/s", ending="\r")
+            self.stdout.flush()
+
+        try:
+            with open(opts["archivo"], "rb") as archivo:
+                _columnas, filas = importacion.leer(archivo, opts["archivo"], opts["encoding"])
+                resumen = importacion.importar(
+                    filas, lote=opts["lote"], simular=opts["simular"],
+                    crear_categorias=opts["crear_categorias"], progreso=progreso,
+                )
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write("")
+        for fila, mensaje in resumen.errores[:opts["errores"]]:
+            self.stderr.write(f"Fila {fila}: {mensaje}")
+        if resumen.con_error > opts["errores"]:
+            self.stderr.write(f"... y {resumen.con_error - opts['errores']} errores más.")
+        estilo = self.style.WARNING if resumen.con_error else self.style.SUCCESS
+        prefijo = "[simulación] " if opts["simular"] else ""
+        self.stdout.write(estilo(f"{prefijo}{resumen} en {time.perf_counter() - inicio:.1f} s"))
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from inventario.api import ProductoViewSet, MovimientoViewSet
+from inventario.models import Categoria, Producto
+
+
+class _Deshacer(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el listado rápido (.values()) de la API con el list() de DRF. "
+        "Con --crear N agrega N productos de prueba dentro de una transacción que se deshace."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--crear", type=int, default=0, help="Productos de prueba a crear (se deshacen al final).")
+        parser.add_argument("--repeticiones", type=int, default=3)
+        parser.add_argument("--fields", default="", help="Valor de ?fields= a medir además del listado completo.")
+
+    def _medir(self, vista, params, rapido, repeticiones):
+        if not rapido:
+            # mismo ViewSet con el list() de DRF
+            vista = type(f"{vista.__name__}DRF", (vista,), {"lista_rapida": lambda self, qs: None})
+        view = vista.as_view({"get": "list"})
+        mejor, filas = None, 0
+        for _ in range(repeticiones):
+            request = APIRequestFactory().get("/", params)
+            inicio = time.perf_counter()
+            respuesta = view(request)
+            datos = respuesta.data
+            filas = len(datos["results"] if isinstance(datos, dict) else datos)
+            segundos = time.perf_counter() - inicio
+            mejor = segundos if mejor is None else min(mejor, segundos)
+        return mejor, filas
+
+    def handle(self, *args, **opts):
+        if opts["crear"] < 0 or opts["repeticiones"] < 1:
+            raise CommandError("--crear y --repeticiones deben ser positivos")
+        try:
+            with transaction.atomic():
+                if opts["crear"]:
+                    categoria, _ = Categoria.objects.get_or_create(nombre="__medicion__")
+                    Producto.objects.bulk_create(
+                        [Producto(codigo=f"__M{i:07d}", nombre=f"Medición {i}", categoria=categoria, precio=i % 5000)
+                         for i in range(opts["crear"])],
+                        batch_size=2000,
+                    )
+                casos = [("productos", ProductoViewSet, {}), ("movimientos", MovimientoViewSet, {"limite": 500})]
+                if opts["fields"]:
+                    casos.append((f"productos?fields={opts['fields']}", ProductoViewSet, {"fields": opts["fields"]}))
+                for nombre, vista, params in casos:
+                    lento, filas = self._medir(vista, params, False, opts["repeticiones"])
+                    rapido, _ = self._medir(vista, params, True, opts["repeticiones"])
+                    self.stdout.write(
+                        f"{nombre:<32} {filas:>7} filas   DRF {lento * 1000:8.1f} ms   "
+                        f"values() {rapido * 1000:8.1f} ms   x{lento / rapido if rapido else 0:.1f}"
+                    )
+                raise _Deshacer
+        except _Deshacer:
+            pass
@@ -0,0 +1,112 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from inventario.models import Producto
+
+_HOST = {"host": "localhost"}
+
+
+def _resumen(latencias, total):
+    latencias = sorted(latencias)
+    p95 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))]
+    return (
+        f"{len(latencias) / total:8.0f} req/s   "
+        f"p50 {statistics.median(latencias) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms"
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara los endpoints de lectura del POS (búsqueda, preview, catálogo) por el camino "
+        "WSGI (vistas sync, un hilo ocupado por petición) y por el ASGI (vistas async de "
+        "inventario/api_async.py, concurrentes en un event loop). Usa los productos existentes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--peticiones", type=int, default=500, help="Peticiones por endpoint y camino.")
+        parser.add_argument("--hilos", type=int, default=8, help="Hilos del servidor WSGI simulado.")
+        parser.add_argument("--concurrencia", type=int, default=100, help="Peticiones simultáneas en ASGI.")
+
+    def _terminos(self):
+        """Prefijos de nombres y códigos reales, como los que teclea la caja."""
+        terminos = []
+        for codigo, nombre in Producto.objects.filter(activo=True).values_list("codigo", "nombre")[:200]:
+            terminos += [codigo, nombre[:3], nombre.split()[0][:5]]
+        return terminos or ["a"]
+
+    def _wsgi(self, rutas, hilos):
+        local = threading.local()
+
+        def una(ruta):
+            cliente = getattr(local, "cliente", None)
+            if cliente is None:
+                cliente = local.cliente = Client(headers=_HOST)
+            inicio = time.perf_counter()
+            respuesta = cliente.get(ruta)
+            if respuesta.status_code != 200:
+                raise CommandError(f"{ruta}: HTTP {respuesta.status_code}")
+            return time.perf_counter() - inicio
+
+        def cerrar(_):
+            connections.close_all()
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(hilos) as ejecutor:
+            latencias = list(ejecutor.map(una, rutas))
+            list(ejecutor.map(cerrar, range(hilos)))
+        return latencias, time.perf_counter() - inicio
+
+    async def _asgi(self, rutas, concurrencia):
+        cliente = AsyncClient(headers=_HOST)
+        semaforo = asyncio.Semaphore(concurrencia)
+
+        async def una(ruta):
+            async with semaforo:
+                inicio = time.perf_counter()
+                respuesta = await cliente.get(ruta)
+                if respuesta.status_code != 200:
+                    raise CommandError(f"{ruta}: HTTP {respuesta.status_code}")
+                return time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        latencias = await asyncio.gather(*(una(r) for r in rutas))
+        return latencias, time.perf_counter() - inicio
+
+    def handle(self, *args, **opts):
+        if min(opts["peticiones"], opts["hilos"], opts["concurrencia"]) < 1:
+            raise CommandError("--peticiones, --hilos y --concurrencia deben ser positivos")
+        terminos = self._terminos()
+        n = opts["peticiones"]
+        casos = [
+            ("producto-info", "inventario:producto_info", "inventario:producto_info_async", {}),
+            ("producto-buscar", "inventario:producto_buscar", "inventario:producto_buscar_async", {"n": 10}),
+            ("catalogo", "inventario:catalogo", "inventario:catalogo_async", None),
+        ]
+        self.stdout.write(
+            f"{len(terminos)} términos de búsqueda; {n} peticiones por caso; "
+            f"WSGI {opts['hilos']} hilos, ASGI {opts['concurrencia']} simultáneas"
+        )
+        for nombre, sync, asincrona, parametros in casos:
+            consultas = [
+                "" if parametros is None else "?" + urlencode({"q": terminos[i % len(terminos)], **parametros})
+                for i in range(n)
+            ]
+            rutas_sync = [reverse(sync) + c for c in consultas]
+            rutas_async = [reverse(asincrona) + c for c in consultas]
+            # Calentamiento: carga del índice y de la caché del catálogo
+            Client(headers=_HOST).get(rutas_sync[0])
+            asyncio.run(self._asgi(rutas_async[:1], 1))
+
+            latencias, total = self._wsgi(rutas_sync, opts["hilos"])
+            self.stdout.write(f"{nombre:<16} WSGI {_resumen(latencias, total)}")
+            latencias, total = asyncio.run(self._asgi(rutas_async, opts["concurrencia"]))
+            self.stdout.write(f"{nombre:<16} ASGI {_resumen(latencias, total)}")
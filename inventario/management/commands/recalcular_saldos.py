@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from inventario.models import Cliente
+from inventario import deudas
+
+
+class Command(BaseCommand):
+    help = "Recalcula el saldo materializado (SaldoCliente) de todos los clientes desde sus ventas a deuda."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=1000, help="Clientes por transacción.")
+
+    def handle(self, *args, **opts):
+        lote = max(1, opts["lote"])
+        hechos, ultimo = 0, 0
+        while True:
+            ids = list(Cliente.objects.filter(pk__gt=ultimo).order_by("pk").values_list("pk", flat=True)[:lote])
+            if not ids:
+                break
+            hechos += deudas.recalcular_saldos(ids)
+            ultimo = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f"Saldos recalculados: {hechos} cliente(s)."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from inventario.models import Venta, Compra
+from inventario import totales
+
+
+class Command(BaseCommand):
+    help = "Recalcula los totales guardados (total, items) de ventas y compras desde sus detalles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=5000,
+                            help="Documentos por UPDATE (evita transacciones muy largas).")
+
+    def handle(self, *args, **opts):
+        lote = max(1, opts["lote"])
+        for modelo in (Venta, Compra):
+            hechos, ultimo = 0, 0
+            while True:
+                ids = list(modelo.objects.filter(pk__gt=ultimo).order_by("pk").values_list("pk", flat=True)[:lote])
+                if not ids:
+                    break
+                with transaction.atomic():
+                    hechos += totales.recalcular(modelo, modelo.objects.filter(pk__in=ids))
+                ultimo = ids[-1]
+            self.stdout.write(f"{modelo._meta.verbose_name_plural}: {hechos}")
+        self.stdout.write(self.style.SUCCESS("Totales recalculados."))
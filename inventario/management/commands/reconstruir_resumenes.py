@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventario.models import Venta, VentaArchivada
+from inventario import resumenes
+
+
+class Command(BaseCommand):
+    help = "Recalcula los resúmenes de ventas (hora/día, producto/categoría) desde los detalles de venta."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", help="Primer día (YYYY-MM-DD). Por defecto, el de la venta más antigua.")
+        parser.add_argument("--hasta", help="Último día (YYYY-MM-DD). Por defecto, hoy.")
+        parser.add_argument("--dias-por-lote", type=int, default=31,
+                            help="Días recalculados por transacción.")
+
+    def _fecha(self, texto, nombre):
+        try:
+            return date.fromisoformat(texto)
+        except ValueError:
+            raise CommandError(f"--{nombre} debe tener formato YYYY-MM-DD")
+
+    def handle(self, *args, **opts):
+        hasta = self._fecha(opts["hasta"], "hasta") if opts["hasta"] else timezone.localdate()
+        if opts["desde"]:
+            desde = self._fecha(opts["desde"], "desde")
+        else:
+            fechas = [
+                m.objects.order_by("fecha").values_list("fecha", flat=True).first()
+                for m in (VentaArchivada, Venta)
+            ]
+            fechas = [f for f in fechas if f is not None]
+            if not fechas:
+                self.stdout.write("No hay ventas.")
+                return
+            desde = timezone.localtime(min(fechas)).date()
+        if desde > hasta:
+            raise CommandError("--desde no puede ser posterior a --hasta")
+
+        paso = timedelta(days=max(1, opts["dias_por_lote"]))
+        total, ini = 0, desde
+        while ini <= hasta:
+            fin = min(ini + paso - timedelta(days=1), hasta)
+            n = resumenes.reconstruir(ini, fin)
+            self.stdout.write(f"{ini:%Y-%m-%d} .. {fin:%Y-%m-%d}: {n} filas")
+            total += n
+            ini = fin + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f"Resúmenes reconstruidos: {total} filas."))
@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventario import historico
+
+
+class Command(BaseCommand):
+    help = (
+        "Guarda el stock de todos los productos a medianoche (America/Santiago). "
+        "Programarlo una vez al día, p. ej. cron: 5 0 * * * python manage.py snapshot_stock"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fecha", help="Día (YYYY-MM-DD) cuya medianoche se guarda. Por defecto, hoy.")
+        parser.add_argument("--dias", type=int, default=1,
+                            help="Cantidad de días hacia atrás desde --fecha (relleno de días sin snapshot).")
+        parser.add_argument("--rehacer", action="store_true",
+                            help="Vuelve a calcular también los días que ya tienen snapshot.")
+
+    def handle(self, *args, **opts):
+        if opts["fecha"]:
+            try:
+                hasta = date.fromisoformat(opts["fecha"])
+            except ValueError:
+                raise CommandError("--fecha debe tener formato YYYY-MM-DD")
+        else:
+            hasta = timezone.localdate()
+        if opts["dias"] < 1:
+            raise CommandError("--dias debe ser mayor que 0")
+
+        desde = hasta - timedelta(days=opts["dias"] - 1)
+        if opts["rehacer"]:
+            dias = [desde + timedelta(days=i) for i in range(opts["dias"])]
+        else:
+            dias = historico.dias_sin_snapshot(desde, hasta)
+
+        if not dias:
+            self.stdout.write("Sin días pendientes.")
+            return
+        for dia in dias:
+            n = historico.tomar_snapshot(historico.medianoche(dia))
+            self.stdout.write(f"{dia:%Y-%m-%d}: {n} productos")
+        self.stdout.write(self.style.SUCCESS(f"Snapshots guardados: {len(dias)} día(s)"))
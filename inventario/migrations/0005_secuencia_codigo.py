@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0004_catalogo_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaCodigo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefijo', models.CharField(blank=True, max_length=10, unique=True)),
+                ('ultimo', models.PositiveBigIntegerField(default=0)),
+                ('relleno', models.PositiveSmallIntegerField(default=3)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='categoria',
+            name='prefijo_codigo',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0005_secuencia_codigo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(db_index=True)),
+                ('stock', models.DecimalField(decimal_places=3, max_digits=12)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='movimientostock',
+            index=models.Index(fields=['producto', 'fecha'], name='movimiento_producto_fecha'),
+        ),
+        migrations.AddField(
+            model_name='snapshotstock',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventario.producto'),
+        ),
+        migrations.AddConstraint(
+            model_name='snapshotstock',
+            constraint=models.UniqueConstraint(fields=('producto', 'fecha'), name='snapshot_producto_fecha_unico'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0007_totales_guardados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='abonado',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.CreateModel(
+            name='AbonoDeuda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('observacion', models.CharField(blank=True, max_length=200)),
+                ('venta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='abonos', to='inventario.venta')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SaldoCliente',
+            fields=[
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='saldo', serialize=False, to='inventario.cliente')),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('deudas_abiertas', models.PositiveIntegerField(default=0)),
+                ('ultima_deuda', models.DateTimeField(blank=True, null=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('deudas_abiertas__gt', 0)), fields=['-ultima_deuda'], name='saldo_deudores')],
+            },
+        ),
+    ]
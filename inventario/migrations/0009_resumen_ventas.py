@@ -0,0 +1,57 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0008_saldo_cliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenVentaProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(choices=[('H', 'Hora'), ('D', 'Día')], max_length=1)),
+                ('inicio', models.DateTimeField()),
+                ('cantidad', models.DecimalField(decimal_places=3, default=0, max_digits=16)),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('ventas', models.PositiveIntegerField(default=0)),
+                ('monto_deuda', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('ventas_deuda', models.PositiveIntegerField(default=0)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_venta', to='inventario.producto')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenVentaCategoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(choices=[('H', 'Hora'), ('D', 'Día')], max_length=1)),
+                ('inicio', models.DateTimeField()),
+                ('cantidad', models.DecimalField(decimal_places=3, default=0, max_digits=16)),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('ventas', models.PositiveIntegerField(default=0)),
+                ('monto_deuda', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('ventas_deuda', models.PositiveIntegerField(default=0)),
+                ('categoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_venta', to='inventario.categoria')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['categoria', 'periodo', 'inicio'], name='resumen_categoria_serie')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='resumenventacategoria',
+            constraint=models.UniqueConstraint(fields=('periodo', 'inicio', 'categoria'), name='resumen_categoria_unico'),
+        ),
+        migrations.AddIndex(
+            model_name='resumenventaproducto',
+            index=models.Index(fields=['producto', 'periodo', 'inicio'], name='resumen_producto_serie'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumenventaproducto',
+            constraint=models.UniqueConstraint(fields=('periodo', 'inicio', 'producto'), name='resumen_producto_unico'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0009_resumen_ventas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='compra',
+            name='fecha',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='movimientostock',
+            name='fecha',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='venta',
+            name='fecha',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:48
+
+from django.db import migrations, models
+
+
+def marcar_stock_bajo(apps, schema_editor):
+    Producto = apps.get_model("inventario", "Producto")
+    Producto.objects.filter(stock__lte=models.F("stock_minimo")).update(stock_bajo=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0010_fecha_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='stock_bajo',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('stock_bajo', True)), fields=['nombre'], name='producto_stock_bajo'),
+        ),
+        migrations.RunPython(marcar_stock_bajo, migrations.RunPython.noop),
+    ]
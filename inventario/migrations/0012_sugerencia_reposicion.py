@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0011_producto_stock_bajo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SugerenciaReposicion',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sugerencia', serialize=False, to='inventario.producto')),
+                ('calculado', models.DateTimeField()),
+                ('dias_historia', models.PositiveIntegerField(default=0)),
+                ('venta_diaria', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('desviacion_diaria', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('stock', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('dias_cobertura', models.DecimalField(blank=True, decimal_places=1, max_digits=10, null=True)),
+                ('punto_reorden', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('cantidad_sugerida', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+            ],
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:54
+
+from decimal import Decimal
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def saldo_inicial(apps, schema_editor):
+    """Capa de apertura para el stock existente, al último costo de compra de cada producto."""
+    Producto = apps.get_model("inventario", "Producto")
+    DetalleCompra = apps.get_model("inventario", "DetalleCompra")
+    CapaCosto = apps.get_model("inventario", "CapaCosto")
+    CostoProducto = apps.get_model("inventario", "CostoProducto")
+
+    ultimo_costo = (DetalleCompra.objects
+                    .filter(producto_id=models.OuterRef("pk"))
+                    .order_by("-compra__fecha", "-id")
+                    .values("costo_unitario")[:1])
+    ahora = django.utils.timezone.now()
+    capas, estados = [], []
+    for pk, stock, costo in (Producto.objects.filter(stock__gt=0)
+                             .annotate(ultimo=models.Subquery(ultimo_costo))
+                             .values_list("pk", "stock", "ultimo").iterator()):
+        costo = costo or Decimal("0")
+        capas.append(CapaCosto(producto_id=pk, fecha=ahora, cantidad=stock, restante=stock,
+                               costo_unitario=costo, referencia="Saldo inicial"))
+        estados.append(CostoProducto(producto_id=pk, cantidad=stock, costo_promedio=costo,
+                                     valor_fifo=stock * costo))
+    CapaCosto.objects.bulk_create(capas, batch_size=1000)
+    CostoProducto.objects.bulk_create(estados, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0012_sugerencia_reposicion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CostoProducto',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='costo', serialize=False, to='inventario.producto')),
+                ('cantidad', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('costo_promedio', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('valor_fifo', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='detalleventa',
+            name='costo_fifo',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='detalleventa',
+            name='costo_promedio',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='movimientostock',
+            name='costo_fifo',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='movimientostock',
+            name='costo_promedio',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.CreateModel(
+            name='CapaCosto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cantidad', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('restante', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('costo_unitario', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('referencia', models.CharField(blank=True, max_length=80)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='capas_costo', to='inventario.producto')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('restante__gt', 0)), fields=['producto', 'fecha', 'id'], name='capa_costo_abierta')],
+            },
+        ),
+        migrations.RunPython(saldo_inicial, migrations.RunPython.noop),
+    ]
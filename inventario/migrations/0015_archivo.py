@@ -0,0 +1,75 @@
+# Generated by Django 5.0.14 on 2026-10-18 00:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0014_producto_nombre_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodoArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('desde', models.DateTimeField(blank=True, null=True)),
+                ('hasta', models.DateTimeField(unique=True)),
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ventas', models.PositiveIntegerField(default=0)),
+                ('detalles', models.PositiveIntegerField(default=0)),
+                ('movimientos', models.PositiveIntegerField(default=0)),
+                ('restaurado', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VentaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha', models.DateTimeField(db_index=True)),
+                ('observacion', models.TextField(blank=True)),
+                ('es_deuda', models.BooleanField(default=False)),
+                ('saldada', models.BooleanField(default=False)),
+                ('clave_idempotencia', models.CharField(blank=True, max_length=64, null=True)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('items', models.PositiveIntegerField(default=0)),
+                ('abonado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('abonos', models.JSONField(blank=True, default=list)),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ventas_archivadas', to='inventario.cliente')),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ventas_archivadas', to='inventario.periodoarchivo')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DetalleVentaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('cantidad', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('precio_unitario', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('costo_fifo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('costo_promedio', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='inventario.producto')),
+                ('venta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='detalles', to='inventario.ventaarchivada')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MovimientoArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('E', 'Entrada'), ('S', 'Salida')], max_length=1)),
+                ('cantidad', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('motivo', models.CharField(blank=True, max_length=120)),
+                ('fecha', models.DateTimeField(db_index=True)),
+                ('referencia', models.CharField(blank=True, max_length=80)),
+                ('costo_fifo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('costo_promedio', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movimientos_archivados', to='inventario.producto')),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movimientos_archivados', to='inventario.periodoarchivo')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['producto', 'fecha'], name='mov_archivado_producto_fecha')],
+            },
+        ),
+    ]
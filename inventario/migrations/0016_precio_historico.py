@@ -0,0 +1,41 @@
+# Generated by Django 5.0.14 on 2026-10-18 00:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def precio_inicial(apps, schema_editor):
+    """Un registro por producto con su precio actual, vigente desde la migración."""
+    Producto = apps.get_model("inventario", "Producto")
+    PrecioHistorico = apps.get_model("inventario", "PrecioHistorico")
+    ahora = django.utils.timezone.now()
+    PrecioHistorico.objects.bulk_create(
+        (PrecioHistorico(producto_id=pk, precio=precio, desde=ahora, motivo="Precio inicial")
+         for pk, precio in Producto.objects.values_list("pk", "precio").iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0015_archivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecioHistorico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precio', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('desde', models.DateTimeField(default=django.utils.timezone.now)),
+                ('motivo', models.CharField(blank=True, max_length=120)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='precios', to='inventario.producto')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['producto', '-desde', '-id'], name='precio_producto_desde')],
+            },
+        ),
+        migrations.RunPython(precio_inicial, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,70 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
 from django.utils import timezone
 
+class ContadorVersion(models.Model):
+    """
+    Contador monotónico por nombre (p. ej. 'catalogo').
+    Se incrementa con UPDATE ... SET valor = valor + 1 dentro de la transacción.
+    """
+    nombre = models.CharField(max_length=60, unique=True)
+    valor = models.PositiveBigIntegerField(default=0)
+    actualizado = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.nombre} v{self.valor}"
+
+
+class VersionadoQuerySet(models.QuerySet):
+    """
+    QuerySet de las tablas versionadas (inventario/versiones.py): las
+    escrituras masivas, que no disparan señales, también suben la versión.
+    """
+
+    def _modificada(self):
+        from . import versiones
+        versiones.tabla_modificada(self.model)
+
+    def update(self, **kwargs):
+        filas = super().update(**kwargs)
+        if filas:
+            self._modificada()
+        return filas
+
+    def bulk_create(self, objs, *args, **kwargs):
+        creados = super().bulk_create(objs, *args, **kwargs)
+        if creados:
+            self._modificada()
+        return creados
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        filas = super().bulk_update(objs, fields, *args, **kwargs)
+        if filas:
+            self._modificada()
+        return filas
+
+
+class SecuenciaCodigo(models.Model):
+    """
+    Último correlativo asignado por prefijo de código de producto
+    ('' = secuencia general: 001, 002, ...). Ver inventario/codigos.py.
+    """
+    prefijo = models.CharField(max_length=10, unique=True, blank=True)
+    ultimo = models.PositiveBigIntegerField(default=0)
+    relleno = models.PositiveSmallIntegerField(default=3)
+
+    def __str__(self):
+        return f"{self.prefijo or '(general)'}: {self.ultimo}"
+
+
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
     descripcion = models.TextField(blank=True)
+    # Prefijo opcional para los códigos de sus productos (p. ej. 'FRU' -> FRU001)
+    prefijo_codigo = models.CharField(max_length=10, blank=True)
+
+    objects = VersionadoQuerySet.as_manager()
 
     def __str__(self):
         return self.nombre
@@ -17,6 +78,8 @@ class Proveedor(models.Model):
     direccion = models.CharField(max_length=200, blank=True)
     activo = models.BooleanField(default=True)
 
+    objects = VersionadoQuerySet.as_manager()
+
     def __str__(self):
         return self.nombre
 
@@ -42,6 +105,31 @@ class Producto(models.Model):
     stock = models.DecimalField(max_digits=12, decimal_places=3, default=0)
     stock_minimo = models.DecimalField(max_digits=12, decimal_places=3, default=0)
     activo = models.BooleanField(default=True)
+    # Versión del catálogo en que cambió por última vez (sincronización de cajas)
+    version = models.PositiveBigIntegerField(default=0, db_index=True)
+    # stock <= stock_minimo. Lo mantienen save() y InventoryLedger (UPDATE de stock)
+    stock_bajo = models.BooleanField(default=False, editable=False)
+
+    objects = VersionadoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['nombre'], name='producto_stock_bajo',
+                         condition=models.Q(stock_bajo=True)),
+            # listado paginado por cursor (nombre, id)
+            models.Index(fields=['nombre', 'id'], name='producto_nombre_id'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.stock_bajo = (self.stock or 0) <= (self.stock_minimo or 0)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"stock", "stock_minimo"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "stock_bajo"}
+        # La versión del catálogo se toma en pre_save (signals.versionar_producto):
+        # contador y fila se confirman juntos, así una caja no ve la versión
+        # nueva antes que el producto
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.codigo} - {self.nombre}"
@@ -49,11 +137,13 @@ class Producto(models.Model):
 
 class Compra(models.Model):
     proveedor = models.ForeignKey(Proveedor, on_delete=models.PROTECT, related_name='compras')
-    fecha = models.DateTimeField(default=timezone.now)
+    fecha = models.DateTimeField(default=timezone.now, db_index=True)
     observacion = models.TextField(blank=True)
 
-    def total(self):
-        return sum(d.subtotal() for d in self.detalles.all())
+    # Totales guardados; los mantiene la escritura de los detalles
+    # (checkout, compra_nueva y las señales de inventario/signals.py).
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    items = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"Compra #{self.id} - {self.proveedor} - {self.fecha:%Y-%m-%d}"
@@ -71,15 +161,28 @@ class DetalleCompra(models.Model):
 
 class Venta(models.Model):
     cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT, related_name='ventas', null=True, blank=True)
-    fecha = models.DateTimeField(default=timezone.now)
+    fecha = models.DateTimeField(default=timezone.now, db_index=True)
     observacion = models.TextField(blank=True)
 
     # --------- NUEVO: soporte a deuda ----------
     es_deuda = models.BooleanField(default=False)   # True: venta a crédito/fiada
     saldada = models.BooleanField(default=False)    # True: deuda pagada
 
-    def total(self):
-        return sum(d.subtotal() for d in self.detalles.all())
+    # Clave generada por la caja (POS) para sincronizar sin duplicar ventas
+    clave_idempotencia = models.CharField(max_length=64, unique=True, null=True, blank=True)
+
+    # Totales guardados; los mantiene la escritura de los detalles
+    # (checkout, compra_nueva y las señales de inventario/signals.py).
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    items = models.PositiveIntegerField(default=0, editable=False)
+
+    # Suma de los abonos (pagos parciales) de una venta a deuda
+    abonado = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+
+    def saldo_pendiente(self):
+        if not self.es_deuda or self.saldada:
+            return Decimal("0")
+        return self.total - self.abonado
 
     def __str__(self):
         tipo = "Deuda" if self.es_deuda else "Venta"
@@ -91,11 +194,46 @@ class DetalleVenta(models.Model):
     producto = models.ForeignKey(Producto, on_delete=models.PROTECT)
     cantidad = models.DecimalField(max_digits=12, decimal_places=3)
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
+    # Costo de lo vendido en esta línea, fijado al vender (ver inventario/costos.py)
+    costo_fifo = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    costo_promedio = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
 
     def subtotal(self):
         return self.cantidad * self.precio_unitario
 
 
+class AbonoDeuda(models.Model):
+    """Pago parcial de una venta a deuda (ver inventario/deudas.py)."""
+    venta = models.ForeignKey(Venta, on_delete=models.CASCADE, related_name='abonos')
+    monto = models.DecimalField(max_digits=14, decimal_places=2)
+    fecha = models.DateTimeField(default=timezone.now)
+    observacion = models.CharField(max_length=200, blank=True)
+
+    def __str__(self):
+        return f"Abono ${self.monto} a Venta #{self.venta_id}"
+
+
+class SaldoCliente(models.Model):
+    """
+    Deuda pendiente de cada cliente, materializada para el listado de deudores.
+    La recalcula inventario/deudas.py cada vez que cambia una venta a deuda.
+    """
+    cliente = models.OneToOneField(Cliente, on_delete=models.CASCADE, primary_key=True, related_name='saldo')
+    saldo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    deudas_abiertas = models.PositiveIntegerField(default=0)
+    ultima_deuda = models.DateTimeField(null=True, blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-ultima_deuda'], name='saldo_deudores',
+                         condition=models.Q(deudas_abiertas__gt=0)),
+        ]
+
+    def __str__(self):
+        return f"{self.cliente}: ${self.saldo} ({self.deudas_abiertas} deuda/s)"
+
+
 class MovimientoStock(models.Model):
     ENTRADA = 'E'
     SALIDA = 'S'
@@ -105,8 +243,255 @@ class MovimientoStock(models.Model):
     tipo = models.CharField(max_length=1, choices=TIPO_CHOICES)
     cantidad = models.DecimalField(max_digits=12, decimal_places=3)
     motivo = models.CharField(max_length=120, blank=True)
-    fecha = models.DateTimeField(default=timezone.now)
+    fecha = models.DateTimeField(default=timezone.now, db_index=True)
     referencia = models.CharField(max_length=80, blank=True)  # ej: Compra#ID, Venta#ID
+    # Valor del movimiento (FIFO y costo promedio), lo calcula InventoryLedger
+    costo_fifo = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    costo_promedio = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+
+    objects = VersionadoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['producto', 'fecha'], name='movimiento_producto_fecha'),
+        ]
 
     def __str__(self):
         return f"{self.get_tipo_display()} {self.cantidad} de {self.producto} en {self.fecha:%Y-%m-%d}"
+
+
+class CatalogoBaja(models.Model):
+    """Productos eliminados, para informar la baja a las cajas en la sincronización."""
+    producto_id = models.BigIntegerField()
+    version = models.PositiveBigIntegerField(db_index=True)
+    fecha = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Baja producto #{self.producto_id} (v{self.version})"
+
+
+class SnapshotStock(models.Model):
+    """
+    Stock de un producto en un instante (normalmente medianoche America/Santiago).
+    Permite reconstruir el stock a una fecha sin recorrer todo el kardex.
+    """
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='snapshots')
+    fecha = models.DateTimeField(db_index=True)
+    stock = models.DecimalField(max_digits=12, decimal_places=3)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'fecha'], name='snapshot_producto_fecha_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto} = {self.stock} al {self.fecha:%Y-%m-%d %H:%M}"
+
+
+class ResumenVenta(models.Model):
+    """
+    Ventas acumuladas por intervalo (hora o día, en hora de America/Santiago).
+    Las mantiene inventario/resumenes.py en cada venta; base de los reportes.
+    """
+    HORA = 'H'
+    DIA = 'D'
+    PERIODO_CHOICES = [(HORA, 'Hora'), (DIA, 'Día')]
+
+    periodo = models.CharField(max_length=1, choices=PERIODO_CHOICES)
+    inicio = models.DateTimeField()  # comienzo del intervalo
+    cantidad = models.DecimalField(max_digits=16, decimal_places=3, default=0)
+    monto = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    ventas = models.PositiveIntegerField(default=0)
+    monto_deuda = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    ventas_deuda = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def monto_contado(self):
+        return self.monto - self.monto_deuda
+
+
+class ResumenVentaProducto(ResumenVenta):
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='resumenes_venta')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'inicio', 'producto'], name='resumen_producto_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['producto', 'periodo', 'inicio'], name='resumen_producto_serie'),
+        ]
+
+
+class ResumenVentaCategoria(ResumenVenta):
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='resumenes_venta')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'inicio', 'categoria'], name='resumen_categoria_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['categoria', 'periodo', 'inicio'], name='resumen_categoria_serie'),
+        ]
+
+
+class SugerenciaReposicion(models.Model):
+    """
+    Resultado del cálculo de reposición (manage.py calcular_reposicion):
+    velocidad de venta, variabilidad, días de cobertura y punto/cantidad de pedido.
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True, related_name='sugerencia')
+    calculado = models.DateTimeField()
+    dias_historia = models.PositiveIntegerField(default=0)
+    venta_diaria = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+    desviacion_diaria = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+    stock = models.DecimalField(max_digits=12, decimal_places=3, default=0)  # stock al calcular
+    dias_cobertura = models.DecimalField(max_digits=10, decimal_places=1, null=True, blank=True)  # None: sin ventas
+    punto_reorden = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+    cantidad_sugerida = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+
+    def __str__(self):
+        return f"{self.producto}: pedir {self.cantidad_sugerida} (reorden en {self.punto_reorden})"
+
+
+class CapaCosto(models.Model):
+    """
+    Capa FIFO: unidades de un producto que entraron juntas al mismo costo unitario.
+    Las salidas consumen ``restante`` de las capas más antiguas primero.
+    """
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='capas_costo')
+    fecha = models.DateTimeField(default=timezone.now)
+    cantidad = models.DecimalField(max_digits=12, decimal_places=3)
+    restante = models.DecimalField(max_digits=12, decimal_places=3)
+    costo_unitario = models.DecimalField(max_digits=12, decimal_places=4)
+    referencia = models.CharField(max_length=80, blank=True)  # ej: Compra#ID, Saldo inicial
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['producto', 'fecha', 'id'], name='capa_costo_abierta',
+                         condition=models.Q(restante__gt=0)),
+        ]
+
+    def __str__(self):
+        return f"{self.producto}: {self.restante}/{self.cantidad} a ${self.costo_unitario}"
+
+
+class CostoProducto(models.Model):
+    """
+    Costo vigente de cada producto, mantenido en cada movimiento por inventario/costos.py:
+    costo promedio ponderado móvil y valor FIFO (suma de las capas abiertas).
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True, related_name='costo')
+    cantidad = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    costo_promedio = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    valor_fifo = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    @property
+    def valor_promedio(self):
+        return self.cantidad * self.costo_promedio
+
+    def __str__(self):
+        return f"{self.producto}: ${self.costo_promedio} c/u"
+
+
+class PrecioHistorico(models.Model):
+    """
+    Precio de venta de un producto vigente desde ``desde`` hasta el registro
+    siguiente del mismo producto. Lo escriben inventario/precios.py (ajustes y
+    altas/ediciones masivas) y la señal de Producto al cambiar el precio.
+    """
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='precios')
+    precio = models.DecimalField(max_digits=10, decimal_places=2)
+    desde = models.DateTimeField(default=timezone.now)
+    motivo = models.CharField(max_length=120, blank=True)
+
+    class Meta:
+        indexes = [
+            # precio vigente a una fecha: último 'desde' <= fecha por producto
+            models.Index(fields=['producto', '-desde', '-id'], name='precio_producto_desde'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto}: ${self.precio} desde {self.desde:%Y-%m-%d %H:%M}"
+
+
+# ---------------- Archivo (ventas y kardex de periodos cerrados) ----------------
+
+class PeriodoArchivo(models.Model):
+    """
+    Un corte de archivo (manage.py archivar): ventas cerradas y movimientos con
+    fecha anterior a ``hasta`` se movieron a las tablas *Archivada/*Archivado.
+    """
+    desde = models.DateTimeField(null=True, blank=True)  # corte anterior (None = desde el inicio)
+    hasta = models.DateTimeField(unique=True)
+    creado = models.DateTimeField(default=timezone.now)
+    ventas = models.PositiveIntegerField(default=0)
+    detalles = models.PositiveIntegerField(default=0)
+    movimientos = models.PositiveIntegerField(default=0)
+    restaurado = models.DateTimeField(null=True, blank=True)
+
+    @classmethod
+    def corte(cls):
+        """Fecha hasta la que hay datos archivados (None si no hay archivo activo)."""
+        return cls.objects.filter(restaurado__isnull=True).aggregate(m=models.Max("hasta"))["m"]
+
+    def __str__(self):
+        estado = "restaurado" if self.restaurado else "archivado"
+        return f"Archivo hasta {self.hasta:%Y-%m-%d} ({estado})"
+
+
+class VentaArchivada(models.Model):
+    """Copia de una Venta cerrada (contado o deuda saldada), con su mismo id."""
+    id = models.BigIntegerField(primary_key=True)
+    periodo = models.ForeignKey(PeriodoArchivo, on_delete=models.PROTECT, related_name='ventas_archivadas')
+    cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT, related_name='ventas_archivadas', null=True, blank=True)
+    fecha = models.DateTimeField(db_index=True)
+    observacion = models.TextField(blank=True)
+    es_deuda = models.BooleanField(default=False)
+    saldada = models.BooleanField(default=False)
+    clave_idempotencia = models.CharField(max_length=64, null=True, blank=True)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    items = models.PositiveIntegerField(default=0)
+    abonado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    abonos = models.JSONField(default=list, blank=True)  # [{"monto", "fecha", "observacion"}]
+
+    def __str__(self):
+        return f"Venta archivada #{self.id} - {self.fecha:%Y-%m-%d}"
+
+
+class DetalleVentaArchivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    venta = models.ForeignKey(VentaArchivada, on_delete=models.CASCADE, related_name='detalles')
+    producto = models.ForeignKey(Producto, on_delete=models.PROTECT, related_name='+')
+    cantidad = models.DecimalField(max_digits=12, decimal_places=3)
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
+    costo_fifo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    costo_promedio = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def subtotal(self):
+        return self.cantidad * self.precio_unitario
+
+
+class MovimientoArchivado(models.Model):
+    """Fila del kardex (MovimientoStock) de un periodo archivado, con su mismo id."""
+    id = models.BigIntegerField(primary_key=True)
+    periodo = models.ForeignKey(PeriodoArchivo, on_delete=models.PROTECT, related_name='movimientos_archivados')
+    producto = models.ForeignKey(Producto, on_delete=models.PROTECT, related_name='movimientos_archivados')
+    tipo = models.CharField(max_length=1, choices=MovimientoStock.TIPO_CHOICES)
+    cantidad = models.DecimalField(max_digits=12, decimal_places=3)
+    motivo = models.CharField(max_length=120, blank=True)
+    fecha = models.DateTimeField(db_index=True)
+    referencia = models.CharField(max_length=80, blank=True)
+    costo_fifo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    costo_promedio = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['producto', 'fecha'], name='mov_archivado_producto_fecha'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.cantidad} de {self.producto} en {self.fecha:%Y-%m-%d} (archivo)"
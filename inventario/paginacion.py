@@ -0,0 +1,135 @@
+# inventario/paginacion.py
+"""
+Paginación por cursor (keyset) para los listados HTML.
+
+Reemplaza a django.core.paginator.Paginator, que ejecuta un COUNT(*) en cada
+página y un OFFSET que crece con el número de página. Aquí cada página es una
+sola consulta acotada:
+
+    WHERE (nombre, id) > (último de la página anterior) ORDER BY nombre, id LIMIT n + 1
+
+con enlaces Primera / Anterior / Siguiente / Última y sin número de páginas.
+Cuando el listado muestra un total, este sale de total_aproximado(): la
+estimación del planificador en PostgreSQL para tablas grandes sin filtro, o un
+COUNT guardado en caché unos minutos.
+"""
+import hashlib
+
+from django.core import signing
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+_SAL = "inventario.paginacion"
+TTL_TOTAL = 300            # segundos que se reutiliza un COUNT
+UMBRAL_ESTIMACION = 50_000  # desde aquí basta la estimación de PostgreSQL
+
+
+def _campo(orden):
+    return orden.lstrip("-")
+
+
+def _invertir(orden):
+    return [o[1:] if o.startswith("-") else f"-{o}" for o in orden]
+
+
+def _despues_de(orden, valores):
+    """Filas posteriores a ``valores`` según ``orden`` (comparación de tuplas)."""
+    condicion = Q()
+    for i, o in enumerate(orden):
+        iguales = {_campo(orden[j]): valores[j] for j in range(i)}
+        op = "lt" if o.startswith("-") else "gt"
+        condicion |= Q(**iguales, **{f"{_campo(o)}__{op}": valores[i]})
+    return condicion
+
+
+def total_aproximado(queryset):
+    """(total, es_estimado) sin contar en cada página."""
+    if connection.vendor == "postgresql" and not queryset.query.where:
+        with connection.cursor() as c:
+            c.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                      [queryset.model._meta.db_table])
+            fila = c.fetchone()
+        if fila and fila[0] >= UMBRAL_ESTIMACION:
+            return fila[0], True
+    queryset = queryset.order_by()
+    clave = "total:" + hashlib.md5(str(queryset.query).encode()).hexdigest()
+    return cache.get_or_set(clave, queryset.count, TTL_TOTAL), False
+
+
+class PaginaKeyset:
+    """Página de un listado: filas, si hay más en cada sentido y sus enlaces."""
+
+    def __init__(self, request, filas, orden, hay_anterior, hay_siguiente, total=None, estimado=False):
+        self.object_list = filas
+        self.has_previous = hay_anterior
+        self.has_next = hay_siguiente
+        self.total = total
+        self.estimado = estimado
+        self._orden = orden
+        self._params = request.GET.copy()
+        for p in ("despues", "antes", "ultima", "page"):
+            self._params.pop(p, None)
+
+    def _url(self, **extra):
+        params = self._params.copy()
+        for k, v in extra.items():
+            params[k] = v
+        return f"?{params.urlencode()}" if params else "?"
+
+    def _cursor(self, obj):
+        return signing.dumps([getattr(obj, _campo(o)) for o in self._orden], salt=_SAL, compress=True)
+
+    def url_primera(self):
+        return self._url()
+
+    def url_ultima(self):
+        return self._url(ultima="1")
+
+    def url_anterior(self):
+        return self._url(antes=self._cursor(self.object_list[0])) if self.object_list else self._url()
+
+    def url_siguiente(self):
+        return self._url(despues=self._cursor(self.object_list[-1])) if self.object_list else self._url()
+
+
+def paginar_keyset(request, queryset, orden, por_pagina=10, contar=True):
+    """
+    Página actual de ``queryset`` ordenado por ``orden`` (lista de campos,
+    '-' para descendente). Se agrega 'pk' si falta, para que el orden sea total.
+    Los valores de ``orden`` deben ser serializables a JSON (texto, números).
+    """
+    orden = list(orden)
+    if not any(_campo(o) in ("pk", "id") for o in orden):
+        orden.append("pk")
+
+    params = request.GET
+    desde, hacia_atras = None, False
+    try:
+        if params.get("antes"):
+            desde, hacia_atras = signing.loads(params["antes"], salt=_SAL), True
+        elif params.get("despues"):
+            desde = signing.loads(params["despues"], salt=_SAL)
+    except signing.BadSignature:
+        desde = None
+    if params.get("ultima"):
+        hacia_atras = True
+
+    sentido = _invertir(orden) if hacia_atras else orden
+    qs = queryset.order_by(*sentido)
+    if desde is not None and len(desde) == len(orden):
+        qs = qs.filter(_despues_de(sentido, desde))
+    else:
+        desde = None
+
+    filas = list(qs[:por_pagina + 1])
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if hacia_atras:
+        filas.reverse()
+        hay_anterior, hay_siguiente = hay_mas, desde is not None
+    else:
+        hay_anterior, hay_siguiente = desde is not None, hay_mas
+
+    total, estimado = total_aproximado(queryset) if contar else (None, False)
+    return PaginaKeyset(request, filas, orden, hay_anterior, hay_siguiente, total, estimado)
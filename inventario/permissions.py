@@ -1,7 +1,65 @@
+"""
+Roles de la API (grupos Administrador / Vendedor / Consultor).
+
+Los grupos de cada usuario se leen una vez y quedan en la caché de Django
+(settings.CACHES) hasta que cambian: las señales de inventario/signals.py
+invalidan la entrada al agregar o quitar grupos de un usuario, y cambiar de
+generación invalida a todos al renombrar o borrar un grupo. Dentro de una
+petición se resuelven una sola vez (quedan en el objeto usuario).
+
+Con la caché por defecto (memoria local) la invalidación es por proceso: con
+varios procesos conviene una caché compartida (Redis, Memcached); ROLES_TTL
+acota en cualquier caso cuánto puede durar un rol desactualizado.
+"""
+from django.core.cache import cache
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+ROLES_TTL = 300  # segundos
+_GENERACION = "roles:generacion"
+
+
+def _clave(user_id, generacion):
+    return f"roles:{generacion}:{user_id}"
+
+
+def _generacion():
+    generacion = cache.get(_GENERACION)
+    if generacion is None:
+        cache.add(_GENERACION, 1, None)
+        generacion = cache.get(_GENERACION, 1)
+    return generacion
+
+
+def roles(user):
+    """frozenset con los nombres de grupo de ``user`` (vacío si es anónimo)."""
+    if not user.is_authenticated:
+        return frozenset()
+    resueltos = getattr(user, "_roles", None)
+    if resueltos is None:
+        clave = _clave(user.pk, _generacion())
+        resueltos = cache.get(clave)
+        if resueltos is None:
+            resueltos = frozenset(user.groups.values_list("name", flat=True))
+            cache.set(clave, resueltos, ROLES_TTL)
+        user._roles = resueltos
+    return resueltos
+
+
+def invalidar_roles(user_ids=None):
+    """Olvida los roles de ``user_ids`` (None = de todos los usuarios)."""
+    if user_ids is None:
+        try:
+            cache.incr(_GENERACION)
+        except ValueError:
+            cache.set(_GENERACION, 1, None)
+        return
+    generacion = _generacion()
+    cache.delete_many([_clave(pk, generacion) for pk in user_ids])
+
+
 def user_in_group(user, group_name: str) -> bool:
-    return user.is_authenticated and user.groups.filter(name=group_name).exists()
+    return group_name in roles(user)
+
 
 class RolePermission(BasePermission):
     """
@@ -16,13 +74,14 @@ class RolePermission(BasePermission):
         if not user.is_authenticated:
             return request.method in SAFE_METHODS
 
-        if user.is_superuser or user_in_group(user, "Administrador"):
+        grupos = roles(user)
+        if user.is_superuser or "Administrador" in grupos:
             return True
 
-        if user_in_group(user, "Consultor"):
+        if "Consultor" in grupos:
             return request.method in SAFE_METHODS
 
-        if user_in_group(user, "Vendedor"):
+        if "Vendedor" in grupos:
             if request.method in SAFE_METHODS:
                 return True
             # Vendedor solo puede escribir en vistas que lo habiliten (movimientos)
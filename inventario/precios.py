@@ -0,0 +1,125 @@
+# inventario/precios.py
+"""
+Ajuste masivo de precios e historial de precios.
+
+Un ajuste (porcentaje o monto fijo, con redondeo) se aplica a un queryset de
+productos, p. ej. una o varias categorías:
+
+    nuevo = redondeo(precio · (1 + valor/100))   o   redondeo(precio + valor)
+
+La misma expresión sirve para la vista previa (annotate) y para aplicar
+(un solo UPDATE), así lo que se muestra es exactamente lo que se guarda. Al
+aplicar se escribe PrecioHistorico en bloque y se versiona el catálogo.
+
+PrecioHistorico guarda cada precio con la fecha desde la que rige; precio_en()
+lee el vigente a una fecha con una subconsulta por producto sobre el índice
+(producto, -desde).
+
+Lo usan:
+- ``POST /api/v1/productos/ajustar_precios/`` (vista previa o aplicar)
+- la acción "Ajustar precios" del admin de productos
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Value
+from django.db.models.functions import Ceil, Floor, Greatest, Round
+from django.utils import timezone
+
+from .models import Producto, PrecioHistorico
+from . import catalogo
+
+TIPOS = ("porcentaje", "monto")
+MODOS = ("cercano", "arriba", "abajo")
+# nombre -> múltiplo al que se redondea el precio nuevo
+REDONDEOS = {
+    "centavo": Decimal("0.01"),
+    "peso": Decimal("1"),
+    "decena": Decimal("10"),
+    "cincuenta": Decimal("50"),
+    "centena": Decimal("100"),
+}
+LIMITE_VISTA_PREVIA = 100
+
+_PRECIO = DecimalField(max_digits=10, decimal_places=2)
+_CENTAVO = Decimal("0.01")
+_FUNCIONES = {"cercano": Round, "arriba": Ceil, "abajo": Floor}
+
+
+def nuevo_precio(tipo, valor, redondeo="peso", modo="cercano"):
+    """Expresión del precio ajustado (nunca negativo)."""
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de ajuste desconocido: {tipo}")
+    if redondeo not in REDONDEOS:
+        raise ValueError(f"Redondeo desconocido: {redondeo}")
+    if modo not in MODOS:
+        raise ValueError(f"Modo de redondeo desconocido: {modo}")
+    valor = Decimal(valor)
+    if tipo == "porcentaje":
+        precio = F("precio") * Value(1 + valor / 100, output_field=_PRECIO)
+    else:
+        precio = F("precio") + Value(valor, output_field=_PRECIO)
+    paso = Value(REDONDEOS[redondeo], output_field=_PRECIO)
+    redondeado = _FUNCIONES[modo](ExpressionWrapper(precio / paso, output_field=_PRECIO)) * paso
+    return ExpressionWrapper(Greatest(redondeado, Value(Decimal("0"), output_field=_PRECIO)), output_field=_PRECIO)
+
+
+def vista_previa(queryset, tipo, valor, redondeo="peso", modo="cercano", limite=LIMITE_VISTA_PREVIA):
+    """
+    (total, filas): cantidad de productos afectados y las primeras ``limite``
+    filas con id, codigo, nombre, precio y nuevo (calculado en la BD).
+    """
+    expresion = nuevo_precio(tipo, valor, redondeo, modo)
+    filas = list(queryset.annotate(nuevo=expresion)
+                 .order_by("nombre", "pk")
+                 .values("id", "codigo", "nombre", "precio", "nuevo")[:limite])
+    for f in filas:
+        f["nuevo"] = Decimal(f["nuevo"]).quantize(_CENTAVO)
+    return queryset.count(), filas
+
+
+def registrar(precios, desde=None, motivo=""):
+    """Historial en bloque: ``precios`` es {producto_id: precio} o pares (id, precio)."""
+    desde = desde or timezone.now()
+    pares = precios.items() if isinstance(precios, dict) else precios
+    return len(PrecioHistorico.objects.bulk_create(
+        (PrecioHistorico(producto_id=pk, precio=precio, desde=desde, motivo=motivo[:120]) for pk, precio in pares),
+        batch_size=1000,
+    ))
+
+
+def ajustar(queryset, tipo, valor, redondeo="peso", modo="cercano", motivo=""):
+    """
+    Aplica el ajuste a ``queryset`` con un UPDATE y registra el historial de
+    los productos cuyo precio cambió. Devuelve la cantidad de productos cambiados.
+    """
+    expresion = nuevo_precio(tipo, valor, redondeo, modo)
+    motivo = motivo or f"Ajuste {tipo} {valor} ({redondeo}, {modo})"
+    with transaction.atomic():
+        # Bloquea los productos del ajuste: el precio leído es el que se actualiza
+        ids = list(queryset.select_for_update().values_list("pk", flat=True))
+        if not ids:
+            return 0
+        cambian = list(Producto.objects.filter(pk__in=ids)
+                       .annotate(nuevo=expresion)
+                       .exclude(nuevo=F("precio"))
+                       .values_list("pk", flat=True))
+        if not cambian:
+            return 0
+        Producto.objects.filter(pk__in=cambian).update(precio=expresion)
+        registrar(Producto.objects.filter(pk__in=cambian).values_list("pk", "precio").iterator(), motivo=motivo)
+        catalogo.marcar_cambios(cambian)
+    return len(cambian)
+
+
+def precio_en(momento, productos=None):
+    """{producto_id: precio vigente en ``momento``} (None si aún no tenía historial)."""
+    vigente = (PrecioHistorico.objects
+               .filter(producto_id=OuterRef("pk"), desde__lte=momento)
+               .order_by("-desde", "-id")
+               .values("precio")[:1])
+    qs = Producto.objects.all() if productos is None else Producto.objects.filter(pk__in=productos)
+    return {
+        pk: None if precio is None else Decimal(precio).quantize(_CENTAVO)
+        for pk, precio in qs.annotate(vigente=Subquery(vigente, output_field=_PRECIO)).values_list("pk", "vigente")
+    }
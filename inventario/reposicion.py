@@ -0,0 +1,152 @@
+# inventario/reposicion.py
+"""
+Sugerencias de reposición calculadas en lote con NumPy.
+
+Para todo el catálogo, en una sola pasada vectorizada:
+
+    venta_diaria (μ)   = unidades vendidas en la ventana / días con historia
+    desviacion (σ)     = desviación estándar de la venta diaria (días sin venta cuentan como 0)
+    stock_seguridad    = z · σ · √plazo
+    punto_reorden      = μ · plazo + stock_seguridad
+    cantidad_sugerida  = max(0, μ · (plazo + cobertura) + stock_seguridad − stock)   si stock <= punto_reorden
+    dias_cobertura     = stock / μ
+
+La historia se lee ya agrupada por producto y día: de los resúmenes diarios
+(ResumenVentaProducto, por defecto) o de DetalleVenta agrupado en SQL. Las
+filas se procesan por bloques con np.bincount, sin matrices producto × día,
+así que la memoria depende del número de productos y no de los años de historia.
+
+NumPy es opcional para el resto del proyecto: solo lo necesita este cálculo.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum, Min
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dependencia opcional
+    np = None
+
+from .models import Producto, DetalleVenta, ResumenVenta, ResumenVentaProducto, SugerenciaReposicion
+from .historico import medianoche
+
+FUENTES = ("resumenes", "detalles")
+TAM_BLOQUE = 100_000
+
+
+def disponible():
+    return np is not None
+
+
+def _historia(fuente, desde):
+    """
+    Devuelve (filas, primeras):
+    - filas: iterador de (producto_id, cantidad) por producto y día.
+    - primeras: {producto_id: fecha de la primera venta en la ventana}.
+    """
+    if fuente == "resumenes":
+        qs = ResumenVentaProducto.objects.filter(periodo=ResumenVenta.DIA, inicio__gte=desde)
+        filas = qs.values_list("producto_id", "cantidad")
+        primeras = qs.values("producto_id").annotate(p=Min("inicio")).values_list("producto_id", "p").order_by()
+    else:
+        qs = DetalleVenta.objects.filter(venta__fecha__gte=desde)
+        filas = (qs.annotate(dia=TruncDay("venta__fecha", tzinfo=timezone.get_default_timezone()))
+                 .values("producto_id", "dia").annotate(c=Sum("cantidad"))
+                 .values_list("producto_id", "c").order_by())
+        primeras = qs.values("producto_id").annotate(p=Min("venta__fecha")).values_list("producto_id", "p").order_by()
+    return filas.iterator(chunk_size=TAM_BLOQUE), dict(primeras)
+
+
+def _bloques(filas):
+    bloque = []
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) >= TAM_BLOQUE:
+            yield np.array(bloque, dtype=np.float64)
+            bloque = []
+    if bloque:
+        yield np.array(bloque, dtype=np.float64)
+
+
+def calcular(ventana=90, plazo=3, cobertura=7, z=1.65, fuente="resumenes"):
+    """
+    Calcula y guarda SugerenciaReposicion para todos los productos activos.
+    Devuelve la cantidad de productos procesados.
+    """
+    if np is None:
+        raise RuntimeError("Este cálculo requiere NumPy: pip install numpy")
+    if fuente not in FUENTES:
+        raise ValueError(f"Fuente desconocida: {fuente}")
+
+    ahora = timezone.now()
+    hoy = timezone.localdate()
+    desde = medianoche(hoy - timedelta(days=ventana - 1))
+
+    productos = list(Producto.objects.filter(activo=True).order_by("pk").values_list("pk", "stock"))
+    if not productos:
+        return 0
+    pids = np.array([p for p, _s in productos], dtype=np.int64)
+    stock = np.array([float(s or 0) for _p, s in productos], dtype=np.float64)
+    n = len(pids)
+
+    # Σx y Σx² por producto, bloque a bloque
+    suma = np.zeros(n)
+    suma2 = np.zeros(n)
+    filas, primeras = _historia(fuente, desde)
+    for bloque in _bloques(filas):
+        idx = np.searchsorted(pids, bloque[:, 0].astype(np.int64))
+        idx_ok = (idx < n)
+        idx_ok[idx_ok] &= pids[idx[idx_ok]] == bloque[idx_ok, 0]  # descarta productos inactivos
+        idx, cant = idx[idx_ok], bloque[idx_ok, 1]
+        suma += np.bincount(idx, weights=cant, minlength=n)
+        suma2 += np.bincount(idx, weights=cant * cant, minlength=n)
+
+    # Días con historia: desde la primera venta dentro de la ventana (productos nuevos)
+    dias = np.full(n, float(ventana))
+    con_historia = np.zeros(n, dtype=bool)
+    if primeras:
+        ids_p = np.array(list(primeras.keys()), dtype=np.int64)
+        dias_p = np.array([(hoy - timezone.localtime(f).date()).days + 1 for f in primeras.values()], dtype=np.float64)
+        pos = np.searchsorted(pids, ids_p)
+        ok = (pos < n)
+        ok[ok] &= pids[pos[ok]] == ids_p[ok]
+        dias[pos[ok]] = np.clip(dias_p[ok], 1, ventana)
+        con_historia[pos[ok]] = True
+
+    media = suma / dias
+    desviacion = np.sqrt(np.maximum(suma2 / dias - media * media, 0.0))
+    seguridad = z * desviacion * np.sqrt(plazo)
+    reorden = media * plazo + seguridad
+    objetivo = media * (plazo + cobertura) + seguridad
+    sugerida = np.where(stock <= reorden, np.maximum(objetivo - stock, 0.0), 0.0)
+    con_venta = media > 0
+    cobertura_dias = np.divide(stock, media, out=np.zeros(n), where=con_venta)
+
+    d3 = Decimal("0.001")
+    filas_out = [
+        SugerenciaReposicion(
+            producto_id=int(pids[i]),
+            calculado=ahora,
+            dias_historia=int(dias[i]) if con_historia[i] else 0,
+            venta_diaria=Decimal(float(media[i])).quantize(d3),
+            desviacion_diaria=Decimal(float(desviacion[i])).quantize(d3),
+            stock=Decimal(float(stock[i])).quantize(d3),
+            dias_cobertura=Decimal(float(min(cobertura_dias[i], 99999))).quantize(Decimal("0.1")) if con_venta[i] else None,
+            punto_reorden=Decimal(float(reorden[i])).quantize(d3),
+            cantidad_sugerida=Decimal(float(np.ceil(sugerida[i] * 1000) / 1000)).quantize(d3),
+        )
+        for i in range(n)
+    ]
+    campos = [f.name for f in SugerenciaReposicion._meta.concrete_fields if not f.primary_key]
+    with transaction.atomic():
+        SugerenciaReposicion.objects.bulk_create(
+            filas_out, batch_size=2000,
+            update_conflicts=True, unique_fields=["producto"], update_fields=campos,
+        )
+        # Productos desactivados desde el cálculo anterior
+        SugerenciaReposicion.objects.filter(calculado__lt=ahora).delete()
+    return n
@@ -0,0 +1,184 @@
+# inventario/resumenes.py
+"""
+Resúmenes de ventas por hora y por día (por producto y por categoría).
+
+Los reportes leen ResumenVentaProducto / ResumenVentaCategoria en vez de
+recorrer DetalleVenta: un dashboard de un mes son ~30 filas por producto o
+categoría, sin importar cuántas boletas hubo.
+
+Mantención incremental (checkout.registrar_venta y deuda_eliminar):
+1. bulk_create(ignore_conflicts=True) de las filas de la hora y el día de la
+   venta (crea las que falten; las existentes no se tocan).
+2. Un UPDATE por tabla que suma la venta a esas filas con CASE/WHEN por
+   producto (o categoría), para ambos periodos a la vez.
+
+Los intervalos se cortan en hora local (settings.TIME_ZONE, America/Santiago).
+Ediciones hechas a mano en el admin no se reflejan: para eso está
+``python manage.py reconstruir_resumenes``, que los recalcula desde DetalleVenta
+(y DetalleVentaArchivada si el rango pasa por debajo del corte del archivo).
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, When, F, Q, Value, Sum, Count, DecimalField
+from django.db.models.functions import Round, TruncHour, TruncDay
+from django.utils import timezone
+
+from .models import (
+    DetalleVenta, DetalleVentaArchivada, PeriodoArchivo,
+    ResumenVenta, ResumenVentaProducto, ResumenVentaCategoria,
+)
+from .historico import medianoche
+from .totales import subtotal_linea
+
+PERIODOS = (ResumenVenta.HORA, ResumenVenta.DIA)
+
+# tabla -> campo de agrupación
+_TABLAS = (
+    (ResumenVentaProducto, "producto_id"),
+    (ResumenVentaCategoria, "categoria_id"),
+)
+
+
+def inicio_intervalo(fecha, periodo):
+    """Comienzo (aware) de la hora o del día local que contiene ``fecha``."""
+    local = timezone.localtime(fecha)
+    if periodo == ResumenVenta.DIA:
+        return medianoche(local.date())
+    return local.replace(minute=0, second=0, microsecond=0)
+
+
+def _acumular(lineas, es_deuda, signo):
+    """
+    Agrupa las líneas por producto y por categoría.
+    Devuelve {campo: {clave: (cantidad, monto, ventas, monto_deuda, ventas_deuda)}}.
+    """
+    grupos = {campo: {} for _modelo, campo in _TABLAS}
+    for producto_id, categoria_id, cantidad, precio in lineas:
+        monto = subtotal_linea(cantidad, precio)
+        for campo, clave in (("producto_id", producto_id), ("categoria_id", categoria_id)):
+            cant, mto, _v, _vd = grupos[campo].get(clave, (Decimal("0"), Decimal("0"), 0, 0))
+            grupos[campo][clave] = (cant + (cantidad or 0), mto + monto, 1, 1 if es_deuda else 0)
+
+    return {
+        campo: {
+            clave: (signo * cant, signo * mto, signo * v, signo * mto if es_deuda else Decimal("0"), signo * vd)
+            for clave, (cant, mto, v, vd) in por_clave.items()
+        }
+        for campo, por_clave in grupos.items()
+    }
+
+
+def _sumar(modelo, campo, inicios, por_clave):
+    # 1) filas faltantes
+    modelo.objects.bulk_create(
+        [modelo(periodo=p, inicio=inicios[p], **{campo: clave}) for p in PERIODOS for clave in por_clave],
+        ignore_conflicts=True,
+    )
+    # 2) un UPDATE para ambos periodos: el delta depende solo de la clave
+    cambios = {}
+    for i, nombre in enumerate(("cantidad", "monto", "ventas", "monto_deuda", "ventas_deuda")):
+        tipo = modelo._meta.get_field(nombre)
+        whens = [When(**{campo: clave, "then": F(nombre) + Value(valores[i], output_field=tipo)})
+                 for clave, valores in por_clave.items() if valores[i]]
+        if whens:
+            cambios[nombre] = Case(*whens, default=F(nombre), output_field=tipo)
+    if not cambios:
+        return
+    intervalos = Q()
+    for p in PERIODOS:
+        intervalos |= Q(periodo=p, inicio=inicios[p])
+    modelo.objects.filter(intervalos, **{f"{campo}__in": list(por_clave)}).update(**cambios)
+
+
+def aplicar(fecha, es_deuda, lineas, signo=1):
+    """
+    Suma (``signo`` = 1) o resta (-1) una venta a los resúmenes.
+    ``lineas``: lista de tuplas (producto_id, categoria_id, cantidad, precio_unitario).
+    """
+    if not lineas:
+        return
+    inicios = {p: inicio_intervalo(fecha, p) for p in PERIODOS}
+    grupos = _acumular(lineas, es_deuda, signo)
+    with transaction.atomic():
+        for modelo, campo in _TABLAS:
+            _sumar(modelo, campo, inicios, grupos[campo])
+
+
+# ---------------- reconstrucción ----------------
+
+def _agregados(qs, campo_origen, trunc):
+    monto = DecimalField(max_digits=16, decimal_places=2)
+    subtotal = Round(F("cantidad") * F("precio_unitario"), 2)
+    deuda = Q(venta__es_deuda=True)
+    return (qs
+            .annotate(inicio=trunc("venta__fecha", tzinfo=timezone.get_default_timezone()))
+            .values("inicio", campo_origen)
+            .annotate(
+                t_cantidad=Sum("cantidad"),
+                t_monto=Sum(subtotal, output_field=monto),
+                t_ventas=Count("venta_id", distinct=True),
+                t_monto_deuda=Sum(Case(When(deuda, then=subtotal), default=Value(Decimal("0"))), output_field=monto),
+                t_ventas_deuda=Count("venta_id", distinct=True, filter=deuda),
+            )
+            .order_by())
+
+
+_SUMAS = ("t_cantidad", "t_monto", "t_ventas", "t_monto_deuda", "t_ventas_deuda")
+
+
+def _combinados(fuentes, campo_origen, trunc):
+    """
+    Agregados de varias tablas de detalle sumados por (inicio, grupo). Con una
+    sola fuente se recorren en streaming; las ventas de cada tabla son distintas,
+    así que los conteos también se suman.
+    """
+    if len(fuentes) == 1:
+        return _agregados(fuentes[0], campo_origen, trunc).iterator()
+    grupos = {}
+    for qs in fuentes:
+        for r in _agregados(qs, campo_origen, trunc).iterator():
+            clave = (r["inicio"], r[campo_origen])
+            if clave not in grupos:
+                grupos[clave] = r
+            else:
+                acumulado = grupos[clave]
+                for s in _SUMAS:
+                    acumulado[s] = (acumulado[s] or 0) + (r[s] or 0)
+    return grupos.values()
+
+
+def reconstruir(desde, hasta):
+    """
+    Recalcula los resúmenes de los días locales ``desde``..``hasta`` (date)
+    desde DetalleVenta (y el archivo, si corresponde). Devuelve la cantidad de
+    filas escritas.
+    """
+    ini, fin = medianoche(desde), medianoche(hasta + timedelta(days=1))
+    fuentes = [DetalleVenta.objects.filter(venta__fecha__gte=ini, venta__fecha__lt=fin)]
+    corte = PeriodoArchivo.corte()
+    if corte is not None and ini < corte:
+        fuentes.append(DetalleVentaArchivada.objects.filter(venta__fecha__gte=ini, venta__fecha__lt=fin))
+    origenes = {"producto_id": "producto_id", "categoria_id": "producto__categoria_id"}
+    truncs = {ResumenVenta.HORA: TruncHour, ResumenVenta.DIA: TruncDay}
+    escritas = 0
+    with transaction.atomic():
+        for modelo, campo in _TABLAS:
+            modelo.objects.filter(inicio__gte=ini, inicio__lt=fin).delete()
+            for periodo, trunc in truncs.items():
+                filas = (
+                    modelo(
+                        periodo=periodo,
+                        inicio=r["inicio"],
+                        cantidad=r["t_cantidad"] or 0,
+                        monto=r["t_monto"] or 0,
+                        ventas=r["t_ventas"],
+                        monto_deuda=r["t_monto_deuda"] or 0,
+                        ventas_deuda=r["t_ventas_deuda"],
+                        **{campo: r[origenes[campo]]},
+                    )
+                    for r in _combinados(fuentes, origenes[campo], trunc)
+                )
+                escritas += len(modelo.objects.bulk_create(filas, batch_size=1000))
+    return escritas
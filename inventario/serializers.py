@@ -1,8 +1,16 @@
 # inventario/serializers.py
+import functools
+from decimal import Decimal
+
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from django.core.exceptions import FieldDoesNotExist
 from django.db import transaction
+from django.core.exceptions import ValidationError as DjangoValidationError
 
-from .models import Categoria, Producto
+from .models import Categoria, Producto, SugerenciaReposicion
+from .ledger import InventoryLedger, Delta
+from . import catalogo, precios
 
 # Proveedor puede existir o no según tu proyecto
 try:
@@ -23,13 +31,107 @@ except Exception:
     BodegaModel = None
 
 
-class CategoriaSerializer(serializers.ModelSerializer):
+# ---------------- columnas a pedido y listado rápido ----------------
+
+def campos_pedidos(request):
+    """(campos, expandir) de ?fields=a,b y ?expand=c; campos es None si no se pidió."""
+    def lista(nombre):
+        return {c.strip() for c in request.query_params.get(nombre, "").split(",") if c.strip()}
+    return lista("fields") or None, lista("expand")
+
+
+class CamposDinamicosMixin:
+    """
+    Columnas a pedido en las lecturas (GET) del serializer raíz o de un listado:
+
+    - ``?fields=id,nombre``  devuelve solo esas columnas.
+    - ``?expand=categoria``  anida la FK con el serializer de ``expandibles``
+      en vez de devolver su id.
+
+    En escrituras no cambia nada (se validan todos los campos).
+    """
+    expandibles = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        campos, expandir = campos_pedidos(request)
+        if campos is not None:
+            for nombre in set(self.fields) - campos:
+                self.fields.pop(nombre)
+        for nombre in expandir & set(self.expandibles) & set(self.fields):
+            self.fields[nombre] = self.expandibles[nombre](read_only=True)
+
+
+# Campos cuyo valor de .values() ya es el de la respuesta
+_SIN_CONVERSION = (serializers.CharField, serializers.ChoiceField, serializers.IntegerField, serializers.BooleanField)
+
+
+def plan_filas(serializer, prefijo=""):
+    """
+    Lectura rápida de listados: (lookups, armar) tales que
+    ``armar(fila)`` con ``fila`` de ``queryset.values(*lookups)`` da lo mismo
+    que ``serializer.to_representation(instancia)``, sin crear la instancia.
+    Devuelve None si algún campo no sale directo de .values() (propiedades,
+    SerializerMethodField, relaciones a muchos...).
+    """
+    modelo = serializer.Meta.model
+    lookups, columnas = [], []
+    for nombre, campo in serializer.fields.items():
+        if campo.write_only:
+            continue
+        fuente = campo.source
+        if fuente == "*" or "." in fuente:
+            return None
+        try:
+            campo_modelo = modelo._meta.get_field(fuente)
+        except FieldDoesNotExist:
+            return None
+        if not campo_modelo.concrete:
+            return None
+        clave = f"{prefijo}{fuente}"
+
+        if isinstance(campo, serializers.ModelSerializer):  # FK expandida
+            sub = plan_filas(campo, f"{clave}__")
+            if sub is None:
+                return None
+            sub_lookups, sub_armar = sub
+            clave_pk = f"{clave}__{campo.Meta.model._meta.pk.name}"
+            lookups += [clave_pk, *sub_lookups]
+            columnas.append((nombre, clave_pk, None, sub_armar))
+        elif isinstance(campo, serializers.PrimaryKeyRelatedField) and campo.pk_field is None:
+            lookups.append(clave)  # values() entrega el id de la FK
+            columnas.append((nombre, clave, None, None))
+        elif isinstance(campo, (serializers.RelatedField, serializers.ManyRelatedField,
+                                serializers.BaseSerializer, serializers.SerializerMethodField)):
+            return None
+        else:
+            lookups.append(clave)
+            convertir = None if isinstance(campo, _SIN_CONVERSION) else campo.to_representation
+            columnas.append((nombre, clave, convertir, None))
+
+    def armar(fila):
+        datos = {}
+        for nombre, clave, convertir, sub_armar in columnas:
+            valor = fila[clave]
+            if sub_armar is not None:
+                datos[nombre] = None if valor is None else sub_armar(fila)
+            else:
+                datos[nombre] = valor if convertir is None or valor is None else convertir(valor)
+        return datos
+
+    return lookups, armar
+
+
+class CategoriaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Categoria
         fields = "__all__"
 
 
-class ProveedorSerializer(serializers.ModelSerializer):
+class ProveedorSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Proveedor if Proveedor is not None else Categoria  # dummy para no romper import si no existe
         fields = "__all__"
@@ -43,18 +145,217 @@ def get_bodega_serializer_or_none(BodegaModelRef):
     return _BodegaSerializer
 
 
-class ProductoSerializer(serializers.ModelSerializer):
+@functools.lru_cache(maxsize=None)
+def _campos(modelo):
+    return frozenset(f.name for f in modelo._meta.get_fields())
+
+
+class _PkPrecargable(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField que, en un lote, busca en los objetos leídos de una
+    vez por ProductoListSerializer en vez de hacer un SELECT por fila.
+    """
+    precargados = None
+
+    def to_internal_value(self, data):
+        if self.precargados is None or self.pk_field is not None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            obj = self.precargados.get(int(data))
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if obj is None:
+            self.fail("does_not_exist", pk_value=data)
+        return obj
+
+
+class ProductoListSerializer(serializers.ListSerializer):
+    """
+    Alta y edición masiva de productos (ProductoViewSet.bulk_create / bulk_update).
+
+    - Las FK del lote (categoría) se leen con una consulta por campo.
+    - La unicidad de 'codigo' se valida con una consulta para todo el lote
+      (más los repetidos dentro del mismo envío).
+    - Se escribe con bulk_create / bulk_update de a LOTE filas y luego se
+      versiona el catálogo y se recalcula stock_bajo para todo el lote,
+      porque bulk_* no pasa por save() ni por las señales.
+    - El stock no se escribe con bulk_update: el alta registra el stock
+      inicial en el kardex (InventoryLedger.registrar_inicial) y la edición
+      lo lleva al valor pedido con un ajuste del libro de inventario.
+
+    Para editar, ``instance`` es {pk: Producto} y cada elemento trae su 'id';
+    solo se escriben los campos enviados.
+    """
+    LOTE = 500
+
+    def _precargar(self, data):
+        for nombre, campo in self.child.fields.items():
+            if not isinstance(campo, _PkPrecargable) or campo.read_only:
+                continue
+            ids = set()
+            for item in data:
+                try:
+                    ids.add(int(item.get(nombre)))
+                except (AttributeError, TypeError, ValueError):
+                    pass
+            campo.precargados = campo.get_queryset().in_bulk(list(ids))
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self._precargar(data)
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+        try:
+            instancia = self.instance.get(int(data.get("id")))
+        except (AttributeError, TypeError, ValueError):
+            instancia = None
+        if instancia is None:
+            raise serializers.ValidationError({"id": "Producto inexistente."})
+        self.child.instance = instancia
+        self.child.initial_data = data
+        validado = super().run_child_validation(data)
+        validado["id"] = instancia.pk
+        return validado
+
+    def validate(self, attrs):
+        codigos = {}  # codigo -> posiciones en el lote
+        errores = [{} for _ in attrs]
+        for i, item in enumerate(attrs):
+            codigo = item.get("codigo")
+            if not codigo:
+                continue
+            if codigo in codigos:
+                errores[i] = {"codigo": "Código repetido en el lote."}
+            codigos.setdefault(codigo, []).append(i)
+        lista = list(codigos)
+        existentes = (
+            fila
+            for i in range(0, len(lista), self.LOTE)
+            for fila in Producto.objects.filter(codigo__in=lista[i:i + self.LOTE]).values_list("codigo", "pk")
+        )
+        for codigo, pk in existentes:
+            for i in codigos[codigo]:
+                if attrs[i].get("id") != pk:
+                    errores[i] = {"codigo": "El SKU (codigo) ya existe."}
+        if any(errores):
+            raise serializers.ValidationError(errores)
+        return attrs
+
+    def create(self, validated_data):
+        productos = []
+        for datos in validated_data:
+            producto = Producto(**datos)
+            producto.stock_bajo = (producto.stock or 0) <= (producto.stock_minimo or 0)
+            productos.append(producto)
+        productos = Producto.objects.bulk_create(productos, batch_size=self.LOTE)
+        InventoryLedger.registrar_inicial(
+            [Delta(p.pk, p.stock, "Stock inicial", "Alta masiva") for p in productos if p.stock]
+        )
+        catalogo.marcar_cambios([p.pk for p in productos])
+        precios.registrar([(p.pk, p.precio) for p in productos], motivo="Alta masiva")
+        return productos
+
+    def update(self, instance, validated_data):
+        # Agrupados por campos enviados: un bulk_update no pisa columnas ajenas
+        grupos, stock_pedido = {}, {}
+        for datos in validated_data:
+            producto = instance[datos.pop("id")]
+            if "stock" in datos:
+                stock_pedido[producto.pk] = datos.pop("stock")
+            for campo, valor in datos.items():
+                setattr(producto, campo, valor)
+            grupos.setdefault(tuple(sorted(datos)), []).append(producto)
+        ids, con_precio = [], []
+        for campos, productos in grupos.items():
+            if campos:
+                Producto.objects.bulk_update(productos, campos, batch_size=self.LOTE)
+                ids += [p.pk for p in productos]
+            if "precio" in campos:
+                con_precio += [(p.pk, p.precio) for p in productos if p.precio != p._precio_original]
+        if con_precio:
+            precios.registrar(con_precio, motivo="Edición masiva")
+        if ids:
+            catalogo.marcar_cambios(ids)
+            InventoryLedger.recalcular_stock_bajo(ids)
+        if stock_pedido:
+            self._ajustar_stock(instance, stock_pedido)
+        return [p for productos in grupos.values() for p in productos]
+
+    @staticmethod
+    def _ajustar_stock(instance, stock_pedido):
+        """Lleva el stock al valor pedido con un delta de ajuste por producto (kardex y costeo)."""
+        try:
+            InventoryLedger.fijar_stock(stock_pedido, "Ajuste masivo", "API bulk_update")
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({"stock": e.messages})
+        for pk, nuevo in stock_pedido.items():
+            instance[pk].stock = nuevo
+
+
+class ProductoBreveSerializer(serializers.ModelSerializer):
+    """Producto anidado en otros recursos (?expand=producto)."""
+    class Meta:
+        model = Producto
+        fields = ["id", "codigo", "nombre", "unidad", "precio"]
+
+
+class ProductoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Usa __all__ para adaptarse a tu modelo real. Valida SKU 'codigo' si existe.
+
+    El stock no se guarda con el resto de los campos: al crear se registra
+    como stock inicial en el kardex y al editar se lleva al valor pedido con
+    un ajuste del libro de inventario (InventoryLedger.fijar_stock).
     """
+    serializer_related_field = _PkPrecargable
+    expandibles = {"categoria": CategoriaSerializer}
+
     class Meta:
         model = Producto
         fields = "__all__"
+        list_serializer_class = ProductoListSerializer
+        # La unicidad de 'codigo' se valida en validate() (o por lote), no con un
+        # UniqueValidator adicional
+        extra_kwargs = {"codigo": {"validators": []}}
 
     def _has_field(self, name: str) -> bool:
-        return name in {f.name for f in self.Meta.model._meta.get_fields()}
+        return name in _campos(self.Meta.model)
+
+    def validate_stock(self, value):
+        if value is not None and value < 0:
+            raise serializers.ValidationError("El stock no puede ser negativo.")
+        return value
+
+    @transaction.atomic
+    def create(self, validated_data):
+        producto = super().create(validated_data)
+        InventoryLedger.registrar_inicial([Delta(producto.pk, producto.stock, "Stock inicial", "API")])
+        return producto
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        stock = validated_data.pop("stock", None)
+        for campo, valor in validated_data.items():
+            setattr(instance, campo, valor)
+        if validated_data:
+            # Solo los campos enviados: un save() completo pisaría el stock con el valor leído
+            instance.save(update_fields=list(validated_data))
+        if stock is not None:
+            try:
+                InventoryLedger.fijar_stock({instance.pk: stock}, "Ajuste", "API")
+            except DjangoValidationError as e:
+                raise serializers.ValidationError({"stock": e.messages})
+            instance.refresh_from_db(fields=["stock", "stock_bajo"])
+        return instance
 
     def validate(self, attrs):
+        if isinstance(self.parent, ProductoListSerializer):
+            return attrs  # el lote valida los códigos de una vez
         # SKU único si el campo 'codigo' existe en tu modelo
         if self._has_field("codigo"):
             codigo = attrs.get("codigo") or getattr(self.instance, "codigo", None)
@@ -67,10 +368,12 @@ class ProductoSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class MovimientoSerializer(serializers.ModelSerializer):
+class MovimientoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Controla stock no negativo si tu Producto tiene campo 'stock'.
     """
+    expandibles = {"producto": ProductoBreveSerializer}
+
     class Meta:
         model = MovimientoModel
         fields = "__all__"
@@ -89,12 +392,119 @@ class MovimientoSerializer(serializers.ModelSerializer):
 
     @transaction.atomic
     def create(self, validated_data):
-        mov = super().create(validated_data)
-        prod = mov.producto
-        if hasattr(prod, "stock"):
-            if str(mov.tipo).upper() == "E":
-                prod.stock = (getattr(prod, "stock", 0) or 0) + mov.cantidad
-            else:
-                prod.stock = (getattr(prod, "stock", 0) or 0) - mov.cantidad
-            prod.save(update_fields=["stock"])
+        # El movimiento lo escribe el libro de inventario junto con el ajuste de stock,
+        # así el stock se modifica una sola vez y queda una sola fila de kardex.
+        prod = validated_data["producto"]
+        cantidad = validated_data.get("cantidad", 0)
+        delta = cantidad if str(validated_data.get("tipo", "")).upper() == "E" else -cantidad
+        try:
+            (mov,) = InventoryLedger.registrar(
+                [Delta(prod.pk, delta, validated_data.get("motivo", ""), validated_data.get("referencia", ""))],
+                fecha=validated_data.get("fecha"),
+            )
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({"cantidad": e.messages})
         return mov
+
+
+class LineaVentaSyncSerializer(serializers.Serializer):
+    producto = serializers.IntegerField(min_value=1)
+    cantidad = serializers.DecimalField(max_digits=12, decimal_places=3, min_value=Decimal("0.001"))
+    precio = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0"))
+
+
+class VentaSyncSerializer(serializers.Serializer):
+    """
+    Una venta enviada por una caja. 'clave' la genera la caja (p. ej. un UUID)
+    y permite reintentar el envío sin duplicar la venta.
+    """
+    clave = serializers.CharField(max_length=64)
+    lineas = LineaVentaSyncSerializer(many=True, allow_empty=False)
+    fecha = serializers.DateTimeField(required=False)
+    observacion = serializers.CharField(required=False, allow_blank=True, default="")
+    es_deuda = serializers.BooleanField(required=False, default=False)
+    cliente_nombre = serializers.CharField(required=False, allow_blank=True, default="")
+
+    def validate(self, attrs):
+        if attrs["es_deuda"] and not attrs["cliente_nombre"].strip():
+            raise serializers.ValidationError({"cliente_nombre": "Para registrar deuda, indica el nombre del deudor."})
+        return attrs
+
+
+class ResumenVentaSerializer(serializers.Serializer):
+    """Una fila de los resúmenes de ventas (ver inventario/resumenes.py)."""
+    inicio = serializers.DateTimeField()
+    id = serializers.IntegerField()
+    nombre = serializers.CharField()
+    cantidad = serializers.DecimalField(max_digits=16, decimal_places=3)
+    monto = serializers.DecimalField(max_digits=16, decimal_places=2)
+    ventas = serializers.IntegerField()
+    monto_deuda = serializers.DecimalField(max_digits=16, decimal_places=2)
+    ventas_deuda = serializers.IntegerField()
+    monto_contado = serializers.DecimalField(max_digits=16, decimal_places=2)
+
+
+class KardexSerializer(serializers.Serializer):
+    """Una fila del kardex de un producto con su saldo corrido (ver inventario/kardex.py)."""
+    id = serializers.IntegerField()
+    fecha = serializers.DateTimeField()
+    tipo = serializers.CharField()
+    cantidad = serializers.DecimalField(max_digits=12, decimal_places=3)
+    saldo = serializers.DecimalField(max_digits=16, decimal_places=3)
+    costo_fifo = serializers.DecimalField(max_digits=14, decimal_places=2)
+    motivo = serializers.CharField()
+    referencia = serializers.CharField()
+
+
+class SugerenciaReposicionSerializer(serializers.ModelSerializer):
+    """Sugerencia de reposición calculada en lote (ver inventario/reposicion.py)."""
+    codigo = serializers.CharField(source="producto.codigo", read_only=True)
+    nombre = serializers.CharField(source="producto.nombre", read_only=True)
+
+    class Meta:
+        model = SugerenciaReposicion
+        fields = [
+            "producto", "codigo", "nombre", "calculado", "dias_historia",
+            "venta_diaria", "desviacion_diaria", "stock", "dias_cobertura",
+            "punto_reorden", "cantidad_sugerida",
+        ]
+
+
+class AjustePrecioSerializer(serializers.Serializer):
+    """Parámetros de un ajuste masivo de precios (ver inventario/precios.py)."""
+    tipo = serializers.ChoiceField(choices=precios.TIPOS)
+    valor = serializers.DecimalField(max_digits=10, decimal_places=2)
+    redondeo = serializers.ChoiceField(choices=list(precios.REDONDEOS), default="peso")
+    modo = serializers.ChoiceField(choices=precios.MODOS, default="cercano")
+    categoria = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+    producto = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+    solo_activos = serializers.BooleanField(required=False, default=True)
+    motivo = serializers.CharField(required=False, allow_blank=True, default="", max_length=120)
+    aplicar = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, attrs):
+        if not (attrs["categoria"] or attrs["producto"]):
+            raise serializers.ValidationError("Indica al menos una 'categoria' o 'producto'.")
+        if attrs["tipo"] == "porcentaje" and attrs["valor"] <= -100:
+            raise serializers.ValidationError({"valor": "Un porcentaje de -100 o menos deja precios en 0."})
+        return attrs
+
+    def productos(self):
+        """Queryset de productos al que se aplica el ajuste."""
+        data = self.validated_data
+        qs = Producto.objects.all()
+        if data["categoria"]:
+            qs = qs.filter(categoria_id__in=data["categoria"])
+        if data["producto"]:
+            qs = qs.filter(pk__in=data["producto"])
+        if data["solo_activos"]:
+            qs = qs.filter(activo=True)
+        return qs
+
+
+class VistaPreviaPrecioSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    codigo = serializers.CharField()
+    nombre = serializers.CharField()
+    precio = serializers.DecimalField(max_digits=10, decimal_places=2)
+    nuevo = serializers.DecimalField(max_digits=10, decimal_places=2)
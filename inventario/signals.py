@@ -1,102 +1,302 @@
 from decimal import Decimal
-from django.db.models.signals import post_save, post_delete
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from django.apps import apps
+from rest_framework.authtoken.models import Token
 
-# Intentamos cargar modelos de forma segura (por nombre)
-Producto = apps.get_model('inventario', 'Producto')
-DetalleCompra = apps.get_model('inventario', 'DetalleCompra')
-DetalleVenta = apps.get_model('inventario', 'DetalleVenta')
+from .models import Categoria, Proveedor, Producto, Compra, DetalleCompra, Venta, DetalleVenta, MovimientoStock
+from .ledger import InventoryLedger, Delta
+from . import catalogo, costos, totales, deudas, eventos, precios, versiones
+from .busqueda import indice
+from .permissions import invalidar_roles
+from .autenticacion import invalidar_tokens
 
-# MovimientoStock es opcional: si existe, lo usamos; si no, seguimos sin registrar movimiento
-MovimientoStock = None
-try:
-    MovimientoStock = apps.get_model('inventario', 'MovimientoStock')
-except LookupError:
-    MovimientoStock = None
 
+# Estas señales cubren las ediciones de detalle una a una (admin, shell):
+# stock (vía InventoryLedger) y totales guardados del documento.
+# Las rutas masivas (POS, deudas, compras) usan bulk_create + InventoryLedger
+# y calculan el total al crear el documento, por lo que aquí no se vuelven a aplicar.
 
-def _registrar_movimiento(producto, tipo, cantidad, referencia=None, nota=''):
-    """
-    Crea un MovimientoStock si el modelo existe. 'tipo' puede ser 'COMPRA', 'VENTA', 'AJUSTE'.
-    'referencia' puede ser el objeto Compra/Venta/Detalle involucrado.
-    """
-    if not MovimientoStock:
+def _referencia(instance):
+    if isinstance(instance, DetalleCompra):
+        return f"Compra#{instance.compra_id}"
+    return f"Venta#{instance.venta_id}"
+
+
+def _documento(instance):
+    """(modelo, pk) del documento al que pertenece el detalle."""
+    if isinstance(instance, DetalleCompra):
+        return Compra, instance.compra_id
+    return Venta, instance.venta_id
+
+
+def _subtotal(valores, instance):
+    precio = "costo_unitario" if isinstance(instance, DetalleCompra) else "precio_unitario"
+    return totales.subtotal_linea(valores.get("cantidad"), valores.get(precio))
+
+
+def _acumular_total(instance, created):
+    nuevo = _subtotal(instance.__dict__, instance)
+    modelo, pk = _documento(instance)
+    delta = nuevo - instance._subtotal_original
+    totales.acumular(modelo, pk, delta, 1 if created else 0)
+    if delta and modelo is Venta:
+        _resaldar_venta(pk)
+
+
+def _resaldar_venta(venta_id):
+    # Cambió el total de una venta: si es deuda, también el saldo de su cliente
+    cliente_id = Venta.objects.filter(pk=venta_id, es_deuda=True).values_list("cliente_id", flat=True).first()
+    if cliente_id:
+        deudas.recalcular_saldos([cliente_id])
+
+
+def _revertir_total(instance, origin):
+    # Si se está borrando el documento completo, no tiene sentido actualizarlo
+    modelo, pk = _documento(instance)
+    if isinstance(origin, modelo) or getattr(origin, "model", None) is modelo:
         return
-    try:
-        MovimientoStock.objects.create(
-            producto=producto,
-            tipo=tipo,
-            cantidad=cantidad,
-            referencia=str(referencia) if referencia else '',
-            nota=nota or ''
-        )
-    except Exception:
-        # No interrumpas el flujo si falla el log
-        pass
+    totales.acumular(modelo, pk, -instance._subtotal_original, -1)
+    if instance._subtotal_original and modelo is Venta:
+        _resaldar_venta(pk)
 
 
-# =========================
-# COMPRAS: suman stock
-# =========================
-@receiver(post_save, sender=DetalleCompra)
-def detalle_compra_guardado(sender, instance, created, **kwargs):
+# Recuerda cantidad/producto originales al cargar el detalle: evita el
+# SELECT extra que antes se hacía en cada save para calcular el delta.
+@receiver(post_init, sender=DetalleCompra)
+@receiver(post_init, sender=DetalleVenta)
+def recordar_original(sender, instance, **kwargs):
+    if instance.pk:
+        instance._cantidad_original = instance.__dict__.get("cantidad") or Decimal("0")
+        instance._producto_original = instance.__dict__.get("producto_id")
+        instance._subtotal_original = _subtotal(instance.__dict__, instance)
+    else:
+        instance._cantidad_original = Decimal("0")
+        instance._producto_original = None
+        instance._subtotal_original = Decimal("0")
+
+
+def _deltas_edicion(instance, created, signo, motivo, motivo_reverso, costo_entrada=None):
     """
-    Al crear un DetalleCompra, aumenta el stock del producto en 'cantidad'.
-    Si se actualiza, no hacemos nada (para simplicidad). 
+    Deltas de stock para un detalle recién guardado.
+    ``signo`` = +1 para compras (entrada), -1 para ventas (salida).
+    ``costo_entrada``: costo unitario de los deltas positivos (None = promedio).
     """
-    if not created:
-        return
-    prod = instance.producto
-    cantidad = Decimal(instance.cantidad or 0)
-    if cantidad > 0:
-        prod.stock = (prod.stock or Decimal('0')) + cantidad
-        prod.save(update_fields=['stock'])
-        _registrar_movimiento(prod, 'COMPRA', cantidad, referencia=instance, nota='Ingreso por compra')
+    ref = _referencia(instance)
+    new_qty = instance.cantidad or Decimal("0")
+    old_qty = Decimal("0") if created else instance._cantidad_original
+    old_pid = None if created else instance._producto_original
+
+    def delta(pid, cantidad, mot):
+        return Delta(pid, cantidad, mot, ref, costo_entrada if cantidad > 0 else None)
+
+    if old_pid and old_pid != instance.producto_id:
+        # Cambió el producto: se revierte el original completo y se aplica el nuevo.
+        return [
+            delta(old_pid, -signo * old_qty, motivo_reverso),
+            delta(instance.producto_id, signo * new_qty, motivo),
+        ]
+    return [delta(instance.producto_id, signo * (new_qty - old_qty), motivo)]
 
 
+def _costear_venta(instance, movimientos):
+    """Ajusta el costo de lo vendido guardado en la línea con los movimientos de la edición."""
+    mismo = instance._producto_original == instance.producto_id
+    fifo = instance.costo_fifo if mismo else Decimal("0")
+    promedio = instance.costo_promedio if mismo else Decimal("0")
+    for mov in movimientos:
+        if mov.producto_id != instance.producto_id:
+            continue
+        signo = 1 if mov.tipo == MovimientoStock.SALIDA else -1
+        fifo += signo * mov.costo_fifo
+        promedio += signo * mov.costo_promedio
+    if (fifo, promedio) != (instance.costo_fifo, instance.costo_promedio):
+        DetalleVenta.objects.filter(pk=instance.pk).update(costo_fifo=fifo, costo_promedio=promedio)
+        instance.costo_fifo, instance.costo_promedio = fifo, promedio
+
+
+def _recordar_guardado(instance):
+    instance._cantidad_original = instance.cantidad or Decimal("0")
+    instance._producto_original = instance.producto_id
+    instance._subtotal_original = _subtotal(instance.__dict__, instance)
+
+
+# Compra: aplicar entradas
+@receiver(post_save, sender=DetalleCompra)
+def aplicar_entrada_compra(sender, instance: DetalleCompra, created, raw=False, **kwargs):
+    if raw or InventoryLedger.esta_suspendido():
+        return
+    with transaction.atomic():
+        InventoryLedger.registrar(
+            _deltas_edicion(instance, created, 1, "Ingreso por compra", "Reverso compra",
+                            instance.costo_unitario)
+        )
+        _acumular_total(instance, created)
+    _recordar_guardado(instance)
+
+# Compra: revertir entradas al borrar detalle
 @receiver(post_delete, sender=DetalleCompra)
-def detalle_compra_eliminado(sender, instance, **kwargs):
-    """
-    Si se elimina un DetalleCompra, revertimos el stock.
-    """
-    prod = instance.producto
-    cantidad = Decimal(instance.cantidad or 0)
-    if cantidad > 0:
-        prod.stock = (prod.stock or Decimal('0')) - cantidad
-        if prod.stock < 0:
-            prod.stock = Decimal('0')
-        prod.save(update_fields=['stock'])
-        _registrar_movimiento(prod, 'AJUSTE', -cantidad, referencia=instance, nota='Reverso por eliminación de detalle de compra')
-
-
-# =========================
-# VENTAS: restan stock
-# =========================
-@receiver(post_save, sender=DetalleVenta)
-def detalle_venta_guardado(sender, instance, created, **kwargs):
-    """
-    Al crear un DetalleVenta, disminuye el stock del producto en 'cantidad'.
-    """
-    if not created:
+def revertir_entrada_compra(sender, instance: DetalleCompra, origin=None, **kwargs):
+    if InventoryLedger.esta_suspendido():
         return
-    prod = instance.producto
-    cantidad = Decimal(instance.cantidad or 0)
-    if cantidad > 0:
-        nuevo = (prod.stock or Decimal('0')) - cantidad
-        prod.stock = nuevo if nuevo >= 0 else Decimal('0')
-        prod.save(update_fields=['stock'])
-        _registrar_movimiento(prod, 'VENTA', -cantidad, referencia=instance, nota='Salida por venta')
+    qty = instance.cantidad or Decimal("0")
+    if qty > 0:
+        InventoryLedger.salida(instance.producto_id, qty, "Reverso compra", _referencia(instance))
+    _revertir_total(instance, origin)
 
+# Venta: aplicar salidas
+@receiver(post_save, sender=DetalleVenta)
+def aplicar_salida_venta(sender, instance: DetalleVenta, created, raw=False, **kwargs):
+    if raw or InventoryLedger.esta_suspendido():
+        return
+    with transaction.atomic():
+        # Lo que vuelve al stock entra al costo con que salió la línea
+        costo_linea = None if created else costos.unitario(instance.costo_fifo, instance._cantidad_original)
+        movimientos = InventoryLedger.registrar(
+            _deltas_edicion(instance, created, -1, "Egreso por venta", "Reverso venta", costo_linea)
+        )
+        _costear_venta(instance, movimientos)
+        _acumular_total(instance, created)
+    _recordar_guardado(instance)
 
+# Venta: revertir salidas al borrar detalle
 @receiver(post_delete, sender=DetalleVenta)
-def detalle_venta_eliminado(sender, instance, **kwargs):
-    """
-    Si se elimina un DetalleVenta, devolvemos el stock.
-    """
-    prod = instance.producto
-    cantidad = Decimal(instance.cantidad or 0)
-    if cantidad > 0:
-        prod.stock = (prod.stock or Decimal('0')) + cantidad
-        prod.save(update_fields=['stock'])
-        _registrar_movimiento(prod, 'AJUSTE', cantidad, referencia=instance, nota='Reverso por eliminación de detalle de venta')
+def revertir_salida_venta(sender, instance: DetalleVenta, origin=None, **kwargs):
+    if InventoryLedger.esta_suspendido():
+        return
+    qty = instance.cantidad or Decimal("0")
+    if qty > 0:
+        InventoryLedger.entrada(instance.producto_id, qty, "Reverso venta", _referencia(instance),
+                                costo_unitario=costos.unitario(instance.costo_fifo, qty))
+    _revertir_total(instance, origin)
+
+
+# Saldos de deudores: cualquier cambio en una venta de un cliente lo recalcula
+@receiver(post_init, sender=Venta)
+def recordar_cliente(sender, instance, **kwargs):
+    instance._cliente_original = instance.__dict__.get("cliente_id") if instance.pk else None
+
+@receiver(post_save, sender=Venta)
+def actualizar_saldo_cliente(sender, instance: Venta, created, raw=False, **kwargs):
+    if raw or (created and not instance.es_deuda):
+        return
+    deudas.recalcular_saldos([instance.cliente_id, instance._cliente_original])
+    instance._cliente_original = instance.cliente_id
+
+@receiver(post_delete, sender=Venta)
+def descontar_saldo_cliente(sender, instance: Venta, **kwargs):
+    # Una deuda saldada ya no suma al saldo (p. ej. al archivarla)
+    if instance.es_deuda and not instance.saldada:
+        deudas.recalcular_saldos([instance.cliente_id])
+
+
+# Catálogo: cada cambio de producto toma la siguiente versión del catálogo
+@receiver(pre_save, sender=Producto)
+def versionar_producto(sender, instance: Producto, raw=False, update_fields=None, **kwargs):
+    if raw or not catalogo.afecta_catalogo(update_fields):
+        return
+    instance.version = catalogo.siguiente_version()
+
+@receiver(post_save, sender=Producto)
+def guardar_version_producto(sender, instance: Producto, raw=False, update_fields=None, **kwargs):
+    # save(update_fields=[...]) no incluye 'version': se persiste aparte
+    if raw or update_fields is None or "version" in update_fields:
+        return
+    if catalogo.afecta_catalogo(update_fields):
+        Producto.objects.filter(pk=instance.pk).update(version=instance.version)
+
+@receiver(post_delete, sender=Producto)
+def baja_producto(sender, instance: Producto, **kwargs):
+    catalogo.registrar_baja(instance.pk)
+
+
+# Índice de búsqueda en memoria: se actualiza al confirmar la transacción
+@receiver(post_save, sender=Producto)
+def indexar_producto(sender, instance: Producto, raw=False, update_fields=None, **kwargs):
+    if raw or not catalogo.afecta_catalogo(update_fields):
+        return
+    datos = {c: getattr(instance, c) for c in catalogo.CAMPOS_CATALOGO}
+    transaction.on_commit(lambda: indice.actualizar(datos))
+
+@receiver(post_delete, sender=Producto)
+def desindexar_producto(sender, instance: Producto, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: indice.eliminar(pk))
+
+@receiver(catalogo.productos_modificados)
+def reindexar_productos(sender, ids, **kwargs):
+    transaction.on_commit(lambda: indice.recargar(ids))
+
+
+# Historial de precios de las ediciones una a una (los ajustes y lotes lo
+# escriben en bloque con precios.registrar)
+@receiver(post_init, sender=Producto)
+def recordar_precio(sender, instance: Producto, **kwargs):
+    instance._precio_original = instance.__dict__.get("precio") if instance.pk else None
+
+@receiver(post_save, sender=Producto)
+def historial_precio(sender, instance: Producto, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and "precio" not in update_fields):
+        return
+    if created or instance.precio != instance._precio_original:
+        precios.registrar({instance.pk: instance.precio}, motivo="Alta" if created else "Edición")
+        instance._precio_original = instance.precio
+
+
+# Eventos de stock / precio / activo para las cajas (SSE); el stock que mueve
+# InventoryLedger y las escrituras masivas (productos_modificados) se avisan aparte
+_CAMPOS_EVENTO = {"stock", "precio", "activo"}
+
+@receiver(post_save, sender=Producto)
+def evento_producto(sender, instance: Producto, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not _CAMPOS_EVENTO & set(update_fields)):
+        return
+    eventos.productos_cambiados([instance.pk])
+
+@receiver(post_delete, sender=Producto)
+def evento_baja_producto(sender, instance: Producto, **kwargs):
+    eventos.productos_cambiados([instance.pk])
+
+@receiver(catalogo.productos_modificados)
+def evento_productos_modificados(sender, ids, **kwargs):
+    eventos.productos_cambiados(ids)
+
+
+# Versión por tabla para las respuestas condicionales de la API
+# (las escrituras masivas las avisa VersionadoQuerySet)
+@receiver([post_save, post_delete], sender=Categoria)
+@receiver([post_save, post_delete], sender=Proveedor)
+@receiver([post_save, post_delete], sender=Producto)
+@receiver([post_save, post_delete], sender=MovimientoStock)
+def versionar_tabla(sender, **kwargs):
+    versiones.tabla_modificada(sender)
+
+
+# Cachés de autenticación y roles de la API (permissions.py, autenticacion.py)
+User = get_user_model()
+
+@receiver(m2m_changed, sender=User.groups.through)
+def grupos_de_usuario_cambiados(sender, instance, action, reverse, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        invalidar_roles()  # cambió la lista de usuarios de un grupo
+    else:
+        invalidar_roles([instance.pk])
+
+@receiver([post_save, post_delete], sender=Group)
+def grupo_cambiado(sender, **kwargs):
+    invalidar_roles()
+
+@receiver([post_save, post_delete], sender=User)
+def usuario_cambiado(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    invalidar_roles([instance.pk])
+    invalidar_tokens(Token.objects.filter(user_id=instance.pk).values_list("key", flat=True))
+
+@receiver([post_save, post_delete], sender=Token)
+def token_cambiado(sender, instance, **kwargs):
+    invalidar_tokens([instance.key])
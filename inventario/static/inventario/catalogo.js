@@ -0,0 +1,75 @@
+/* inventario/static/inventario/catalogo.js
+ * Copia local del catálogo de productos (localStorage) sincronizada por versión.
+ * Primera carga: catálogo completo. Luego: ?since=<version> trae solo los cambios
+ * y el navegador revalida con ETag (304 si no hay novedades).
+ * Mientras la página está abierta, escucharCambios() recibe por SSE los
+ * cambios de stock, precio y activo sin volver a consultar.
+ */
+(function (global) {
+  const CLAVE = 'jugoso_catalogo_v1';
+
+  function leerLocal() {
+    try { return JSON.parse(localStorage.getItem(CLAVE) || 'null'); } catch (e) { return null; }
+  }
+
+  function guardarLocal(cat) {
+    try { localStorage.setItem(CLAVE, JSON.stringify(cat)); } catch (e) { /* cuota llena: seguimos en memoria */ }
+  }
+
+  function aplicar(local, data) {
+    const cat = (data.completo || !local) ? { version: 0, productos: {} } : local;
+    (data.productos || []).forEach(p => { cat.productos[p.id] = p; });
+    (data.bajas || []).forEach(id => { delete cat.productos[id]; });
+    cat.version = data.version;
+    return cat;
+  }
+
+  /** Devuelve una promesa con la lista de productos activos (ordenada por nombre). */
+  async function cargarCatalogo(url) {
+    let local = leerLocal();
+    const destino = local ? `${url}?since=${encodeURIComponent(local.version)}` : url;
+    try {
+      const r = await fetch(destino, { headers: { 'Accept': 'application/json' }, credentials: 'same-origin' });
+      if (r.ok) {
+        local = aplicar(local, await r.json());
+        guardarLocal(local);
+      }
+    } catch (e) {
+      // Sin red: se usa la copia local tal como está
+    }
+    const productos = Object.values((local && local.productos) || {});
+    productos.sort((a, b) => String(a.nombre).localeCompare(String(b.nombre), 'es'));
+    return productos;
+  }
+
+  /**
+   * Escucha /api/eventos/ (EventSource). ``alCambiar`` recibe la lista de
+   * productos cambiados ({id, stock, precio, activo} o {id, eliminado}) ya
+   * aplicados a la copia local, o null si hay que recargar el catálogo
+   * (eventos perdidos o un producto nuevo que la copia local no tiene).
+   */
+  function escucharCambios(url, alCambiar) {
+    if (!global.EventSource) return null;
+    const fuente = new EventSource(url);
+    fuente.addEventListener('productos', (e) => {
+      const cambios = JSON.parse(e.data);
+      const local = leerLocal();
+      let recargar = false;
+      if (local) {
+        cambios.forEach(c => {
+          const p = local.productos[c.id];
+          if (c.eliminado || c.activo === false) { delete local.productos[c.id]; }
+          else if (p) { p.precio = c.precio; }
+          else { recargar = true; }
+        });
+        guardarLocal(local);
+      }
+      alCambiar(recargar ? null : cambios);
+    });
+    fuente.addEventListener('reinicio', () => alCambiar(null));
+    return fuente;
+  }
+
+  global.cargarCatalogo = cargarCatalogo;
+  global.escucharCambios = escucharCambios;
+})(window);
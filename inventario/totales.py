@@ -0,0 +1,64 @@
+# inventario/totales.py
+"""
+Totales guardados de Venta y Compra (campos ``total`` e ``items``).
+
+Los listados, el admin y los reportes de deudores leen estas columnas en vez
+de recorrer los detalles de cada documento. Se mantienen así:
+
+- checkout.registrar_venta y compra_nueva los calculan al crear el documento.
+- Las señales de DetalleVenta/DetalleCompra (ediciones una a una, admin)
+  suman la diferencia con un UPDATE ... SET total = total + delta.
+- ``python manage.py recalcular_totales`` los reconstruye desde los detalles.
+
+Cada línea aporta su subtotal redondeado a 2 decimales, de modo que la suma
+incremental y el recálculo en SQL dan exactamente lo mismo.
+"""
+from decimal import Decimal
+
+from django.db.models import F, Value, Sum, Count, Subquery, OuterRef, DecimalField
+from django.db.models.functions import Coalesce, Round
+
+from .models import Venta, DetalleVenta, Compra, DetalleCompra
+
+CENTAVO = Decimal("0.01")
+
+# documento -> (modelo de detalle, FK al documento, campo de precio)
+_DETALLES = {
+    Venta: (DetalleVenta, "venta", "precio_unitario"),
+    Compra: (DetalleCompra, "compra", "costo_unitario"),
+}
+
+
+def subtotal_linea(cantidad, precio):
+    return ((cantidad or Decimal("0")) * (precio or Decimal("0"))).quantize(CENTAVO)
+
+
+def totales(lineas):
+    """(total, items) de una lista de tuplas (producto_id, cantidad, precio)."""
+    return sum((subtotal_linea(c, p) for _pid, c, p in lineas), Decimal("0")), len(lineas)
+
+
+def acumular(modelo, pk, total=Decimal("0"), items=0):
+    """Suma ``total`` e ``items`` al documento sin leerlo (un solo UPDATE)."""
+    if not total and not items:
+        return
+    modelo.objects.filter(pk=pk).update(total=F("total") + Value(total), items=F("items") + items)
+
+
+def recalcular(modelo, queryset=None):
+    """
+    Recalcula total e items desde los detalles con un único UPDATE.
+    ``queryset``: documentos a recalcular (por defecto, todos). Devuelve filas actualizadas.
+    """
+    detalle, fk, precio = _DETALLES[modelo]
+    por_documento = detalle.objects.filter(**{fk: OuterRef("pk")}).order_by().values(fk)
+    monto = DecimalField(max_digits=14, decimal_places=2)
+    suma = por_documento.annotate(
+        s=Sum(Round(F("cantidad") * F(precio), 2), output_field=monto)
+    ).values("s")
+    cuenta = por_documento.annotate(n=Count("pk")).values("n")
+    qs = modelo.objects.all() if queryset is None else queryset
+    return qs.update(
+        total=Coalesce(Subquery(suma), Value(Decimal("0")), output_field=monto),
+        items=Coalesce(Subquery(cuenta), Value(0)),
+    )
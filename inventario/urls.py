@@ -1,6 +1,6 @@
 # inventario/urls.py
 from django.urls import path
-from . import views, api
+from . import views, api, api_async
 from . import views_deuda  # vistas específicas para Deuda/Deudores
 
 app_name = "inventario"
@@ -26,6 +26,7 @@ urlpatterns = [
     path("productos/nuevo/", views.producto_crear, name="producto_crear"),
     path("productos/<int:pk>/editar/", views.producto_editar, name="producto_editar"),
     path("productos/<int:pk>/eliminar/", views.producto_eliminar, name="producto_eliminar"),
+    path("productos/<int:pk>/kardex/", views.producto_kardex, name="producto_kardex"),
 
     # Compras
     path("compras/nueva/", views.compra_nueva, name="compra_nueva"),
@@ -37,9 +38,26 @@ urlpatterns = [
 
     # Reportes
     path("reportes/stock-bajo/", views.reporte_stock_bajo, name="reporte_stock_bajo"),
+    path("reportes/stock-fecha/", views.reporte_stock_fecha, name="reporte_stock_fecha"),
+    path("reportes/valorizacion/", views.reporte_valorizacion, name="reporte_valorizacion"),
 
     # API (precios para previsualización en POS)
     path("api/producto-info/", api.producto_info, name="producto_info"),
+    path("api/producto-buscar/", api.producto_buscar, name="producto_buscar"),
+    path("api/stock-bajo/conteo/", api.stock_bajo_conteo, name="stock_bajo_conteo"),
+
+    # API (catálogo versionado para las cajas)
+    path("api/catalogo/", api.catalogo, name="catalogo"),
+
+    # API (cambios de stock / precio en vivo, Server-Sent Events)
+    path("api/eventos/", api.eventos, name="eventos"),
+
+    # API async (mismas lecturas, para servir con backend/asgi.py)
+    path("api/async/producto-info/", api_async.producto_info, name="producto_info_async"),
+    path("api/async/producto-buscar/", api_async.producto_buscar, name="producto_buscar_async"),
+    path("api/async/stock-bajo/conteo/", api_async.stock_bajo_conteo, name="stock_bajo_conteo_async"),
+    path("api/async/catalogo/", api_async.catalogo, name="catalogo_async"),
+    path("api/async/eventos/", api_async.eventos, name="eventos_async"),
 
     # Deudores / Deuda
     path("ventas/deudores/", views_deuda.deudores_list, name="deudores_list"),
@@ -48,5 +66,6 @@ urlpatterns = [
 
     # NUEVO: Acciones sobre deudas (POST recomendado desde el template)
     path("ventas/deuda/<int:pk>/pagar/", views_deuda.deuda_pagar, name="deuda_pagar"),
+    path("ventas/deuda/<int:pk>/abonar/", views_deuda.deuda_abonar, name="deuda_abonar"),
     path("ventas/deuda/<int:pk>/eliminar/", views_deuda.deuda_eliminar, name="deuda_eliminar"),
 ]
@@ -0,0 +1,106 @@
+# inventario/versiones.py
+"""
+Versión por tabla para las respuestas condicionales de la API (ETag / 304).
+
+Cada modelo versionado (Categoria, Proveedor, Producto, MovimientoStock) tiene
+un ContadorVersion 'tabla:<app>.<modelo>' que sube cuando la tabla cambia:
+
+- save() / delete() de una instancia: señales post_save / post_delete.
+- Escrituras masivas (queryset.update, bulk_create, bulk_update; p. ej. el
+  stock que mueve InventoryLedger o las acciones del admin): VersionadoQuerySet.
+
+El contador se incrementa al confirmar la transacción (on_commit) y una sola
+vez por transacción aunque cambien miles de filas, así una venta no retiene
+la fila del contador mientras dura su transacción. El acumulado por
+transacción lo da ``al_confirmar``, que también usa inventario/eventos.py.
+
+La API compara la versión (una consulta a ContadorVersion) con If-None-Match /
+If-Modified-Since y responde 304 sin leer la tabla ni serializar.
+"""
+from django.db import transaction
+
+from .models import ContadorVersion
+from . import catalogo
+
+PREFIJO = "tabla:"
+
+
+def nombre(modelo):
+    return f"{PREFIJO}{modelo._meta.label_lower}"
+
+
+class _Pendientes:
+    """Tablas modificadas en la transacción en curso; se incrementan al confirmar."""
+
+    def __init__(self):
+        self.nombres = set()
+
+    def __call__(self):
+        for n in sorted(self.nombres):
+            catalogo.siguiente_version(n)
+
+
+class _UnaVez:
+    """
+    Callback on_commit que procesa ``valor`` una sola vez, aunque se haya
+    registrado varias veces, y lo suelta de la conexión para la transacción
+    siguiente.
+    """
+
+    def __init__(self, valor, conexion, atributo):
+        self.valor = valor
+        self.conexion = conexion
+        self.atributo = atributo
+        self.hecho = False
+
+    def __call__(self):
+        if self.hecho:
+            return
+        self.hecho = True
+        if getattr(self.conexion, self.atributo, None) is self:
+            delattr(self.conexion, self.atributo)
+        self.valor()
+
+
+def al_confirmar(clave, fabrica):
+    """
+    Acumulador de la transacción en curso para ``clave``: se crea con
+    ``fabrica()`` (un callable que procesa lo acumulado) y se ejecuta una sola
+    vez, al confirmar. Llamar dentro de un bloque atómico.
+
+    Cada llamada registra su propio on_commit, así Django descarta solo los de
+    los savepoints deshechos y cualquiera que sobreviva procesa el acumulado.
+    Si toda la transacción se deshace, el acumulado pasa a la siguiente: lo
+    deshecho se procesa de más (una versión o un evento extra), nunca de menos.
+    """
+    conexion = transaction.get_connection()
+    atributo = f"_al_confirmar_{clave}"
+    pendiente = getattr(conexion, atributo, None)
+    if pendiente is None:
+        pendiente = _UnaVez(fabrica(), conexion, atributo)
+        setattr(conexion, atributo, pendiente)
+    transaction.on_commit(pendiente)
+    return pendiente.valor
+
+
+def tabla_modificada(modelo):
+    """Marca ``modelo`` como modificado; su versión sube al confirmar."""
+    if not transaction.get_connection().in_atomic_block:
+        catalogo.siguiente_version(nombre(modelo))
+        return
+    al_confirmar("versiones", _Pendientes).nombres.add(nombre(modelo))
+
+
+def estado(modelos):
+    """
+    (valores, actualizado): versión de cada modelo (0 si nunca cambió) y el
+    último instante de cambio entre ellos (None si ninguno cambió).
+    """
+    nombres = [nombre(m) for m in modelos]
+    filas = dict(
+        (n, (v, a)) for n, v, a in
+        ContadorVersion.objects.filter(nombre__in=nombres).values_list("nombre", "valor", "actualizado")
+    )
+    valores = tuple(filas.get(n, (0, None))[0] for n in nombres)
+    fechas = [a for _v, a in filas.values() if a is not None]
+    return valores, max(fechas) if fechas else None
@@ -3,14 +3,18 @@ from decimal import Decimal, InvalidOperation
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.db import transaction
-from django.db.models import Q, F, Count
-from django.core.paginator import Paginator
+from django.db.models import Q, F, Sum, DecimalField
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from django import forms
 from django.apps import apps
-from django.utils import timezone
 
-from .models import Categoria, Proveedor, Producto, Cliente, MovimientoStock
+from .models import Categoria, Proveedor, Producto, Cliente, CostoProducto, VentaArchivada
+from .checkout import registrar_venta
+from .ledger import InventoryLedger, Delta
+from .codigos import asignar_codigo
+from . import historico, totales, deudas, eventos, kardex
+from .paginacion import paginar_keyset
 
 # Modelos que podrías no tener en algunos proyectos
 Compra = DetalleCompra = Venta = DetalleVenta = None
@@ -25,11 +29,6 @@ except LookupError:
 
 # --------------------- utilidades ---------------------
 
-def paginar_queryset(request, queryset, per_page=10):
-    page_number = request.GET.get("page") or 1
-    paginator = Paginator(queryset, per_page)
-    return paginator.get_page(page_number)
-
 def _nombre_campo_precio(modelo, candidatos):
     field_names = {f.name for f in modelo._meta.fields}
     for name in candidatos:
@@ -40,25 +39,16 @@ def _nombre_campo_precio(modelo, candidatos):
 def _tiene_campo(modelo, nombre):
     return nombre in {f.name for f in modelo._meta.fields}
 
-def _crear_detalle_compra(compra, producto, cantidad, precio_unit):
+def _nuevo_detalle_compra(compra, producto_id, cantidad, precio_unit):
+    """Detalle de compra sin guardar (para bulk_create)."""
     price_field = _nombre_campo_precio(
         DetalleCompra,
         ["costo", "precio", "precio_unitario", "costo_unitario", "valor", "valor_unitario"],
     )
-    kwargs = {"compra": compra, "producto": producto, "cantidad": cantidad}
+    kwargs = {"compra": compra, "producto_id": producto_id, "cantidad": cantidad}
     if price_field:
         kwargs[price_field] = precio_unit
-    return DetalleCompra.objects.create(**kwargs)
-
-def _crear_detalle_venta(venta, producto, cantidad, precio_unit):
-    price_field = _nombre_campo_precio(
-        DetalleVenta,
-        ["precio", "precio_unitario", "valor", "valor_unitario"],
-    )
-    kwargs = {"venta": venta, "producto": producto, "cantidad": cantidad}
-    if price_field:
-        kwargs[price_field] = precio_unit
-    return DetalleVenta.objects.create(**kwargs)
+    return DetalleCompra(**kwargs)
 
 def _get_accessor_detalleventa():
     """Nombre del related_name real (p.ej. 'detalles')."""
@@ -83,19 +73,6 @@ def _get_precio_from_detalle(det):
             return getattr(det, f)
     return Decimal("0")
 
-def _siguiente_codigo():
-    """Próximo código correlativo de 3 dígitos (001, 002...)."""
-    max_n = 0
-    for c in Producto.objects.values_list("codigo", flat=True):
-        try:
-            n = int(str(c).strip())
-            if n > max_n:
-                max_n = n
-        except (TypeError, ValueError):
-            continue
-    return f"{max_n + 1:03d}"
-
-
 # --------------------- vistas base ---------------------
 
 def home(request):
@@ -107,14 +84,14 @@ def home(request):
 class CategoriaForm(forms.ModelForm):
     class Meta:
         model = Categoria
-        fields = ["nombre", "descripcion"]
+        fields = ["nombre", "descripcion", "prefijo_codigo"]
 
 def categoria_list(request):
     q = (request.GET.get("q") or "").strip()
-    qs = Categoria.objects.all().order_by("nombre")
+    qs = Categoria.objects.all()
     if q:
         qs = qs.filter(Q(nombre__icontains=q) | Q(descripcion__icontains=q))
-    page_obj = paginar_queryset(request, qs, 10)
+    page_obj = paginar_keyset(request, qs, ["nombre"], 10)
     return render(request, "inventario/categoria_list.html",
                   {"categorias": page_obj.object_list, "page_obj": page_obj, "q": q})
 
@@ -153,7 +130,7 @@ class ProveedorForm(forms.ModelForm):
 
 def proveedor_list(request):
     q = (request.GET.get("q") or "").strip()
-    qs = Proveedor.objects.all().order_by("nombre")
+    qs = Proveedor.objects.all()
     if q:
         qs = qs.filter(
             Q(nombre__icontains=q) |
@@ -161,7 +138,7 @@ def proveedor_list(request):
             Q(telefono__icontains=q) |
             Q(email__icontains=q)
         )
-    page_obj = paginar_queryset(request, qs, 10)
+    page_obj = paginar_keyset(request, qs, ["nombre"], 10)
     return render(request, "inventario/proveedor_list.html",
                   {"proveedores": page_obj.object_list, "page_obj": page_obj, "q": q})
 
@@ -194,43 +171,65 @@ def proveedor_eliminar(request, pk):
 # --------------------- Productos ---------------------
 
 class ProductoForm(forms.ModelForm):
+    # Solo al crear: se registra en el kardex (InventoryLedger.registrar_inicial).
+    # Después el stock cambia con compras, ventas y movimientos.
+    stock_inicial = forms.DecimalField(
+        label="Stock inicial", required=False, min_value=0, max_digits=12, decimal_places=3,
+        widget=forms.NumberInput(attrs={"class": "inp", "step": "1", "min": "0"}),
+    )
+
     class Meta:
         model = Producto
-        fields = ["codigo", "nombre", "categoria", "precio", "stock", "stock_minimo", "activo"]
+        fields = ["codigo", "nombre", "categoria", "precio", "stock_minimo", "activo"]
         widgets = {
             "codigo": forms.TextInput(attrs={"class": "inp", "placeholder": "Se asignará automáticamente"}),
             "nombre": forms.TextInput(attrs={"class": "inp"}),
             "categoria": forms.Select(attrs={"class": "inp"}),
             "precio": forms.NumberInput(attrs={"class": "inp", "step": "1", "min": "0"}),
-            "stock": forms.NumberInput(attrs={"class": "inp", "step": "1", "min": "0"}),
             "stock_minimo": forms.NumberInput(attrs={"class": "inp", "step": "1", "min": "0"}),
             "activo": forms.CheckboxInput(),
         }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        creando = not getattr(self.instance, "pk", None)
-        if creando:
-            if not self.initial.get("codigo"):
-                self.initial["codigo"] = _siguiente_codigo()
+        self.creando = not getattr(self.instance, "pk", None)
+        if self.creando:
+            # Sin vista previa: el código depende de la categoría (prefijo) y se
+            # reserva al guardar con codigos.asignar_codigo; queda el placeholder
+            self.initial["codigo"] = ""
+            self.fields["codigo"].required = False
             self.fields["codigo"].widget.attrs["readonly"] = "readonly"
             self.fields["codigo"].widget.attrs["style"] = "opacity:.85;cursor:not-allowed;"
+        else:
+            del self.fields["stock_inicial"]
+
+    def clean_codigo(self):
+        # Al crear se ignora el código enviado (era la vista previa)
+        if self.creando:
+            return None
+        return self.cleaned_data.get("codigo")
 
     def save(self, commit=True):
         obj = super().save(commit=False)
-        if not getattr(obj, "pk", None):
-            if not getattr(obj, "codigo", None) or not str(obj.codigo).strip():
-                obj.codigo = _siguiente_codigo()
+        if self.creando:
+            obj.codigo = asignar_codigo(obj.categoria)
+            obj.stock = self.cleaned_data.get("stock_inicial") or 0
         if commit:
-            obj.save()
+            with transaction.atomic():
+                if self.creando:
+                    obj.save()
+                    InventoryLedger.registrar_inicial([Delta(obj.pk, obj.stock, "Stock inicial", "Alta")])
+                else:
+                    # Sin 'stock': un save() completo pisaría lo que movió el libro mientras tanto
+                    obj.save(update_fields=self._meta.fields)
         return obj
 
 def productos_list(request):
     q = (request.GET.get("q") or "").strip()
-    qs = Producto.objects.select_related("categoria").all().order_by("nombre")
+    qs = Producto.objects.select_related("categoria").all()
     if q:
         qs = qs.filter(Q(codigo__icontains=q) | Q(nombre__icontains=q))
-    page_obj = paginar_queryset(request, qs, 10)
+    page_obj = paginar_keyset(request, qs, ["nombre"], 10)
     return render(request, "inventario/productos_list.html",
                   {"productos": page_obj.object_list, "page_obj": page_obj, "q": q})
 
@@ -251,6 +250,26 @@ def producto_editar(request, pk):
         return redirect("inventario:productos_list")
     return render(request, "inventario/producto_form.html", {"form": form, "titulo": f"Editar producto: {obj.nombre}"})
 
+def producto_kardex(request, pk):
+    """Kardex del producto, del movimiento más reciente al más antiguo, con saldo corrido."""
+    producto = get_object_or_404(Producto, pk=pk)
+    fecha = request.GET.get("hasta", "")
+    hasta = historico.parsear_momento(fecha) if fecha else None
+    if fecha and hasta is None:
+        messages.error(request, "Fecha inválida.")
+    try:
+        filas, siguiente = kardex.pagina(producto, request.GET.get("cursor"), hasta=hasta)
+    except kardex.CursorInvalido:
+        messages.error(request, "El enlace de paginación no es válido; se muestra desde el inicio.")
+        filas, siguiente = kardex.pagina(producto)
+    return render(request, "inventario/producto_kardex.html", {
+        "producto": producto,
+        "movimientos": filas,
+        "siguiente": siguiente,
+        "hasta": fecha,
+        "es_primera": not request.GET.get("cursor"),
+    })
+
 def producto_eliminar(request, pk):
     obj = get_object_or_404(Producto, pk=pk)
     if request.method == "POST":
@@ -263,8 +282,7 @@ def producto_eliminar(request, pk):
 # --------------------- Compras ---------------------
 
 def compra_nueva(request):
-    productos = Producto.objects.filter(activo=True).order_by("nombre")
-
+    # El listado de productos lo carga el navegador desde /api/catalogo/ (copia local)
     if request.method == "POST":
         if not (Compra and DetalleCompra):
             messages.error(request, "Los modelos de Compra/DetalleCompra no están definidos.")
@@ -284,6 +302,9 @@ def compra_nueva(request):
             if pid > 0 and cant > 0 and costo >= 0:
                 lineas.append((pid, cant, costo))
 
+        existentes = set(Producto.objects.filter(pk__in=[l[0] for l in lineas]).values_list("pk", flat=True))
+        lineas = [l for l in lineas if l[0] in existentes]
+
         if not lineas:
             messages.error(request, "Agrega al menos un ítem válido.")
             return redirect("inventario:compra_nueva")
@@ -306,37 +327,34 @@ def compra_nueva(request):
             if not prov_instance:
                 prov_instance = Proveedor.objects.create(nombre=proveedor_nombre)
 
+        total, items = totales.totales(lineas)
         with transaction.atomic():
-            compra = Compra.objects.create(proveedor=prov_instance) if prov_field else Compra.objects.create()
-
+            datos = {"total": total, "items": items}
+            if prov_field:
+                datos["proveedor"] = prov_instance
             if _tiene_campo(Compra, "observacion") and observacion:
-                compra.observacion = observacion
-                compra.save(update_fields=["observacion"])
-
-            total = Decimal("0")
-            for pid, cant, costo in lineas:
-                prod = Producto.objects.select_for_update().get(pk=pid)
-                _crear_detalle_compra(compra=compra, producto=prod, cantidad=cant, precio_unit=costo)
-                # Si quieres aumentar stock aquí:
-                # prod.stock = (prod.stock or 0) + cant
-                # prod.save(update_fields=["stock"])
-                total += cant * costo
-
-            if _tiene_campo(Compra, "total"):
-                compra.total = total
-                compra.save(update_fields=["total"])
+                datos["observacion"] = observacion
+            compra = Compra.objects.create(**datos)
+
+            DetalleCompra.objects.bulk_create([
+                _nuevo_detalle_compra(compra=compra, producto_id=pid, cantidad=cant, precio_unit=costo)
+                for pid, cant, costo in lineas
+            ])
+            InventoryLedger.registrar([
+                Delta(pid, cant, "Ingreso por compra", f"Compra#{compra.id}", costo)
+                for pid, cant, costo in lineas
+            ])
 
         messages.success(request, "Compra registrada.")
         return redirect("inventario:home")
 
-    return render(request, "inventario/compra_nueva.html", {"productos": productos})
+    return render(request, "inventario/compra_nueva.html")
 
 
 # --------------------- POS / Ventas (+ Deuda) ---------------------
 
 def pos_venta(request):
-    productos = Producto.objects.filter(activo=True).order_by("nombre")
-
+    # El listado de productos lo carga el navegador desde /api/catalogo/ (copia local)
     if request.method == "POST":
         if not (Venta and DetalleVenta):
             messages.error(request, "Los modelos de Venta/DetalleVenta no están definidos.")
@@ -373,59 +391,16 @@ def pos_venta(request):
                 return redirect("inventario:pos_venta")
             cli_instance, _ = Cliente.objects.get_or_create(nombre=nombre, defaults={"activo": True})
 
-        with transaction.atomic():
-            # crea venta con flags de deuda
-            venta_kwargs = {}
-            if _tiene_campo(Venta, "cliente"):
-                venta_kwargs["cliente"] = cli_instance
-            if _tiene_campo(Venta, "fecha"):
-                venta_kwargs["fecha"] = timezone.now()
-            if _tiene_campo(Venta, "observacion"):
-                venta_kwargs["observacion"] = (request.POST.get("observacion") or "").strip()
-            if _tiene_campo(Venta, "es_deuda"):
-                venta_kwargs["es_deuda"] = es_deuda
-            if _tiene_campo(Venta, "saldada"):
-                venta_kwargs["saldada"] = False if es_deuda else True
-
-            venta = Venta.objects.create(**venta_kwargs)
-
-            total = Decimal("0")
-            for pid, cant, precio in lineas:
-                prod = Producto.objects.select_for_update().get(pk=pid)
-
-                # Control stock y descuenta
-                if prod.stock is not None and prod.stock < cant:
-                    messages.error(request, f"Stock insuficiente para {prod.nombre}.")
-                    transaction.set_rollback(True)
-                    return redirect("inventario:pos_venta")
-
-                _crear_detalle_venta(venta=venta, producto=prod, cantidad=cant, precio_unit=precio)
-
-                # Descuento de stock
-                try:
-                    prod.stock = (prod.stock or 0) - cant
-                    prod.save(update_fields=["stock"])
-                except Exception:
-                    pass
-
-                # Movimiento de stock (opcional)
-                try:
-                    MovimientoStock.objects.create(
-                        producto=prod,
-                        tipo=MovimientoStock.SALIDA,
-                        cantidad=cant,
-                        motivo="Venta a Deuda" if es_deuda else "Venta",
-                        fecha=getattr(venta, "fecha", timezone.now()),
-                        referencia=f"Venta#{venta.id}",
-                    )
-                except Exception:
-                    pass
-
-                total += cant * precio
-
-            if _tiene_campo(Venta, "total"):
-                venta.total = total
-                venta.save(update_fields=["total"])
+        try:
+            registrar_venta(
+                lineas,
+                cliente=cli_instance,
+                es_deuda=es_deuda,
+                observacion=(request.POST.get("observacion") or "").strip(),
+            )
+        except ValidationError as e:
+            messages.error(request, " ".join(e.messages))
+            return redirect("inventario:pos_venta")
 
         if es_deuda:
             messages.success(request, f"Deuda registrada para {cli_instance.nombre}.")
@@ -434,7 +409,7 @@ def pos_venta(request):
             messages.success(request, "Venta registrada correctamente.")
             return redirect("inventario:ventas_list")
 
-    return render(request, "inventario/pos_venta.html", {"productos": productos})
+    return render(request, "inventario/pos_venta.html", {"url_eventos": eventos.url_flujo(request)})
 
 
 # --------------------- Deudores ---------------------
@@ -448,25 +423,7 @@ def deudores_list(request):
         # Sin campos, no hay deudores que mostrar
         return render(request, "inventario/deudores_list.html", {"rows": []})
 
-    clientes = (
-        Cliente.objects.filter(ventas__es_deuda=True, ventas__saldada=False)
-        .distinct()
-        .order_by("nombre")
-    )
-
-    rows = []
-    for cli in clientes:
-        ventas_cli = cli.ventas.filter(es_deuda=True, saldada=False).prefetch_related("detalles", "detalles__producto")
-        total = Decimal("0")
-        ultima = None
-        for v in ventas_cli:
-            if ultima is None or (getattr(v, "fecha", None) and v.fecha > ultima):
-                ultima = getattr(v, "fecha", ultima)
-            accessor = _get_accessor_detalleventa()
-            dets = getattr(v, accessor).all() if accessor else []
-            for d in dets:
-                total += (getattr(d, "cantidad", 0) or 0) * (_get_precio_from_detalle(d) or 0)
-        rows.append({"cliente": cli, "total": total, "ultima": ultima})
+    rows = [{"cliente": s.cliente, "total": s.saldo, "ultima": s.ultima_deuda} for s in deudas.deudores()]
 
     return render(request, "inventario/deudores_list.html", {"rows": rows})
 
@@ -476,16 +433,9 @@ def deudor_detalle(request, pk):
         return redirect("inventario:home")
 
     cli = get_object_or_404(Cliente, pk=pk)
-    ventas = cli.ventas.filter(es_deuda=True).order_by("-fecha").prefetch_related("detalles", "detalles__producto")
+    ventas = cli.ventas.filter(es_deuda=True).order_by("-fecha")
 
-    filas = []
-    for v in ventas:
-        accessor = _get_accessor_detalleventa()
-        dets = getattr(v, accessor).all() if accessor else []
-        total = Decimal("0")
-        for d in dets:
-            total += (getattr(d, "cantidad", 0) or 0) * (_get_precio_from_detalle(d) or 0)
-        filas.append({"venta": v, "total": total})
+    filas = [{"venta": v, "total": v.total} for v in ventas]
 
     return render(request, "inventario/deudor_detalle.html", {"cliente": cli, "filas": filas})
 
@@ -497,13 +447,9 @@ def ventas_list(request):
         messages.error(request, "El modelo Venta no está definido.")
         return redirect("inventario:home")
 
-    qs = Venta.objects.all().order_by("-id")
-
-    accessor = _get_accessor_detalleventa()
-    if accessor:
-        qs = qs.annotate(items=Count(accessor))
+    qs = Venta.objects.all()
 
-    page_obj = paginar_queryset(request, qs, 10)
+    page_obj = paginar_keyset(request, qs, ["-id"], 10)
 
     ventas_fmt = []
     for v in page_obj.object_list:
@@ -511,8 +457,8 @@ def ventas_list(request):
             "obj": v,
             "id": v.id,
             "fecha": _get_fecha_display(v),
-            "total": getattr(v, "total", None),
-            "items": getattr(v, "items", None),
+            "total": v.total,
+            "items": v.items,
         })
 
     return render(request, "inventario/ventas_list.html",
@@ -523,35 +469,43 @@ def ventas_detalle(request, pk):
         messages.error(request, "Los modelos de Venta/DetalleVenta no están definidos.")
         return redirect("inventario:ventas_list")
 
-    venta = get_object_or_404(Venta, pk=pk)
-
-    accessor = _get_accessor_detalleventa()
-    detalles = getattr(venta, accessor).select_related("producto").all() if accessor else []
+    venta = Venta.objects.filter(pk=pk).first()
+    archivada = venta is None
+    if archivada:
+        # Las ventas antiguas pueden estar en el archivo (mismo id)
+        venta = get_object_or_404(VentaArchivada, pk=pk)
+        detalles = venta.detalles.select_related("producto").all()
+    else:
+        accessor = _get_accessor_detalleventa()
+        detalles = getattr(venta, accessor).select_related("producto").all() if accessor else []
 
     lineas = []
-    total = Decimal("0")
+    costo_total = Decimal("0")
     for d in detalles:
         producto = getattr(d, "producto", None)
         nombre = getattr(producto, "nombre", "—")
         cantidad = getattr(d, "cantidad", 0)
         precio = _get_precio_from_detalle(d)
         subtotal = (cantidad or 0) * (precio or 0)
-        total += subtotal
+        costo = getattr(d, "costo_fifo", None) or Decimal("0")  # guardado al vender
+        costo_total += costo
         lineas.append({
             "producto": nombre,
             "cantidad": cantidad,
             "precio": precio,
             "subtotal": subtotal,
+            "costo": costo,
+            "margen": subtotal - costo,
         })
 
-    if hasattr(venta, "total") and venta.total:
-        total = venta.total
-
     contexto = {
         "venta": venta,
+        "archivada": archivada,
         "fecha": _get_fecha_display(venta),
         "lineas": lineas,
-        "total": total,
+        "total": venta.total,
+        "costo_total": costo_total,
+        "margen_total": venta.total - costo_total,
     }
     return render(request, "inventario/ventas_detalle.html", contexto)
 
@@ -560,7 +514,57 @@ def ventas_detalle(request, pk):
 
 def reporte_stock_bajo(request):
     productos = (Producto.objects
-                 .select_related("categoria")
-                 .filter(stock__lte=F("stock_minimo"))
+                 .select_related("categoria", "sugerencia")
+                 .filter(stock_bajo=True)
                  .order_by("categoria__nombre", "nombre"))
     return render(request, "inventario/reporte_stock_bajo.html", {"productos": productos})
+
+
+def reporte_valorizacion(request):
+    """Valor del inventario (FIFO y costo promedio) leído de CostoProducto."""
+    categoria_id = request.GET.get("categoria") or None
+    costos = (CostoProducto.objects
+              .select_related("producto__categoria")
+              .filter(producto__activo=True)
+              .order_by("producto__categoria__nombre", "producto__nombre"))
+    if categoria_id:
+        costos = costos.filter(producto__categoria_id=categoria_id)
+    totales_valor = costos.aggregate(
+        fifo=Sum("valor_fifo"),
+        promedio=Sum(F("cantidad") * F("costo_promedio"), output_field=DecimalField(max_digits=18, decimal_places=4)),
+    )
+    return render(request, "inventario/reporte_valorizacion.html", {
+        "costos": costos,
+        "total_fifo": totales_valor["fifo"] or Decimal("0"),
+        "total_promedio": totales_valor["promedio"] or Decimal("0"),
+        "categoria_id": categoria_id,
+        "categorias": Categoria.objects.order_by("nombre"),
+    })
+
+
+def reporte_stock_fecha(request):
+    """Stock de todos los productos (o de una categoría) a una fecha pasada."""
+    fecha = request.GET.get("fecha", "")
+    categoria_id = request.GET.get("categoria") or None
+    momento = historico.parsear_momento(fecha) if fecha else None
+    if fecha and momento is None:
+        messages.error(request, "Fecha inválida.")
+
+    filas = []
+    if momento is not None:
+        productos = Producto.objects.select_related("categoria").order_by("categoria__nombre", "nombre")
+        if categoria_id:
+            productos = productos.filter(categoria_id=categoria_id)
+        ids = None if not categoria_id else list(productos.values_list("pk", flat=True))
+        stocks = historico.stock_en(momento, ids)
+        for p in productos:
+            p.stock_fecha = stocks.get(p.pk, Decimal("0"))
+            filas.append(p)
+
+    return render(request, "inventario/reporte_stock_fecha.html", {
+        "productos": filas,
+        "fecha": fecha,
+        "momento": momento,
+        "categoria_id": categoria_id,
+        "categorias": Categoria.objects.order_by("nombre"),
+    })
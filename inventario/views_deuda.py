@@ -3,37 +3,18 @@ from decimal import Decimal, InvalidOperation
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.db import transaction
-from django.db.models import Sum, F, ExpressionWrapper, DecimalField
+from django.db.models import Prefetch
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 
-from .models import Cliente, Producto, Venta, DetalleVenta
+from .models import Cliente, Venta, DetalleVenta
+from .checkout import registrar_venta
+from .ledger import InventoryLedger, Delta
+from . import costos, deudas, resumenes
 
 
 # ---------------- Utilidades internas ----------------
 
-def _nombre_precio(detalle_model):
-    """
-    Devuelve el nombre del campo de precio unitario en DetalleVenta
-    (precio_unitario, precio, valor, valor_unitario).
-    """
-    nombres = {f.name for f in detalle_model._meta.fields}
-    for f in ("precio_unitario", "precio", "valor", "valor_unitario"):
-        if f in nombres:
-            return f
-    return None
-
-
-def _crear_detalle(venta, producto, cantidad, precio):
-    """
-    Crea el detalle de venta usando el nombre real del campo de precio.
-    """
-    price_field = _nombre_precio(DetalleVenta)
-    kwargs = {"venta": venta, "producto": producto, "cantidad": cantidad}
-    if price_field:
-        kwargs[price_field] = precio
-    return DetalleVenta.objects.create(**kwargs)
-
-
 def _precio_detalle(det):
     """
     Obtiene el precio unitario de una línea sin importar el nombre del campo.
@@ -53,8 +34,7 @@ def deuda_guardar(request):
     - Crea/usa un Cliente por nombre.
     - Marca Venta.es_deuda=True y saldada=False.
     - Guarda la descripción en Venta.observacion (si viene).
-    - Crea DetalleVenta por cada línea.
-    - Descuenta stock (con select_for_update para evitar condiciones de carrera).
+    - Crea los DetalleVenta y descuenta stock en lote (ver checkout.registrar_venta).
     """
     if request.method != "POST":
         return redirect("inventario:pos_venta")
@@ -90,34 +70,11 @@ def deuda_guardar(request):
     if not cliente:
         cliente = Cliente.objects.create(nombre=deudor_nombre)
 
-    with transaction.atomic():
-        venta = Venta.objects.create(
-            cliente=cliente,
-            es_deuda=True,
-            saldada=False,
-            observacion=descripcion
-        )
-
-        total = Decimal("0")
-        for pid, cant, precio in lineas:
-            # Bloqueo del producto para stock consistente
-            prod = Producto.objects.select_for_update().get(pk=pid)
-
-            if prod.stock is not None and prod.stock < cant:
-                messages.error(request, f"Stock insuficiente para {prod.nombre}.")
-                raise transaction.TransactionManagementError("Stock insuficiente")
-
-            _crear_detalle(venta=venta, producto=prod, cantidad=cant, precio=precio)
-            total += cant * precio
-
-            # Descuento de stock
-            prod.stock = (prod.stock or Decimal("0")) - cant
-            prod.save(update_fields=["stock"])
-
-        # Guarda total si el modelo lo tiene
-        if "total" in {f.name for f in Venta._meta.fields}:
-            venta.total = total
-            venta.save(update_fields=["total"])
+    try:
+        registrar_venta(lineas, cliente=cliente, es_deuda=True, observacion=descripcion)
+    except ValidationError as e:
+        messages.error(request, " ".join(e.messages))
+        return redirect("inventario:pos_venta")
 
     messages.success(request, f"Deuda registrada para {cliente.nombre}.")
     return redirect("inventario:deudores_list")
@@ -125,35 +82,17 @@ def deuda_guardar(request):
 
 def deudores_list(request):
     """
-    Lista de deudores (ventas a crédito pendientes).
-    Muestra una fila por venta pendiente con: cliente, fecha, descripción, total y acciones.
+    Lista de deudores: una fila por cliente con saldo pendiente, deudas
+    abiertas y fecha de la última deuda (lectura directa de SaldoCliente).
+    Las acciones por deuda (abonar, pagar, eliminar) están en el detalle del deudor.
     """
-    qs = (Venta.objects
-          .filter(es_deuda=True, saldada=False, cliente__isnull=False)
-          .select_related("cliente"))
+    return render(request, "inventario/deudores_list.html", {"saldos": deudas.deudores()})
 
-    campo_precio = _nombre_precio(DetalleVenta)
 
-    if campo_precio:
-        # IMPORTANTE: prefijar con detalles__ para que Django haga el join correcto
-        subtotal_expr = ExpressionWrapper(
-            F("detalles__cantidad") * F(f"detalles__{campo_precio}"),
-            output_field=DecimalField(max_digits=18, decimal_places=2),
-        )
-        deudas = (
-            qs.values("id", "cliente__id", "cliente__nombre", "fecha", "observacion")
-              .annotate(total_adeudado=Sum(subtotal_expr))
-              .order_by("-fecha", "-id")
-        )
-    else:
-        # Si Venta.total existe, úsalo como respaldo
-        deudas = (
-            qs.values("id", "cliente__id", "cliente__nombre", "fecha", "observacion")
-              .annotate(total_adeudado=Sum("total"))
-              .order_by("-fecha", "-id")
-        )
-
-    return render(request, "inventario/deudores_list.html", {"deudas": deudas})
+def _volver(venta):
+    if venta.cliente_id:
+        return redirect("inventario:deudor_detalle", pk=venta.cliente_id)
+    return redirect("inventario:deudores_list")
 
 
 @transaction.atomic
@@ -168,37 +107,73 @@ def deuda_pagar(request, pk):
 
     venta = get_object_or_404(Venta, pk=pk, es_deuda=True, saldada=False)
     venta.saldada = True
-    venta.save(update_fields=["saldada"])
+    venta.save(update_fields=["saldada"])  # la señal de Venta recalcula el saldo del cliente
     nombre = venta.cliente.nombre if venta.cliente else "—"
     messages.success(request, f"La deuda del cliente {nombre} fue marcada como pagada.")
-    return redirect("inventario:deudores_list")
+    return _volver(venta)
+
+
+def deuda_abonar(request, pk):
+    """
+    Registra un abono (pago parcial) a una deuda pendiente.
+    Solo permite método POST; campo 'monto' y opcional 'observacion'.
+    """
+    venta = get_object_or_404(Venta, pk=pk, es_deuda=True)
+    if request.method != "POST":
+        messages.error(request, "Acción no permitida. Usa el botón Abonar.")
+        return _volver(venta)
+
+    monto = (request.POST.get("monto") or "").strip()
+    try:
+        deudas.registrar_abono(venta.pk, monto, request.POST.get("observacion", "").strip())
+    except ValidationError as e:
+        messages.error(request, " ".join(e.messages))
+    else:
+        messages.success(request, "Abono registrado.")
+    return _volver(venta)
 
 
 @transaction.atomic
 def deuda_eliminar(request, pk):
     """
-    Elimina una venta a deuda (si está pendiente) y repone stock.
+    Elimina una venta a deuda (si está pendiente y sin abonos), repone stock y
+    la descuenta de los resúmenes de ventas.
     Solo permite método POST.
     """
     if request.method != "POST":
         messages.error(request, "Acción no permitida. Usa el botón Eliminar.")
         return redirect("inventario:deudores_list")
 
-    venta = get_object_or_404(Venta, pk=pk, es_deuda=True, saldada=False)
+    # Bloqueada: un abono concurrente no puede colarse entre la revisión y el borrado
+    venta = get_object_or_404(Venta.objects.select_for_update(), pk=pk, es_deuda=True, saldada=False)
+    if venta.abonado > 0:
+        # Borrarla se llevaría en cascada los AbonoDeuda (dinero ya recibido)
+        messages.error(
+            request,
+            f"La deuda tiene abonos por ${venta.abonado:,.0f}: anúlalos antes de eliminarla.".replace(",", "."),
+        )
+        return _volver(venta)
     nombre = venta.cliente.nombre if venta.cliente else "—"
 
-    # Reponer stock
-    detalles = venta.detalles.select_related("producto").all()
-    for d in detalles:
-        if not d.producto_id:
-            continue
-        prod = Producto.objects.select_for_update().get(pk=d.producto_id)
-        prod.stock = (prod.stock or Decimal("0")) + (d.cantidad or Decimal("0"))
-        prod.save(update_fields=["stock"])
+    # Reponer stock en lote; al borrar la venta se suspenden las señales de
+    # DetalleVenta para no reponerlo una segunda vez.
+    referencia = f"Venta#{venta.id}"
+    detalles = list(venta.detalles.values_list(
+        "producto_id", "producto__categoria_id", "cantidad", "precio_unitario", "costo_fifo"
+    ))
+    # Las unidades vuelven a entrar al mismo costo con que salieron
+    InventoryLedger.registrar([
+        Delta(producto_id, cantidad or Decimal("0"), "Reverso deuda eliminada", referencia,
+              costos.unitario(costo, cantidad))
+        for producto_id, _categoria_id, cantidad, _precio, costo in detalles
+    ])
+    lineas = [d[:4] for d in detalles]
+    resumenes.aplicar(venta.fecha, True, lineas, signo=-1)
+    with InventoryLedger.suspendido():
+        venta.delete()  # la señal de Venta recalcula el saldo del cliente
 
-    venta.delete()
     messages.success(request, f"La deuda de {nombre} fue eliminada y el stock repuesto.")
-    return redirect("inventario:deudores_list")
+    return _volver(venta)
 
 
 def deudor_detalle(request, pk):
@@ -211,17 +186,18 @@ def deudor_detalle(request, pk):
         Venta.objects
         .filter(cliente=cliente, es_deuda=True)
         .order_by("-id")
+        .prefetch_related(
+            Prefetch("detalles", queryset=DetalleVenta.objects.select_related("producto")),
+            "abonos",
+        )
     )
 
     historial = []
     for v in ventas:
-        detalles = v.detalles.select_related("producto").all()
         lineas = []
-        v_total = Decimal("0")
-        for d in detalles:
+        for d in v.detalles.all():
             precio = _precio_detalle(d)
             subtotal = (d.cantidad or Decimal("0")) * (precio or Decimal("0"))
-            v_total += subtotal
             lineas.append({
                 "producto": getattr(d.producto, "nombre", "—"),
                 "cantidad": d.cantidad,
@@ -229,19 +205,20 @@ def deudor_detalle(request, pk):
                 "subtotal": subtotal,
             })
 
-        if hasattr(v, "total") and v.total:
-            v_total = v.total
-
         historial.append({
             "venta": v,
             "fecha": getattr(v, "fecha", getattr(v, "created_at", None)),
             "descripcion": getattr(v, "observacion", ""),
-            "total": v_total,
+            "total": v.total,
+            "abonado": v.abonado,
+            "pendiente": v.saldo_pendiente(),
             "saldada": v.saldada,
             "lineas": lineas,
+            "abonos": list(v.abonos.all()),
         })
 
     return render(request, "inventario/deudor_detalle.html", {
         "cliente": cliente,
+        "saldo": getattr(cliente, "saldo", None),
         "historial": historial,
     })